@@ -0,0 +1,82 @@
+"""
+Measures how much the annotated images slow the inspection down.
+
+The images are inspected one after the other without annotation, with the annotated
+image drawn and written before the next image, with the AnnotationWriter drawing and
+writing them in the background from the image file, and from the preview kept by the
+pipeline; the output folder is emptied between runs.
+
+Usage:
+    python benchmarks/annotation.py [--folder ./images] [--repeat 20] [--workers 2]
+"""
+
+from typing import Final
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classes.AnnotationWriter import AnnotationWriter
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from pipeline import IMAGE_EXTENSIONS, process_image
+
+MODES: Final[tuple[str, ...]] = ("none", "blocking", "background", "preview")
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--folder", default="./images")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue", type=int, default=64)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    image_paths: list[str] = [
+        os.path.join(arguments.folder, filename)
+        for filename in sorted(os.listdir(arguments.folder))
+        if filename.endswith(IMAGE_EXTENSIONS)
+    ] * arguments.repeat
+
+    parameters: Parameters = Parameters()
+    output: str = tempfile.mkdtemp(prefix="annotation_")
+    print(f"{'mode':<12}{'image ms':>10}{'total ms':>10}{'written':>9}{'dropped':>9}")
+    try:
+        for mode in MODES:
+            writer: AnnotationWriter = AnnotationWriter(
+                output,
+                parameters,
+                workers=arguments.workers,
+                max_queue=arguments.queue,
+            )
+            start: float = time.perf_counter()
+            for image_path in image_paths:
+                result: InspectionResult = process_image(
+                    image_path,
+                    parameters,
+                    preview_scale=writer.scale if mode == "preview" else None,
+                )
+                if mode == "blocking":
+                    writer._write(result, image_path, None)
+                elif mode != "none":
+                    writer.submit(result, image_path)
+            # The inspection loop is done, the writer may still be busy
+            image_ms: float = 1000 * (time.perf_counter() - start) / len(image_paths)
+            writer.close()
+            total_ms: float = 1000 * (time.perf_counter() - start)
+            print(
+                f"{mode:<12}{image_ms:>10.1f}{total_ms:>10.0f}"
+                f"{writer.written:>9}{writer.dropped:>9}"
+            )
+            shutil.rmtree(output)
+            os.makedirs(output)
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
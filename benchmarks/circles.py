@@ -0,0 +1,127 @@
+"""
+Compares the adaptive coarse to fine circle detection with the full resolution one.
+
+Both detectors run on the blurred crops of the sample images and of synthetic boards of
+several sizes, hole sizes and hole counts. Agreement means the same outcome (no circle,
+one circle, several circles) and, for one circle, centers and radii within --tolerance
+pixels.
+
+Usage:
+    python benchmarks/circles.py [--folder ./images] [--tolerance 3] [--repeat 10]
+"""
+
+from typing import Callable
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.synthetic import make_board
+from classes.Image import Image
+from classes.Parameters import Parameters
+from classes.Rectangle import Rectangle
+from loader import load_image
+from pipeline import (
+    IMAGE_EXTENSIONS,
+    blur_image,
+    crop_white_rectangle,
+    find_white_rectangle,
+    get_circles,
+    get_circles_adaptive,
+    resize_image,
+)
+
+
+def blurred_crop(image: np.ndarray, parameters: Parameters) -> Image:
+    opened_image: Image = resize_image(image, parameters.max_dimension)
+    white_rectangle: Rectangle = find_white_rectangle(opened_image, parameters.threshold)
+    white_rectangle_image: Image = crop_white_rectangle(
+        opened_image, white_rectangle, parameters
+    )[0]
+    blur_image(white_rectangle_image, parameters)
+    return white_rectangle_image
+
+
+def synthetic_images() -> list[tuple[str, np.ndarray]]:
+    images: list[tuple[str, np.ndarray]] = []
+    for board_width in (400, 700, 1000):
+        for radius_ratio in (0.03, 0.05, 0.08):
+            for holes in (
+                (),
+                ((0.15, 0.5, radius_ratio),),
+                ((0.15, 0.3, radius_ratio), (0.8, 0.7, radius_ratio)),
+            ):
+                name: str = f"synthetic w={board_width} r={radius_ratio} holes={len(holes)}"
+                image: np.ndarray = make_board(
+                    frame_size=(1200, 900),
+                    board_size=(board_width, int(board_width * 0.7)),
+                    angle=12,
+                    holes=holes,
+                    seed=len(images),
+                )[0]
+                images.append((name, image))
+    return images
+
+
+def timed(detector: Callable, repeat: int) -> tuple[np.ndarray, float]:
+    start: float = time.perf_counter()
+    for _ in range(repeat):
+        circles: np.ndarray = detector()
+    return circles, 1000 * (time.perf_counter() - start) / repeat
+
+
+def agree(full: np.ndarray, adaptive: np.ndarray, tolerance: int) -> bool:
+    if full is None or adaptive is None:
+        return full is None and adaptive is None
+    if len(full) > 1 or len(adaptive) > 1:
+        return len(full) > 1 and len(adaptive) > 1
+    return bool(np.abs(full[0] - adaptive[0]).max() <= tolerance)
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--folder", default="./images")
+    parser.add_argument("--tolerance", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=10)
+    arguments: argparse.Namespace = parser.parse_args()
+    parameters: Parameters = Parameters()
+
+    images: list[tuple[str, np.ndarray]] = [
+        (filename, load_image(os.path.join(arguments.folder, filename), 800))
+        for filename in sorted(os.listdir(arguments.folder))
+        if filename.endswith(IMAGE_EXTENSIONS)
+    ] + synthetic_images()
+
+    full_total_ms: float = 0.0
+    adaptive_total_ms: float = 0.0
+    agreements: int = 0
+    for name, image in images:
+        white_rectangle_image: Image = blurred_crop(image, parameters)
+        full, full_ms = timed(
+            lambda: get_circles(white_rectangle_image, parameters), arguments.repeat
+        )
+        adaptive, adaptive_ms = timed(
+            lambda: get_circles_adaptive(white_rectangle_image, parameters, 2),
+            arguments.repeat,
+        )
+        agreed: bool = agree(full, adaptive, arguments.tolerance)
+        full_total_ms += full_ms
+        adaptive_total_ms += adaptive_ms
+        agreements += agreed
+        print(
+            f"{'OK  ' if agreed else 'DIFF'} {name:<40} full {full_ms:6.2f} ms"
+            f"  adaptive {adaptive_ms:6.2f} ms  {0 if full is None else len(full)}"
+            f" / {0 if adaptive is None else len(adaptive)} circles"
+        )
+    print(
+        f"agreement {agreements}/{len(images)}, mean full {full_total_ms / len(images):.2f}"
+        f" ms, mean adaptive {adaptive_total_ms / len(images):.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Measures boards with a grid of holes, from 4 to 49 holes, against their reference.
+
+The reference is the upright board; the inspected boards are the same board rotated
+either way, the same board with one hole missing and the same board with one hole
+moved. The time of the measurement and of the matching of every hole, measure_holes and
+match_holes, is compared with measuring and matching the holes one by one.
+
+Usage:
+    python benchmarks/holes.py [--repeat 200]
+"""
+
+from typing import Final
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.synthetic import make_board
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from measurement import match_holes, measure_boards, measure_holes
+from pipeline import compare_holes, inspect_image
+
+FRAME_SIZE: Final[tuple[int, int]] = (1600, 1200)
+BOARD_SIZE: Final[tuple[int, int]] = (1000, 640)
+GRIDS: Final[tuple[tuple[int, int], ...]] = ((2, 2), (3, 3), (4, 4), (5, 5), (7, 7))
+HOLE_RADIUS: Final[float] = 0.025  # Fraction of the short side
+# Turned the other way, the top left corner of the board is another corner of its box
+ANGLES: Final[tuple[float, ...]] = (12.0, -10.0)
+MOVE: Final[float] = 0.05  # Fraction of the board width
+
+
+def grid(columns: int, rows: int) -> list[tuple[float, float, float]]:
+    return [
+        ((column + 1) / (columns + 1), (row + 1) / (rows + 1), HOLE_RADIUS)
+        for row in range(rows)
+        for column in range(columns)
+    ]
+
+
+def one_by_one(
+    corners: np.ndarray, circles: np.ndarray, reference_pattern: np.ndarray
+) -> None:
+    # Each hole measured alone, then paired with its nearest reference hole
+    for circle in circles:
+        measurements: dict[str, np.ndarray] = measure_boards(
+            corners[np.newaxis], circle[np.newaxis]
+        )
+        position: np.ndarray = np.array(
+            (measurements["circle_from_left"][0], measurements["circle_from_top"][0])
+        ) / measurements["long_side"][0]
+        min(
+            range(len(reference_pattern)),
+            key=lambda index: np.hypot(*(reference_pattern[index, :2] - position)),
+        )
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    parameters: Parameters = Parameters()
+    parameters.multiple_holes = True
+    parameters.hough_min_dist = 15
+    print(
+        f"{'holes':>6}{'found':>7}"
+        + "".join(f"{f'{angle:g} deg':>9}" for angle in ANGLES)
+        + f"{'missing':>9}{'moved':>7}"
+        f"{'batch ms':>10}{'one by one ms':>15}"
+    )
+    for columns, rows in GRIDS:
+        holes: list[tuple[float, float, float]] = grid(columns, rows)
+        reference: InspectionResult = inspect_image(
+            make_board(FRAME_SIZE, BOARD_SIZE, 0, holes)[0], parameters
+        )
+        moved: list[tuple[float, float, float]] = list(holes)
+        moved[0] = (holes[0][0] + MOVE, holes[0][1], holes[0][2])
+        errors: list[str] = []
+        cases: list[tuple[list, float]] = [(holes, angle) for angle in ANGLES]
+        for case, angle in cases + [(holes[1:], 0), (moved, 0)]:
+            result: InspectionResult = inspect_image(
+                make_board(FRAME_SIZE, BOARD_SIZE, angle, case, seed=1)[0], parameters
+            )
+            if result.status != InspectionResult.OK:
+                errors.append(result.status)
+                continue
+            result.verdict = InspectionResult.IDENTICAL
+            compare_holes(
+                result,
+                reference.hole_pattern,
+                parameters.hole_margin,
+                parameters.hole_diameter_margin,
+            )
+            errors.append(str(result.hole_errors))
+
+        start: float = time.perf_counter()
+        for _ in range(arguments.repeat):
+            pattern: np.ndarray = measure_holes(
+                reference.board_corners, reference.circles
+            )["pattern"]
+            match_holes(pattern, reference.hole_pattern, 1 / reference.ratio)
+        batch_ms: float = 1000 * (time.perf_counter() - start) / arguments.repeat
+        start = time.perf_counter()
+        for _ in range(arguments.repeat):
+            one_by_one(
+                reference.board_corners, reference.circles, reference.hole_pattern
+            )
+        loop_ms: float = 1000 * (time.perf_counter() - start) / arguments.repeat
+        found: int = 0 if reference.circles is None else len(reference.circles)
+        print(
+            f"{len(holes):>6}{found:>7}"
+            + "".join(f"{error:>9}" for error in errors[: len(ANGLES)])
+            + f"{errors[-2]:>9}{errors[-1]:>7}"
+            f"{batch_ms:>10.3f}{loop_ms:>15.3f}"
+        )
+    print(
+        "\nThe error columns count the holes out of tolerance, "
+        + "0 " * len(ANGLES)
+        + "1 1 is expected."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Compares the full resolution decode with the reduced decode of loader.load_image, and
+with raw frames memory mapped by loader.load_raw_frame (the images are converted to raw
+frame files in a temporary folder first).
+
+Each mode runs in its own process so the peak RSS of one does not hide the other. The
+ratios measured on the images of every mode must agree with those of the full decode.
+
+Usage:
+    python benchmarks/loading.py [--folder ./images] [--repeat 5]
+"""
+
+from typing import Final
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2 as cv
+
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from loader import RAW_EXTENSION, load_image, load_raw_frame, write_raw_frames
+from pipeline import IMAGE_EXTENSIONS, process_image
+
+MODES: Final[tuple[str, ...]] = ("full", "reduced", "raw")
+# Accepted relative gap between the ratios of the same image decoded two ways
+RATIO_TOLERANCE: Final[float] = 0.005
+
+
+def run_mode(mode: str, image_paths: list[str], repeat: int) -> dict:
+    parameters: Parameters = Parameters()
+    parameters.reduced_decode = mode == "reduced"
+    rss_before_kb: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    decode_seconds: float = 0.0
+    for _ in range(repeat):
+        for image_path in image_paths:
+            start: float = time.perf_counter()
+            if mode == "raw":
+                load_raw_frame(image_path)
+            elif parameters.reduced_decode:
+                load_image(image_path, parameters.max_dimension, grayscale=True)
+            else:
+                cv.imread(image_path)
+            decode_seconds += time.perf_counter() - start
+
+    pipeline_seconds: float = 0.0
+    ratios: dict[str, float] = {}
+    for _ in range(repeat):
+        for image_path in image_paths:
+            start = time.perf_counter()
+            result: InspectionResult = process_image(image_path, parameters)
+            pipeline_seconds += time.perf_counter() - start
+            # Raw frame files are named after their image
+            ratios[os.path.basename(image_path).removesuffix(RAW_EXTENSION)] = (
+                result.ratio
+            )
+
+    count: int = repeat * len(image_paths)
+    return {
+        "mode": mode,
+        "decode_ms": 1000 * decode_seconds / count,
+        "pipeline_ms": 1000 * pipeline_seconds / count,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_rss_delta_mb": (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before_kb
+        )
+        / 1024,
+        "ratios": ratios,
+    }
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--folder", default="./images")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--convert", help=argparse.SUPPRESS)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    image_paths: list[str] = [
+        os.path.join(arguments.folder, filename)
+        for filename in sorted(os.listdir(arguments.folder))
+        if filename.endswith(IMAGE_EXTENSIONS)
+    ]
+    if arguments.mode is not None:
+        print(json.dumps(run_mode(arguments.mode, image_paths, arguments.repeat)))
+        return
+    if arguments.convert is not None:
+        for image_path in image_paths:
+            write_raw_frames(
+                os.path.join(
+                    arguments.convert, os.path.basename(image_path) + RAW_EXTENSION
+                ),
+                [cv.imread(image_path)],
+            )
+        return
+
+    # Converted in another process, a child starts with the peak RSS of its parent
+    raw_folder: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+    subprocess.run(
+        [sys.executable, __file__, "--folder", arguments.folder]
+        + ["--convert", raw_folder.name],
+        check=True,
+    )
+
+    print(
+        f"{'mode':<10}{'decode ms':>12}{'pipeline ms':>14}{'peak RSS MB':>14}{'delta MB':>11}"
+    )
+    ratios: dict[str, dict[str, float]] = {}
+    for mode in MODES:
+        output: str = subprocess.run(
+            [sys.executable, __file__, "--mode", mode]
+            + ["--folder", raw_folder.name if mode == "raw" else arguments.folder]
+            + ["--repeat", str(arguments.repeat)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        figures: dict = json.loads(output.splitlines()[-1])
+        print(
+            f"{figures['mode']:<10}{figures['decode_ms']:>12.1f}"
+            f"{figures['pipeline_ms']:>14.1f}{figures['peak_rss_mb']:>14.1f}"
+            f"{figures['peak_rss_delta_mb']:>11.1f}"
+        )
+        ratios[mode] = figures["ratios"]
+    raw_folder.cleanup()
+
+    for mode in MODES[1:]:
+        for filename, ratio in ratios["full"].items():
+            other: float = ratios[mode][filename]
+            if ratio is None and other is None:
+                continue
+            agree: bool = (
+                ratio is not None
+                and other is not None
+                and abs(other / ratio - 1) <= RATIO_TOLERANCE
+            )
+            print(
+                f"{'OK  ' if agree else 'DIFF'} {mode:<8} {filename:<40} "
+                f"ratio {other} full {ratio}"
+            )
+
+
+if __name__ == "__main__":
+    main()
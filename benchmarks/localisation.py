@@ -0,0 +1,128 @@
+"""
+Compares the connected components localisation of the board with the full image
+contour search, on the sample images and on synthetic boards with increasing noise.
+
+Both run on the resized gray image. Agreement means the same board bounding box, within
+--tolerance pixels; the time covers the threshold and the contour search.
+
+Usage:
+    python benchmarks/localisation.py [--folder ./images] [--tolerance 1] [--repeat 20]
+"""
+
+from typing import Callable, Final
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.synthetic import make_board
+from classes.Image import Image
+from classes.Parameters import Parameters
+from classes.Rectangle import Rectangle
+from loader import load_image
+from pipeline import (
+    IMAGE_EXTENSIONS,
+    find_board_component,
+    find_white_rectangle,
+    resize_image,
+)
+
+# Drawn at the pipeline resolution, the resize would average the noise away
+FRAME_SIZE: Final[tuple[int, int]] = (800, 600)
+BOARD_SIZE: Final[tuple[int, int]] = (440, 300)
+NOISES: Final[tuple[float, ...]] = (0, 20, 40, 60, 80)
+ANGLES: Final[tuple[float, ...]] = (0, 15, 40)
+
+
+def time_search(
+    search: Callable[[Image], Rectangle], opened_image: Image, repeat: int
+) -> tuple[Rectangle, float]:
+    start: float = time.perf_counter()
+    for _ in range(repeat):
+        rectangle: Rectangle = search(opened_image)
+    return rectangle, 1000 * (time.perf_counter() - start) / repeat
+
+
+def same_box(first: Rectangle, second: Rectangle, tolerance: int) -> bool:
+    if first is None or second is None:
+        return first is second
+    return bool(
+        np.all(np.abs(np.subtract(first.coord, second.coord)) <= tolerance)
+        and np.all(np.abs(np.subtract(first.size, second.size)) <= tolerance)
+    )
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--folder", default="./images")
+    parser.add_argument("--tolerance", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--scale", type=int, default=Parameters().component_scale)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    parameters: Parameters = Parameters()
+    parameters.component_scale = arguments.scale
+    images: list[tuple[str, np.ndarray]] = [
+        (
+            filename,
+            load_image(os.path.join(arguments.folder, filename), parameters.max_dimension),
+        )
+        for filename in sorted(os.listdir(arguments.folder))
+        if filename.endswith(IMAGE_EXTENSIONS)
+    ]
+    for noise in NOISES:
+        for angle in ANGLES:
+            images.append(
+                (
+                    f"synthetic noise={noise:g} angle={angle:g}",
+                    make_board(
+                        FRAME_SIZE,
+                        BOARD_SIZE,
+                        angle,
+                        seed=int(noise + angle),
+                        noise=noise,
+                    )[0],
+                )
+            )
+
+    print(
+        f"{'image':<36}{'contours':>10}{'contour ms':>12}{'component ms':>14}"
+        f"{'speedup':>9}{'agree':>7}"
+    )
+    agreements: int = 0
+    contour_total: float = 0
+    component_total: float = 0
+    for name, image in images:
+        opened_image: Image = resize_image(image, parameters.max_dimension)
+        reference, contour_ms = time_search(
+            lambda opened: find_white_rectangle(opened, parameters.threshold),
+            opened_image,
+            arguments.repeat,
+        )
+        candidate, component_ms = time_search(
+            lambda opened: find_board_component(opened, parameters),
+            opened_image,
+            arguments.repeat,
+        )
+        agree: bool = same_box(reference, candidate, arguments.tolerance)
+        agreements += agree
+        contour_total += contour_ms
+        component_total += component_ms
+        print(
+            f"{name:<36}{len(reference.contours) if reference else 0:>10}"
+            f"{contour_ms:>12.2f}{component_ms:>14.2f}"
+            f"{contour_ms / component_ms:>8.2f}x{'yes' if agree else 'NO':>7}"
+        )
+    print(
+        f"\n{agreements}/{len(images)} agree, "
+        f"{contour_total / len(images):.2f} ms -> {component_total / len(images):.2f} ms "
+        f"per image"
+    )
+
+
+if __name__ == "__main__":
+    main()
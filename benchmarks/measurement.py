@@ -0,0 +1,120 @@
+"""
+Measures the precision of the board ratio and of the hole position on synthetic boards
+of known size, rotated and noisy, and the time of the batch measurements.
+
+The ratio of the sub-pixel corners is compared with the ratio of the bounding box of
+the board, which was measured before; the hole position is the distance from the top
+left corner of the board, in pixels of the resized image. The measurements of every
+board are also taken again with its corners starting at another one, they must not
+change.
+
+Usage:
+    python benchmarks/measurement.py [--batch 10000]
+"""
+
+from typing import Final
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.synthetic import make_board
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from measurement import measure_boards
+from pipeline import inspect_image
+
+FRAME_SIZE: Final[tuple[int, int]] = (1600, 1200)
+BOARD_SIZE: Final[tuple[int, int]] = (900, 600)
+HOLE: Final[tuple[float, float, float]] = (0.15, 0.4, 0.05)
+ANGLES: Final[tuple[float, ...]] = (-10, 0, 3, 8, 15, 25, 40)
+NOISES: Final[tuple[float, ...]] = (0, 12)
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=10000)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    parameters: Parameters = Parameters()
+    scale: float = parameters.max_dimension / max(FRAME_SIZE)
+    ratio: float = max(BOARD_SIZE) / min(BOARD_SIZE)
+    hole: np.ndarray = np.multiply(HOLE[:2], BOARD_SIZE) * scale
+    print(
+        f"{'noise':>6}{'angle':>7}{'box ratio err':>15}{'ratio err':>11}"
+        f"{'hole err px':>13}"
+    )
+    box_errors: list[float] = []
+    errors: list[float] = []
+    order_gap: float = 0.0
+    for noise in NOISES:
+        for angle in ANGLES:
+            image, _ = make_board(
+                FRAME_SIZE, BOARD_SIZE, angle, (HOLE,), seed=abs(int(angle)), noise=noise
+            )
+            result: InspectionResult = inspect_image(image, parameters)
+            if result.status != InspectionResult.OK:
+                print(f"{noise:>6g}{angle:>7g}  {result.status}")
+                continue
+            width, height = result.rectangle_size
+            box_error: float = abs(max(width, height) / min(width, height) / ratio - 1)
+            error: float = abs(result.ratio / ratio - 1)
+            box_errors.append(box_error)
+            errors.append(error)
+            # Which corner comes first depends on the rotation of the board
+            measured: dict[str, np.ndarray] = measure_boards(
+                result.board_corners[np.newaxis], result.circles[:1]
+            )
+            for shift in (1, 2, 3):
+                rolled: dict[str, np.ndarray] = measure_boards(
+                    np.roll(result.board_corners, shift, axis=0)[np.newaxis],
+                    result.circles[:1],
+                )
+                order_gap = max(
+                    order_gap,
+                    *(np.abs(rolled[name] - measured[name]).max() for name in measured),
+                )
+            # A portrait crop is the board turned a quarter, its holes are elsewhere
+            landscape: bool = np.ptp(result.board_corners[:, 0]) > np.ptp(
+                result.board_corners[:, 1]
+            )
+            distance: float = np.hypot(
+                result.circle_from_left - hole[0], result.circle_from_top - hole[1]
+            )
+            hole_error: str = f"{distance:.2f}" if landscape else "-"
+            print(
+                f"{noise:>6g}{angle:>7g}{100 * box_error:>14.2f}%{100 * error:>10.2f}%"
+                f"{hole_error:>13}"
+            )
+    print(
+        f"\nmax ratio error: bounding box {100 * max(box_errors):.2f}%, "
+        f"corners {100 * max(errors):.2f}%"
+    )
+    print(
+        f"{'OK  ' if order_gap < 1e-6 else 'DIFF'} largest change of a measurement "
+        f"with the corners in another order: {order_gap:.2g}"
+    )
+
+    # The measurements of a batch of boards, in one call or one call per board
+    generator: np.random.Generator = np.random.default_rng(0)
+    corners: np.ndarray = generator.uniform(0, 800, (arguments.batch, 4, 2))
+    circles: np.ndarray = generator.uniform(0, 50, (arguments.batch, 3))
+    start: float = time.perf_counter()
+    measure_boards(corners, circles)
+    batch_ms: float = 1000 * (time.perf_counter() - start)
+    start = time.perf_counter()
+    for index in range(arguments.batch):
+        measure_boards(corners[index : index + 1], circles[index : index + 1])
+    loop_ms: float = 1000 * (time.perf_counter() - start)
+    print(
+        f"{arguments.batch} boards: one call {batch_ms:.2f} ms, "
+        f"one call per board {loop_ms:.2f} ms ({loop_ms / batch_ms:.0f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Measures the memory of one worker with and without the per-worker scratch buffers.
+
+Each mode runs in its own process, like a worker of the pool, and inspects the images
+--repeat times. It reports the peak RSS, the RSS growth after the first round, and the
+largest traced allocation peak of one image in steady state: with scratch buffers only
+the decode and small outputs such as contours are left.
+
+Usage:
+    python benchmarks/memory.py [--folder ./images] [--repeat 20]
+"""
+
+from typing import Final
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classes.Parameters import Parameters
+from classes.ScratchBuffers import ScratchBuffers
+from pipeline import IMAGE_EXTENSIONS, process_image
+
+MODES: Final[tuple[str, ...]] = ("allocate", "scratch")
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm", encoding="ascii") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+
+
+def run_mode(mode: str, image_paths: list[str], repeat: int) -> dict:
+    parameters: Parameters = Parameters()
+    buffers: ScratchBuffers = ScratchBuffers() if mode == "scratch" else None
+
+    start: float = time.perf_counter()
+    for image_path in image_paths:
+        process_image(image_path, parameters, buffers=buffers)
+    warm_rss_mb: float = current_rss_mb()
+    for _ in range(repeat - 1):
+        for image_path in image_paths:
+            process_image(image_path, parameters, buffers=buffers)
+    elapsed: float = time.perf_counter() - start
+    final_rss_mb: float = current_rss_mb()
+
+    # Traced after the timing, tracing slows every allocation down
+    tracemalloc.start()
+    image_peak_bytes: int = 0
+    for image_path in image_paths:
+        tracemalloc.reset_peak()
+        before: int = tracemalloc.get_traced_memory()[0]
+        process_image(image_path, parameters, buffers=buffers)
+        image_peak_bytes = max(
+            image_peak_bytes, tracemalloc.get_traced_memory()[1] - before
+        )
+    tracemalloc.stop()
+
+    return {
+        "mode": mode,
+        "image_ms": 1000 * elapsed / (repeat * len(image_paths)),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rss_growth_mb": final_rss_mb - warm_rss_mb,
+        "image_peak_kb": image_peak_bytes / 1024,
+        "scratch_kb": 0 if buffers is None else buffers.nbytes / 1024,
+    }
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--folder", default="./images")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    image_paths: list[str] = [
+        os.path.join(arguments.folder, filename)
+        for filename in sorted(os.listdir(arguments.folder))
+        if filename.endswith(IMAGE_EXTENSIONS)
+    ]
+    if arguments.mode is not None:
+        print(json.dumps(run_mode(arguments.mode, image_paths, arguments.repeat)))
+        return
+
+    print(
+        f"{'mode':<10}{'image ms':>10}{'peak RSS MB':>13}{'growth MB':>11}"
+        f"{'image peak KB':>15}{'scratch KB':>12}"
+    )
+    for mode in MODES:
+        output: str = subprocess.run(
+            [sys.executable, __file__, "--mode", mode]
+            + ["--folder", arguments.folder, "--repeat", str(arguments.repeat)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        figures: dict = json.loads(output.splitlines()[-1])
+        print(
+            f"{figures['mode']:<10}{figures['image_ms']:>10.1f}"
+            f"{figures['peak_rss_mb']:>13.1f}{figures['rss_growth_mb']:>11.1f}"
+            f"{figures['image_peak_kb']:>15.0f}{figures['scratch_kb']:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
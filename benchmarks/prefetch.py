@@ -0,0 +1,107 @@
+"""
+Measures how much of the storage latency the Prefetcher hides behind the computation.
+
+The files are read with --latency milliseconds added to every open, like a network
+mount, then processed for several prefetch depths; depth 0 reads each file only when
+its turn comes. Each depth runs in the current process, one file after the other, then
+across a pool of --workers processes in chunks of --chunk-size files, as the command
+line does by default. Each run is without result cache, then with a new empty result
+cache, as the command line does by default: every file is new to it and hashed. The
+files are copies made unique by a trailing byte.
+
+Usage:
+    python benchmarks/prefetch.py [--folder ./images] [--latency 50] [--repeat 5]
+"""
+
+from typing import Final
+import argparse
+import builtins
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import classes.Prefetcher
+import loader
+from classes.BatchInspector import BatchInspector
+from classes.Parameters import Parameters
+from classes.Prefetcher import read_file
+from pipeline import IMAGE_EXTENSIONS
+
+DEPTHS: Final[tuple[int, ...]] = (0, 1, 2, 4, 8)
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--folder", default="./images")
+    parser.add_argument("--latency", type=float, default=50.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-mb", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--chunk-size", type=int, default=4)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    sources: list[str] = [
+        os.path.join(arguments.folder, filename)
+        for filename in sorted(os.listdir(arguments.folder))
+        if filename.endswith(IMAGE_EXTENSIONS)
+    ]
+
+    def slow_open(path: str, *args, **kwargs):
+        time.sleep(arguments.latency / 1000)
+        return builtins.open(path, *args, **kwargs)
+
+    parameters: Parameters = Parameters()
+    print(f"{'depth':<8}{'mode':<8}{'cache':<7}{'image ms':>10}{'speedup':>10}")
+    sequential_ms: dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as folder:
+        image_paths: list[str] = []
+        for index in range(arguments.repeat):
+            for source in sources:
+                name, extension = os.path.splitext(os.path.basename(source))
+                image_path: str = os.path.join(folder, f"{name}_{index}{extension}")
+                with open(image_path, "wb") as file:
+                    file.write(read_file(source) + bytes((index,)))
+                image_paths.append(image_path)
+
+        # The reads of the Prefetcher, the header checks and the hash of the files;
+        # the workers of the pool are forked with the same latency
+        classes.Prefetcher.open = slow_open
+        loader.open = slow_open
+        try:
+            for depth in DEPTHS:
+                for workers in (1, arguments.workers):
+                    for cached in (False, True):
+                        inspector: BatchInspector = BatchInspector(
+                            parameters,
+                            workers=workers,
+                            chunk_size=arguments.chunk_size,
+                            cache_path=(
+                                os.path.join(folder, f"cache_{depth}_{workers}.sqlite")
+                                if cached
+                                else None
+                            ),
+                            prefetch_depth=depth,
+                            prefetch_max_bytes=arguments.max_mb * 1024 * 1024,
+                        )
+                        start: float = time.perf_counter()
+                        for _ in inspector.run(image_paths):
+                            pass
+                        image_ms: float = (
+                            1000 * (time.perf_counter() - start) / len(image_paths)
+                        )
+                        mode: str = "inline" if workers == 1 else "pool"
+                        sequential_ms.setdefault(mode, image_ms)
+                        print(
+                            f"{depth:<8}{mode:<8}{'on' if cached else 'off':<7}"
+                            f"{image_ms:>10.1f}{sequential_ms[mode] / image_ms:>9.2f}x"
+                        )
+        finally:
+            del classes.Prefetcher.open
+            del loader.open
+
+
+if __name__ == "__main__":
+    main()
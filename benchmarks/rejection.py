@@ -0,0 +1,136 @@
+"""
+Measures how fast hopeless images are rejected by the cheap checks, compared with
+running them through the whole pipeline with the image checks disabled. The file checks
+cannot be disabled, a file that is not an image is never decoded.
+
+Each kind of bad image is written --count times to a temporary folder: dark frames
+without a board, overexposed frames, boards too small or too elongated, and files that
+are empty or not images at all. Correct boards are timed too, the checks must not slow
+them down.
+
+Usage:
+    python benchmarks/rejection.py [--count 20] [--repeat 3]
+"""
+
+from typing import Callable, Final
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2 as cv
+import numpy as np
+
+from benchmarks.synthetic import make_board
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from pipeline import process_image
+
+FRAME_SIZE: Final[tuple[int, int]] = (1600, 1200)
+
+
+def dark_frame(seed: int) -> np.ndarray:
+    generator: np.random.Generator = np.random.default_rng(seed)
+    return generator.integers(0, 90, (FRAME_SIZE[1], FRAME_SIZE[0], 3), np.uint8)
+
+
+def bright_frame(seed: int) -> np.ndarray:
+    generator: np.random.Generator = np.random.default_rng(seed)
+    return generator.integers(180, 256, (FRAME_SIZE[1], FRAME_SIZE[0], 3), np.uint8)
+
+
+KINDS: Final[dict[str, Callable[[int], np.ndarray]]] = {
+    "good": lambda seed: make_board(FRAME_SIZE, (900, 600), 5, seed=seed, noise=8)[0],
+    "dark": dark_frame,
+    "bright": bright_frame,
+    "small board": lambda seed: make_board(FRAME_SIZE, (150, 100), 5, seed=seed)[0],
+    "strip": lambda seed: make_board(FRAME_SIZE, (1400, 120), 2, (), seed=seed)[0],
+}
+FILES: Final[dict[str, Callable[[int], bytes]]] = {
+    "empty file": lambda seed: b"",
+    "not an image": lambda seed: np.random.default_rng(seed).bytes(200_000),
+}
+
+
+def without_checks() -> Parameters:
+    parameters: Parameters = Parameters()
+    parameters.min_bright_fraction = 0.0
+    parameters.max_bright_fraction = 1.0
+    parameters.min_board_fraction = 0.0
+    parameters.max_board_aspect = math.inf
+    return parameters
+
+
+def time_paths(
+    paths: list[str], parameters: Parameters, repeat: int
+) -> tuple[float, float, list[InspectionResult]]:
+    start: float = time.perf_counter()
+    for _ in range(repeat):
+        results: list[InspectionResult] = [
+            process_image(path, parameters) for path in paths
+        ]
+    image_ms: float = 1000 * (time.perf_counter() - start) / (repeat * len(paths))
+    # The decode is the same with or without the checks, once the file is accepted
+    after_decode_ms: float = (
+        1000
+        * sum(
+            sum(result.timings.values()) - result.timings.get("decode", 0)
+            for result in results
+        )
+        / len(results)
+    )
+    return image_ms, after_decode_ms, results
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    print(
+        f"{'':<14}{'whole image ms':>24}{'after decode ms':>24}\n"
+        f"{'kind':<14}{'checked':>12}{'unchecked':>12}{'checked':>12}{'unchecked':>12}"
+        f"{'speedup':>9}  outcome with checks"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for kind, make in {**KINDS, **FILES}.items():
+            paths: list[str] = []
+            for seed in range(arguments.count):
+                path: str = os.path.join(directory, f"{kind}_{seed}.jpg")
+                if kind in FILES:
+                    with open(path, "wb") as file:
+                        file.write(make(seed))
+                else:
+                    cv.imwrite(path, make(seed))
+                paths.append(path)
+
+            time_paths(paths, Parameters(), 1)  # Warm up the page cache
+            checked_ms, checked_after_ms, results = time_paths(
+                paths, Parameters(), arguments.repeat
+            )
+            unchecked_ms, unchecked_after_ms, _ = time_paths(
+                paths, without_checks(), arguments.repeat
+            )
+            outcomes: dict[str, int] = {}
+            for result in results:
+                outcome: str = result.rejection or result.status
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            print(
+                f"{kind:<14}{checked_ms:>12.2f}{unchecked_ms:>12.2f}"
+                f"{checked_after_ms:>12.2f}{unchecked_after_ms:>12.2f}"
+                + (
+                    f"{unchecked_after_ms / checked_after_ms:>8.1f}x  "
+                    if kind not in FILES
+                    else f"{'-':>9}  "  # Never decoded, nothing runs after
+                )
+                + ", ".join(f"{count} {outcome}" for outcome, count in outcomes.items())
+            )
+
+
+if __name__ == "__main__":
+    main()
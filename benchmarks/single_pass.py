@@ -0,0 +1,98 @@
+"""
+Regression check of the single pass rectangle extraction against the two pass one.
+
+The rotated rectangle coord/size and the circles found by both paths must stay within
+--tolerance pixels, the script exits with status 1 otherwise. Timings of both paths are
+printed as well.
+
+Usage:
+    python benchmarks/single_pass.py [--folder ./images] [--tolerance 2] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from loader import load_image
+from pipeline import IMAGE_EXTENSIONS, inspect_image
+
+
+def inspect(
+    image: np.ndarray, single_pass: bool, repeat: int
+) -> tuple[InspectionResult, float]:
+    parameters: Parameters = Parameters()
+    parameters.single_pass = single_pass
+    start: float = time.perf_counter()
+    for _ in range(repeat):
+        result: InspectionResult = inspect_image(image, parameters)
+    return result, 1000 * (time.perf_counter() - start) / repeat
+
+
+def differences(
+    two_pass: InspectionResult, single_pass: InspectionResult
+) -> dict[str, int]:
+    # A None gap means the two paths do not even agree on what they found
+    if two_pass.status != single_pass.status:
+        return {"status": None}
+    gaps: dict[str, int] = {
+        name: int(
+            np.abs(np.subtract(getattr(two_pass, name), getattr(single_pass, name))).max()
+        )
+        for name in ("rotated_rectangle_coord", "rotated_rectangle_size")
+    }
+    if two_pass.circles is None or single_pass.circles is None:
+        if (two_pass.circles is None) != (single_pass.circles is None):
+            gaps["circles"] = None
+    elif len(two_pass.circles) != len(single_pass.circles):
+        gaps["circles"] = None
+    else:
+        gaps["circles"] = int(
+            np.abs(
+                np.sort(two_pass.circles, axis=0) - np.sort(single_pass.circles, axis=0)
+            ).max()
+        )
+    return gaps
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--folder", default="./images")
+    parser.add_argument("--tolerance", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    failed: bool = False
+    for filename in sorted(os.listdir(arguments.folder)):
+        if not filename.endswith(IMAGE_EXTENSIONS):
+            continue
+        image: np.ndarray = load_image(
+            os.path.join(arguments.folder, filename), Parameters().max_dimension
+        )
+        two_pass, two_pass_ms = inspect(image, False, arguments.repeat)
+        single_pass, single_pass_ms = inspect(image, True, arguments.repeat)
+
+        gaps: dict[str, int] = differences(two_pass, single_pass)
+        ok: bool = all(
+            gap is not None and gap <= arguments.tolerance for gap in gaps.values()
+        )
+        failed = failed or not ok
+        print(
+            f"{'OK  ' if ok else 'FAIL'} {filename:<30} two pass {two_pass_ms:6.1f} ms"
+            f"  single pass {single_pass_ms:6.1f} ms  "
+            + ", ".join(
+                f"{name} {'mismatch' if gap is None else f'{gap}px'}"
+                for name, gap in gaps.items()
+            )
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Benchmark suite on synthetic boards with a known ground truth.
+
+A reproducible set of boards is generated as JPEG files, crossing the image resolution,
+the board rotation, noise, blur and the number of holes (0, 1 or several); board and
+hole sizes are drawn from --seed. The folder pipeline then runs on them in a fresh
+process, followed by Image.findRotation and get_circles alone. The report gives the
+throughput, the p50/p95/p99 time and memory of each stage, the peak RSS, and the
+accuracy against the ground truth, overall and for each value of each factor.
+
+The --output folder also holds labels.json, the labels read by tune_parameters.py.
+
+--save writes the report, --baseline compares the run with a saved one: the script exits
+with status 1 if the throughput dropped by more than --max-slowdown or if any accuracy
+dropped.
+
+Usage:
+    python benchmarks/suite.py [--seed 0] [--workers 1] [--repeat 3]
+        [--output ./synthetic] [--save report.json] [--baseline report.json]
+"""
+
+from typing import Final, Tuple
+import argparse
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2 as cv
+import numpy as np
+
+from benchmarks.circles import blurred_crop
+from benchmarks.synthetic import make_board
+from classes.BatchInspector import BatchInspector
+from classes.Image import Image
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from classes.Rectangle import Rectangle
+from classes.StageStatistics import StageStatistics
+from pipeline import find_white_rectangle, get_circles, resize_image
+
+# =========#
+# FACTORS  #
+# =========#
+RESOLUTIONS: Final[Tuple[Tuple[int, int], ...]] = ((800, 600), (1600, 1200), (3200, 2400))
+ANGLES: Final[Tuple[float, ...]] = (0.0, 8.0, -25.0)
+NOISES: Final[Tuple[float, ...]] = (0.0, 12.0)
+BLURS: Final[Tuple[float, ...]] = (0.0, 2.0)
+HOLE_COUNTS: Final[Tuple[int, ...]] = (0, 1, 3)
+FACTORS: Final[Tuple[str, ...]] = ("resolution", "angle", "noise", "blur", "holes")
+
+JPEG_QUALITY: Final[int] = 95
+CASES_FILENAME: Final[str] = "cases.json"
+LABELS_FILENAME: Final[str] = "labels.json"
+RATIO_TOLERANCE: Final[float] = 0.02  # Relative error
+DIAMETER_TOLERANCE: Final[float] = 3.0  # Pixels of the resized image
+ACCURACIES: Final[Tuple[str, ...]] = ("status", "ratio", "diameter")
+
+
+def generate_cases(seed: int) -> list[dict]:
+    generator: np.random.Generator = np.random.default_rng(seed)
+    cases: list[dict] = []
+    for resolution, angle, noise, blur, hole_count in itertools.product(
+        RESOLUTIONS, ANGLES, NOISES, BLURS, HOLE_COUNTS
+    ):
+        frame_width, frame_height = resolution
+        board_width: int = int(frame_width * generator.uniform(0.45, 0.6))
+        board_height: int = int(board_width / generator.uniform(1.2, 1.8))
+        radius_ratio: float = float(generator.uniform(0.05, 0.09))
+        holes: list[Tuple[float, float, float]] = [
+            (float(x), float(generator.uniform(0.3, 0.7)), radius_ratio)
+            for x in ((0.5,) if hole_count == 1 else np.linspace(0.2, 0.8, hole_count))
+        ]
+        cases.append(
+            {
+                "filename": f"{len(cases):03d}.jpg",
+                "resolution": f"{frame_width}x{frame_height}",
+                "angle": angle,
+                "noise": noise,
+                "blur": blur,
+                "holes": hole_count,
+                "board": {
+                    "frame_size": resolution,
+                    "board_size": (board_width, board_height),
+                    "angle": angle,
+                    "holes": holes,
+                    "seed": len(cases),
+                    "noise": noise,
+                    "blur": blur,
+                },
+            }
+        )
+    return cases
+
+
+def write_cases(cases: list[dict], folder: str) -> None:
+    for case in cases:
+        image, truth = make_board(**case["board"])
+        cv.imwrite(
+            os.path.join(folder, case["filename"]),
+            image,
+            [cv.IMWRITE_JPEG_QUALITY, JPEG_QUALITY],
+        )
+        case["ratio"] = truth["ratio"]
+        case["diameters"] = (2 * truth["holes"][:, 2]).tolist()
+    with open(os.path.join(folder, CASES_FILENAME), "w", encoding="utf-8") as file:
+        json.dump(cases, file)
+    # The same ground truth for tune_parameters.py, only the ratio of single holes
+    with open(os.path.join(folder, LABELS_FILENAME), "w", encoding="utf-8") as file:
+        json.dump(
+            [
+                {
+                    "filename": case["filename"],
+                    "status": expected_status(case),
+                    "ratio": case["ratio"] if case["holes"] == 1 else None,
+                }
+                for case in cases
+            ],
+            file,
+        )
+
+
+def expected_status(case: dict) -> str:
+    if case["holes"] == 0:
+        return InspectionResult.NO_CIRCLE
+    if case["holes"] == 1:
+        return InspectionResult.OK
+    return InspectionResult.MULTIPLE_CIRCLES
+
+
+def check(case: dict, result: InspectionResult, parameters: Parameters) -> dict:
+    """
+    Compares a result with the ground truth of its board.
+
+    Returns:
+        dict: status, ratio and diameter, True or False; ratio and diameter are None
+            when the board has no single hole to measure.
+    """
+
+    checks: dict = {"status": result.status == expected_status(case)}
+    checks["ratio"] = checks["diameter"] = None
+    if case["holes"] == 1:
+        measured: bool = result.status == InspectionResult.OK
+        checks["ratio"] = (
+            measured
+            and abs(result.ratio - case["ratio"]) / case["ratio"] <= RATIO_TOLERANCE
+        )
+        # The pipeline measures on the image resized to max_dimension
+        scale: float = parameters.max_dimension / max(case["board"]["frame_size"])
+        checks["diameter"] = (
+            measured
+            and abs(result.circle_diameter - case["diameters"][0] * scale)
+            <= DIAMETER_TOLERANCE
+        )
+    return checks
+
+
+def accuracy(checks: list[dict]) -> dict[str, float]:
+    rates: dict[str, float] = {}
+    for name in ACCURACIES:
+        values: list[bool] = [check[name] for check in checks if check[name] is not None]
+        rates[name] = sum(values) / len(values) if values else None
+    return rates
+
+
+def time_stages(image_path: str, parameters: Parameters, repeat: int) -> dict:
+    opened_image: Image = resize_image(cv.imread(image_path), parameters.max_dimension)
+    white_rectangle: Rectangle = find_white_rectangle(opened_image, parameters.threshold)
+    if white_rectangle is None:
+        return {}
+
+    timings: dict[str, float] = {}
+    start: float = time.perf_counter()
+    for _ in range(repeat):
+        opened_image.findRotation(white_rectangle)
+    timings["findRotation"] = (time.perf_counter() - start) / repeat
+
+    white_rectangle_image: Image = blurred_crop(
+        resize_image(cv.imread(image_path), parameters.max_dimension).resized_image,
+        parameters,
+    )
+    start = time.perf_counter()
+    for _ in range(repeat):
+        get_circles(white_rectangle_image, parameters)
+    timings["get_circles"] = (time.perf_counter() - start) / repeat
+    return timings
+
+
+def measure(folder: str, workers: int, repeat: int) -> dict:
+    """
+    Runs the pipeline over the generated boards, in the current process.
+
+    Args:
+        folder (str): The folder written by write_cases.
+        workers (int): The worker processes of the pipeline.
+        repeat (int): The runs of each isolated stage, averaged.
+
+    Returns:
+        dict: The report.
+    """
+
+    with open(os.path.join(folder, CASES_FILENAME), encoding="utf-8") as file:
+        cases: list[dict] = json.load(file)
+    parameters: Parameters = Parameters()
+    inspector: BatchInspector = BatchInspector(parameters, workers=workers)
+    statistics: StageStatistics = StageStatistics()
+    checks: list[dict] = []
+
+    start: float = time.perf_counter()
+    for case, result in zip(
+        cases,
+        inspector.run(os.path.join(folder, case["filename"]) for case in cases),
+    ):
+        statistics.add(result)
+        checks.append(check(case, result, parameters))
+    elapsed: float = time.perf_counter() - start
+
+    stage_seconds: dict[str, list[float]] = {}
+    for case in cases:
+        for stage, seconds in time_stages(
+            os.path.join(folder, case["filename"]), parameters, repeat
+        ).items():
+            stage_seconds.setdefault(stage, []).append(seconds)
+
+    return {
+        "images": len(cases),
+        "images_per_second": len(cases) / elapsed,
+        # Children are the worker processes, only counted once they exited
+        "peak_rss_mb": max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        )
+        / 1024,
+        "accuracy": accuracy(checks),
+        "accuracy_by_factor": {
+            factor: {
+                str(value): accuracy(
+                    [
+                        checked
+                        for case, checked in zip(cases, checks)
+                        if case[factor] == value
+                    ]
+                )
+                for value in dict.fromkeys(case[factor] for case in cases)
+            }
+            for factor in FACTORS
+        },
+        "stages": statistics.summary(),
+        "isolated_stages": {
+            stage: {
+                "mean_ms": 1000 * float(np.mean(seconds)),
+                "p95_ms": 1000 * float(np.percentile(seconds, 95)),
+            }
+            for stage, seconds in stage_seconds.items()
+        },
+    }
+
+
+def percent(rate: float) -> str:
+    return "   -" if rate is None else f"{100 * rate:3.0f}%"
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['images']} images, {report['images_per_second']:.1f} images/s,"
+        f" peak RSS {report['peak_rss_mb']:.1f} MB"
+    )
+    print(
+        "accuracy "
+        + ", ".join(
+            f"{name} {percent(rate)}" for name, rate in report["accuracy"].items()
+        )
+    )
+
+    print(
+        f"\n{'stage':<14}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mean KB':>10}"
+    )
+    for row in report["stages"]:
+        print(
+            f"{row['stage']:<14}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+            f"{row['p99_ms']:>9.2f}{row['mean_bytes'] / 1024:>10.0f}"
+        )
+    for stage, figures in report["isolated_stages"].items():
+        print(
+            f"{stage:<14}{'mean':>9}{figures['mean_ms']:>9.2f}"
+            f"  p95 {figures['p95_ms']:.2f} (alone)"
+        )
+
+    print(f"\n{'factor':<12}{'value':<12}" + "".join(f"{name:>10}" for name in ACCURACIES))
+    for factor, values in report["accuracy_by_factor"].items():
+        for value, rates in values.items():
+            print(
+                f"{factor:<12}{value:<12}"
+                + "".join(f"{percent(rates[name]):>10}" for name in ACCURACIES)
+            )
+
+
+def regressions(report: dict, baseline: dict, max_slowdown: float) -> list[str]:
+    problems: list[str] = []
+    if report["images_per_second"] < baseline["images_per_second"] * (1 - max_slowdown):
+        problems.append(
+            f"throughput {report['images_per_second']:.1f} images/s,"
+            f" baseline {baseline['images_per_second']:.1f}"
+        )
+    for name in ACCURACIES:
+        rate, baseline_rate = report["accuracy"][name], baseline["accuracy"][name]
+        if baseline_rate is not None and (rate is None or rate < baseline_rate):
+            problems.append(
+                f"{name} accuracy {percent(rate)}, baseline {percent(baseline_rate)}"
+            )
+    return problems
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Keep the generated boards in this folder")
+    parser.add_argument("--save", help="Write the report to this JSON file")
+    parser.add_argument("--baseline", help="Report to compare with, from --save")
+    parser.add_argument("--max-slowdown", type=float, default=0.2)
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    arguments: argparse.Namespace = parser.parse_args()
+
+    if arguments.measure is not None:
+        print(json.dumps(measure(arguments.measure, arguments.workers, arguments.repeat)))
+        return
+
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        folder: str = arguments.output or temporary_folder
+        os.makedirs(folder, exist_ok=True)
+        write_cases(generate_cases(arguments.seed), folder)
+        # A fresh process, the peak RSS does not include the generation of the boards
+        output: str = subprocess.run(
+            [sys.executable, __file__, "--measure", folder]
+            + ["--workers", str(arguments.workers), "--repeat", str(arguments.repeat)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    report: dict = json.loads(output.splitlines()[-1])
+    print_report(report)
+
+    if arguments.save is not None:
+        with open(arguments.save, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    if arguments.baseline is not None:
+        with open(arguments.baseline, encoding="utf-8") as file:
+            problems: list[str] = regressions(report, json.load(file), arguments.max_slowdown)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
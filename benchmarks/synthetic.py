@@ -0,0 +1,86 @@
+"""
+Synthetic board images with a known ground truth, for the benchmarks.
+
+A board is a white rectangle, rotated on a dark background, with dark round holes.
+Hole positions are given relative to the upright board. Optical blur and sensor noise
+can be added on top.
+"""
+
+from typing import Tuple
+
+import cv2 as cv
+import numpy as np
+
+
+def make_board(
+    frame_size: Tuple[int, int] = (1200, 900),
+    board_size: Tuple[int, int] = (600, 400),
+    angle: float = 0.0,
+    holes: Tuple[Tuple[float, float, float], ...] = ((0.1, 0.5, 0.05),),
+    seed: int = 0,
+    noise: float = 0.0,
+    blur: float = 0.0,
+) -> Tuple[np.ndarray, dict]:
+    """
+    Draws a board and returns it with its ground truth.
+
+    Args:
+        frame_size (Tuple[int, int]): The width and height of the image.
+        board_size (Tuple[int, int]): The width and height of the upright board.
+        angle (float): The rotation of the board, in degrees.
+        holes (Tuple[Tuple[float, float, float], ...]): One x, y, radius per hole; x
+            and y are fractions of the board width and height, the radius a fraction of
+            the board short side.
+        seed (int): Seed of the background and board shade variations, and of the noise.
+        noise (float): Standard deviation of the gaussian noise, in gray levels.
+        blur (float): Sigma of the gaussian blur applied before the noise, in pixels.
+
+    Returns:
+        Tuple[np.ndarray, dict]: The BGR image and its ground truth: the board ratio
+            and the holes as x, y, radius in pixels of the upright board.
+    """
+
+    generator: np.random.Generator = np.random.default_rng(seed)
+    frame_width, frame_height = frame_size
+    board_width, board_height = board_size
+    image: np.ndarray = np.full(
+        (frame_height, frame_width, 3), int(generator.integers(10, 60)), np.uint8
+    )
+    center: Tuple[float, float] = (frame_width / 2, frame_height / 2)
+    corners: np.ndarray = cv.boxPoints((center, board_size, angle))
+    cv.fillPoly(
+        image, [np.round(corners).astype(np.int32)], (int(generator.integers(200, 250)),) * 3
+    )
+
+    # Board coordinates to image coordinates
+    board_to_image: np.ndarray = cv.getRotationMatrix2D(
+        (board_width / 2, board_height / 2), -angle, 1
+    )
+    board_to_image[:, 2] += np.subtract(center, (board_width / 2, board_height / 2))
+    short_side: int = min(board_size)
+    truth_holes: list[Tuple[float, float, float]] = []
+    for x_ratio, y_ratio, radius_ratio in holes:
+        x, y = x_ratio * board_width, y_ratio * board_height
+        radius: float = radius_ratio * short_side
+        image_x, image_y = board_to_image @ (x, y, 1)
+        cv.circle(
+            image,
+            (int(round(image_x)), int(round(image_y))),
+            int(round(radius)),
+            (int(generator.integers(0, 40)),) * 3,
+            -1,
+            cv.LINE_AA,
+        )
+        truth_holes.append((x, y, radius))
+
+    if blur > 0:
+        image = cv.GaussianBlur(image, (0, 0), blur)
+    if noise > 0:
+        image = np.clip(
+            image + noise * generator.standard_normal(image.shape, np.float32), 0, 255
+        ).astype(np.uint8)
+
+    return image, {
+        "ratio": max(board_size) / min(board_size),
+        "holes": np.array(truth_holes).reshape(-1, 3),
+    }
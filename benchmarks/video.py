@@ -0,0 +1,104 @@
+"""
+Measures the frame rate of the video mode with and without tracking the board.
+
+A synthetic conveyor video is written first: a board, with its hole, crossing the frame
+and slowly turning. Both runs inspect every frame; without tracking (full detection on
+every frame) the whole frame is searched each time. Agreement means the same status
+and a ratio within 1%; tracking only looks for the known hole, so a spurious second
+circle found by the full detection is a disagreement.
+
+Usage:
+    python benchmarks/video.py [--frames 300] [--full-every 30] [--video conveyor.avi]
+"""
+
+from typing import Final
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2 as cv
+
+from benchmarks.synthetic import make_board
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from classes.VideoInspector import VideoInspector
+
+FRAME_SIZE: Final[tuple[int, int]] = (1280, 720)
+BOARD_SIZE: Final[tuple[int, int]] = (420, 300)
+
+
+def write_video(path: str, frames: int) -> None:
+    writer: cv.VideoWriter = cv.VideoWriter(
+        path, cv.VideoWriter_fourcc(*"MJPG"), 30, FRAME_SIZE
+    )
+    travel: int = FRAME_SIZE[0] - max(BOARD_SIZE)
+    for index in range(frames):
+        # The board is drawn centered, shifted along the conveyor afterwards
+        image = make_board(
+            (FRAME_SIZE[0] + travel, FRAME_SIZE[1]),
+            BOARD_SIZE,
+            angle=10 * index / frames - 5,
+            holes=((0.25, 0.4, 0.06),),
+            noise=4,
+            seed=index,
+        )[0]
+        offset: int = int(travel * index / frames)
+        writer.write(image[:, offset : offset + FRAME_SIZE[0]])
+    writer.release()
+
+
+def run(
+    path: str, full_every: int
+) -> tuple[list[InspectionResult], VideoInspector, float]:
+    inspector: VideoInspector = VideoInspector(Parameters(), full_every=full_every)
+    results: list[InspectionResult] = list(inspector.run(path))
+    # Read now, the throughput keeps decreasing after the end of the run
+    return results, inspector, inspector.throughput
+
+
+def agree(first: InspectionResult, second: InspectionResult) -> bool:
+    if first.status != second.status:
+        return False
+    if first.status != InspectionResult.OK:
+        return True
+    return abs(first.ratio - second.ratio) <= 0.01 * second.ratio
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--full-every", type=int, default=30)
+    parser.add_argument("--video", help="Inspect this video instead of a synthetic one")
+    arguments: argparse.Namespace = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = arguments.video
+        if path is None:
+            path = os.path.join(directory, "conveyor.avi")
+            write_video(path, arguments.frames)
+        run(path, full_every=1)  # Warm up, the first read of the file is slower
+        full_results, full, full_fps = run(path, full_every=1)
+        tracked_results, tracked, tracked_fps = run(path, arguments.full_every)
+
+    print(f"{'mode':<10}{'frames/s':>10}{'inspect ms':>12}{'tracked':>9}{'lost':>6}")
+    for mode, results, inspector, frames_per_second in (
+        ("full", full_results, full, full_fps),
+        ("tracking", tracked_results, tracked, tracked_fps),
+    ):
+        inspect_ms: float = sum(
+            1000 * (sum(result.timings.values()) - result.timings.get("decode", 0))
+            for result in results
+        ) / len(results)
+        print(
+            f"{mode:<10}{frames_per_second:>10.1f}{inspect_ms:>12.2f}"
+            f"{inspector.tracked:>9}{inspector.lost:>6}"
+        )
+    agreements: int = sum(map(agree, tracked_results, full_results))
+    print(f"\n{agreements}/{len(full_results)} frames agree")
+
+
+if __name__ == "__main__":
+    main()
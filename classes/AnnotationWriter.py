@@ -0,0 +1,235 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Final, Tuple
+import os
+import threading
+
+import cv2 as cv
+import numpy as np
+
+from classes.CircleOverlay import CIRCLE_COLOR
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from loader import FRAME_SEPARATOR
+from pipeline import CONTOUR_COLOR, read_image
+
+# BGR, the colors of the verdicts printed by the command line
+VERDICT_COLORS: Final[dict[str, Tuple[int, ...]]] = {
+    InspectionResult.IDENTICAL: (0, 200, 0),
+    InspectionResult.TOO_BIG: (0, 140, 255),
+    InspectionResult.TOO_SMALL: (255, 0, 0),
+}
+FAILURE_COLOR: Final[Tuple[int, ...]] = (0, 0, 255)
+TEXT_ORIGIN: Final[Tuple[int, int]] = (8, 8)
+
+
+class AnnotationWriter:
+    def __init__(
+        self,
+        folder: str,
+        parameters: Parameters,
+        scale: float = 0.5,
+        quality: int = 85,
+        every: int = 1,
+        failures_only: bool = False,
+        workers: int = 2,
+        max_queue: int = 64,
+    ) -> None:
+        os.makedirs(folder, exist_ok=True)
+        self.folder: str = folder
+        self.parameters: Parameters = parameters
+        self.scale: float = scale
+        self.quality: int = quality
+        self.every: int = max(1, every)
+        self.failures_only: bool = failures_only
+        self.workers: int = max(1, workers)
+        self.max_queue: int = max(1, max_queue)
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            self.workers, "annotate"
+        )
+        # One slot per image queued or being written
+        self._slots: threading.BoundedSemaphore = threading.BoundedSemaphore(
+            self.max_queue
+        )
+        self._lock: threading.Lock = threading.Lock()
+        self._candidates: int = 0
+
+        # ==========#
+        # COUNTERS  #
+        # ==========#
+        self.written: int = 0
+        self.dropped: int = 0
+        self.failed: int = 0
+
+    def __enter__(self) -> "AnnotationWriter":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def submit(
+        self, result: InspectionResult, image_path: str = None, image: np.ndarray = None
+    ) -> bool:
+        """
+        Queues the annotated image of a result, to be drawn and written in the
+        background.
+
+        Only failures, when failures_only is set, and then one image out of every are
+        kept. The caller never waits: when max_queue images are already waiting, the
+        image is dropped and counted in dropped.
+
+        Args:
+            result (InspectionResult): The result, with its verdict if it has one.
+            image_path (str): The image file, only read again by the writer when the
+                result has no preview.
+            image (np.ndarray): The full size image, instead of the preview and
+                image_path, for the frames of a video; it must not be modified
+                afterwards.
+
+        Returns:
+            bool: True if the image was queued.
+
+        Example:
+            ```python
+            with AnnotationWriter("./annotated", parameters, every=10) as writer:
+                for image_path, result in zip(paths, inspector.run(paths)):
+                    writer.submit(result, image_path)
+            ```
+        """
+
+        failure: bool = result.status != InspectionResult.OK or result.verdict not in (
+            None,
+            InspectionResult.IDENTICAL,
+        )
+        if self.failures_only and not failure:
+            return False
+        self._candidates += 1
+        if (self._candidates - 1) % self.every:
+            return False
+        if not self._slots.acquire(blocking=False):
+            self.dropped += 1
+            return False
+        future: Future = self._executor.submit(self._write, result, image_path, image)
+        future.add_done_callback(lambda _: self._slots.release())
+        return True
+
+    def close(self) -> None:
+        """Waits for the queued images to be written."""
+        self._executor.shutdown(wait=True)
+
+    def annotate(self, result: InspectionResult, image: np.ndarray) -> np.ndarray:
+        """
+        Draws the board, its holes and the verdict of a result on its image.
+
+        The drawing is done once the image is resized to its output size, the crop
+        coordinates of the board corners and the holes are taken back to the image with
+        the inverse of the crop matrix of the result.
+
+        Args:
+            result (InspectionResult): The result.
+            image (np.ndarray): The full size BGR or gray image, its reduced decode or
+                the preview of the result.
+
+        Returns:
+            np.ndarray: The annotated BGR image, scale times the pipeline resolution.
+        """
+
+        # The pipeline resolution, see resize_image, then the output one
+        scale: float = self.parameters.max_dimension / max(image.shape[:2]) * self.scale
+        height, width = image.shape[:2]
+        annotated: np.ndarray = cv.resize(
+            image,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv.INTER_AREA,
+        )
+        if annotated.ndim == 2:
+            annotated = cv.cvtColor(annotated, cv.COLOR_GRAY2BGR)
+
+        if result.crop_matrix is not None:
+            to_image: np.ndarray = cv.invertAffineTransform(result.crop_matrix)
+            corners: np.ndarray = cv.transform(
+                result.board_corners[np.newaxis].astype(np.float64), to_image
+            )[0]
+            cv.polylines(
+                annotated,
+                [np.round(corners * self.scale).astype(np.int32)],
+                True,
+                CONTOUR_COLOR,
+                2,
+                cv.LINE_AA,
+            )
+            if result.circles is not None:
+                circles: np.ndarray = np.asarray(result.circles, np.float64)
+                centers: np.ndarray = cv.transform(
+                    circles[np.newaxis, :, :2], to_image
+                )[0]
+                for (x, y), radius in zip(centers * self.scale, circles[:, 2]):
+                    cv.circle(
+                        annotated,
+                        (round(x), round(y)),
+                        max(1, round(radius * self.scale)),
+                        CIRCLE_COLOR,
+                        2,
+                        cv.LINE_AA,
+                    )
+
+        label: str = result.verdict if result.verdict is not None else result.status
+        if result.rejection is not None:
+            label = f"{label} ({result.rejection})"
+        if result.ratio is not None:
+            label = f"{label}  ratio {result.ratio:.4f}"
+        if result.hole_errors:
+            label = f"{label}  {result.hole_errors} holes"
+        (text_width, text_height), baseline = cv.getTextSize(
+            label, cv.FONT_HERSHEY_SIMPLEX, 0.5, 1
+        )
+        x, y = TEXT_ORIGIN
+        cv.rectangle(
+            annotated,
+            (x, y),
+            (x + text_width + 8, y + text_height + baseline + 8),
+            (0, 0, 0),
+            -1,
+        )
+        cv.putText(
+            annotated,
+            label,
+            (x + 4, y + text_height + 4),
+            cv.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            VERDICT_COLORS.get(result.verdict, FAILURE_COLOR),
+            1,
+            cv.LINE_AA,
+        )
+        return annotated
+
+    def _write(
+        self, result: InspectionResult, image_path: str, image: np.ndarray
+    ) -> None:
+        try:
+            if image is None:
+                image = result.preview
+            if image is None:
+                image = read_image(image_path, self.parameters)
+            if image is None:
+                raise OSError(f"Cannot read {image_path}")
+            encoded: np.ndarray = cv.imencode(
+                ".jpg",
+                self.annotate(result, image),
+                [cv.IMWRITE_JPEG_QUALITY, self.quality],
+            )[1]
+            # The frames of a video or of a raw file are named after their index, the
+            # extension is kept so that a.jpg and a.png do not overwrite each other
+            file_name, _, frame = result.filename.partition(FRAME_SEPARATOR)
+            name: str = file_name + (f"_{frame}" if frame else "")
+            path: str = os.path.join(self.folder, f"{name}.jpg")
+            # Written next to the image then renamed, a reader never sees a partial file
+            temporary_path: str = f"{path}.tmp"
+            with open(temporary_path, "wb") as file:
+                file.write(encoded.tobytes())
+            os.replace(temporary_path, path)
+        except (OSError, cv.error):
+            with self._lock:
+                self.failed += 1
+            return
+        with self._lock:
+            self.written += 1
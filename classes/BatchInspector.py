@@ -0,0 +1,183 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Iterator, Tuple
+import os
+
+from classes.Parameters import Parameters
+from classes.InspectionResult import InspectionResult
+from classes.Prefetcher import Prefetcher
+from classes.ResultCache import ResultCache
+from classes.ScratchBuffers import ScratchBuffers
+from pipeline import process_image
+
+# Result cache and scratch buffers of the current worker process, set by _init_worker,
+# and the reader of the files not read ahead
+_worker_cache: ResultCache = None
+_worker_buffers: ScratchBuffers = None
+_worker_prefetcher: Prefetcher = Prefetcher(depth=0)
+
+
+def _init_worker(cache_path: str, cache_max_bytes: int) -> None:
+    global _worker_cache, _worker_buffers
+    if cache_path is not None:
+        _worker_cache = ResultCache(cache_path, cache_max_bytes)
+    _worker_buffers = ScratchBuffers()
+
+
+def _create_cache(cache_path: str, cache_max_bytes: int) -> None:
+    # Created before the workers start: a new file is switched to WAL by the first
+    # connection alone, workers opening it at the same time may find it locked
+    if cache_path is not None:
+        ResultCache(cache_path, cache_max_bytes).close()
+
+
+def _process_chunk(
+    image_paths: list[str],
+    parameters: Parameters,
+    preview_scale: float = None,
+    contents: list[bytes] = None,
+) -> list[InspectionResult]:
+    # The files were read ahead by the main process, or are read here
+    files: Iterable[Tuple[str, bytes]] = (
+        zip(image_paths, contents)
+        if contents is not None
+        else _worker_prefetcher.run(image_paths)
+    )
+    return [
+        process_image(
+            image_path,
+            parameters,
+            cache=_worker_cache,
+            buffers=_worker_buffers,
+            data=data,
+            preview_scale=preview_scale,
+        )
+        for image_path, data in files
+    ]
+
+
+class BatchInspector:
+    def __init__(
+        self,
+        parameters: Parameters,
+        workers: int = None,
+        chunk_size: int = 1,
+        max_in_flight: int = None,
+        cache_path: str = None,
+        cache_max_bytes: int = 512 * 1024 * 1024,
+        prefetch_depth: int = 4,
+        prefetch_max_bytes: int = 256 * 1024 * 1024,
+        preview_scale: float = None,
+    ) -> None:
+        self.parameters: Parameters = parameters
+        self.preview_scale: float = preview_scale
+        self.cache_path: str = cache_path
+        self.cache_max_bytes: int = cache_max_bytes
+        self.prefetch_depth: int = prefetch_depth
+        self.prefetch_max_bytes: int = prefetch_max_bytes
+        self.workers: int = workers if workers is not None else os.cpu_count() or 1
+        self.chunk_size: int = max(1, chunk_size)
+        self.max_in_flight: int = (
+            max(1, max_in_flight) if max_in_flight is not None else 2 * self.workers
+        )
+
+    def run(self, image_paths: Iterable[str]) -> Iterator[InspectionResult]:
+        """
+        Inspects the images across a process pool and yields the results in input order.
+
+        At most max_in_flight chunks of chunk_size images are submitted at any time, so
+        the memory used by pending results stays bounded whatever the batch size. The
+        files are read ahead in the current process, up to prefetch_depth files and
+        prefetch_max_bytes per worker, in a single stream across the chunks, and their
+        content is sent to the workers with their chunk: no worker waits for the first
+        file of a chunk, and the depth is not bounded by chunk_size. With a
+        preview_scale, each result keeps its preview, see process_image.
+
+        Args:
+            image_paths (Iterable[str]): The paths of the images to inspect.
+
+        Returns:
+            Iterator[InspectionResult]: The results, in the same order as image_paths.
+
+        Example:
+            ```python
+            inspector = BatchInspector(Parameters(), workers=4, chunk_size=8)
+            for result in inspector.run(paths):
+                print(result.filename, result.status)
+            ```
+        """
+
+        # The depth and the size read ahead are per worker, as when each worker read
+        # its own files
+        prefetcher: Prefetcher = Prefetcher(
+            self.prefetch_depth * self.workers, self.prefetch_max_bytes * self.workers
+        )
+        # Without read ahead, the workers read their files themselves, in parallel
+        files: Iterator[Tuple[str, bytes]] = (
+            prefetcher.run(image_paths)
+            if self.workers == 1 or self.prefetch_depth > 0
+            else ((image_path, None) for image_path in image_paths)
+        )
+        if self.workers == 1:
+            cache: ResultCache = (
+                ResultCache(self.cache_path, self.cache_max_bytes)
+                if self.cache_path is not None
+                else None
+            )
+            buffers: ScratchBuffers = ScratchBuffers()
+            try:
+                for image_path, data in files:
+                    yield process_image(
+                        image_path,
+                        self.parameters,
+                        cache=cache,
+                        buffers=buffers,
+                        data=data,
+                        preview_scale=self.preview_scale,
+                    )
+            finally:
+                prefetcher.close()
+                if cache is not None:
+                    cache.close()
+            return
+
+        _create_cache(self.cache_path, self.cache_max_bytes)
+        in_flight: deque[Future] = deque()
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.cache_path, self.cache_max_bytes),
+        ) as executor:
+            try:
+                for chunk in self._chunks(files):
+                    if len(in_flight) >= self.max_in_flight:
+                        yield from in_flight.popleft().result()
+                    paths, contents = zip(*chunk)
+                    in_flight.append(
+                        executor.submit(
+                            _process_chunk,
+                            list(paths),
+                            self.parameters,
+                            self.preview_scale,
+                            list(contents) if self.prefetch_depth > 0 else None,
+                        )
+                    )
+                while in_flight:
+                    yield from in_flight.popleft().result()
+            finally:
+                # The consumer may stop early (break), drop what has not started yet
+                for future in in_flight:
+                    future.cancel()
+                prefetcher.close()
+
+    def _chunks(
+        self, files: Iterable[Tuple[str, bytes]]
+    ) -> Iterator[list[Tuple[str, bytes]]]:
+        chunk: list[Tuple[str, bytes]] = []
+        for file in files:
+            chunk.append(file)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
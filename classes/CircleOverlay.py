@@ -0,0 +1,117 @@
+from typing import Final, Tuple
+
+import cv2 as cv
+import numpy as np
+
+CIRCLE_COLOR: Final[Tuple[int, ...]] = (0, 255, 0)  # BGR : Green
+SELECTED_COLOR: Final[Tuple[int, ...]] = (255, 0, 0)  # BGR : Blue
+
+
+class CircleOverlay:
+    def __init__(
+        self, image: np.ndarray, circles: np.ndarray, thickness: int = 2
+    ) -> None:
+        # Never drawn on, the pixels under a circle are restored from it
+        self.base_image: np.ndarray = image
+        self.circles: np.ndarray = (
+            np.empty((0, 3), np.int32)
+            if circles is None
+            else np.asarray(circles, np.int32).reshape(-1, 3)
+        )
+        self.thickness: int = thickness
+        self.selected: int = None
+
+        # Bounding box of each circle stroke: x0, y0, x1, y1, clipped to the image
+        margin: np.ndarray = self.circles[:, 2] + thickness
+        self.boxes: np.ndarray = np.clip(
+            np.stack(
+                (
+                    self.circles[:, 0] - margin,
+                    self.circles[:, 1] - margin,
+                    self.circles[:, 0] + margin + 1,
+                    self.circles[:, 1] + margin + 1,
+                ),
+                axis=1,
+            ),
+            0,
+            np.tile((image.shape[1], image.shape[0]), 2),
+        )
+
+        self.image: np.ndarray = image.copy()
+        for index in range(len(self.circles)):
+            self._draw(self.image, index, 0, 0)
+
+    def find(self, x: int, y: int) -> int:
+        """
+        Finds the circle containing a point, the closest one if several do.
+
+        Args:
+            x (int): The x-coordinate of the point.
+            y (int): The y-coordinate of the point.
+
+        Returns:
+            int: The index of the circle in circles, or None if no circle contains it.
+        """
+
+        squared_distances: np.ndarray = (self.circles[:, 0] - x) ** 2 + (
+            self.circles[:, 1] - y
+        ) ** 2
+        inside: np.ndarray = squared_distances < self.circles[:, 2] ** 2
+        if not inside.any():
+            return None
+        return int(np.argmin(np.where(inside, squared_distances, np.iinfo(np.int32).max)))
+
+    def select(self, index: int) -> np.ndarray:
+        """
+        Highlights a circle, only the regions of the previous and new selections are
+        painted again.
+
+        Args:
+            index (int): The index of the circle in circles, or None to clear.
+
+        Returns:
+            np.ndarray: The annotated image, to display.
+
+        Example:
+            ```python
+            overlay = CircleOverlay(result.image, result.circles)
+            cv.imshow("Circles", overlay.select(overlay.find(x, y)))
+            ```
+        """
+
+        previous: int = self.selected
+        self.selected = index
+        for changed in dict.fromkeys((previous, index)):
+            if changed is not None:
+                self._repaint(changed)
+        return self.image
+
+    def _repaint(self, index: int) -> None:
+        x0, y0, x1, y1 = self.boxes[index]
+        # Strokes clipped at the border of a region can differ by a pixel from strokes
+        # drawn on the whole image, the region is drawn padded then only its inside kept
+        padding: int = 2 * self.thickness + 2
+        px0, py0 = max(x0 - padding, 0), max(y0 - padding, 0)
+        px1 = min(x1 + padding, self.image.shape[1])
+        py1 = min(y1 + padding, self.image.shape[0])
+        region: np.ndarray = self.base_image[py0:py1, px0:px1].copy()
+        # Every stroke crossing the region, drawn in the same order as the first render
+        overlapping: np.ndarray = np.flatnonzero(
+            (self.boxes[:, 0] < px1)
+            & (self.boxes[:, 2] > px0)
+            & (self.boxes[:, 1] < py1)
+            & (self.boxes[:, 3] > py0)
+        )
+        for neighbour in overlapping:
+            self._draw(region, neighbour, px0, py0)
+        self.image[y0:y1, x0:x1] = region[y0 - py0 : y1 - py0, x0 - px0 : x1 - px0]
+
+    def _draw(self, image: np.ndarray, index: int, x0: int, y0: int) -> None:
+        x, y, radius = self.circles[index]
+        cv.circle(
+            image,
+            (int(x - x0), int(y - y0)),
+            int(radius),
+            SELECTED_COLOR if index == self.selected else CIRCLE_COLOR,
+            self.thickness,
+        )
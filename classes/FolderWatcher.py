@@ -0,0 +1,66 @@
+from typing import Tuple
+import os
+import time
+
+from pipeline import IMAGE_EXTENSIONS
+
+
+class FolderWatcher:
+    def __init__(
+        self, folder: str, poll_interval: float = 0.5, settle_time: float = 1.0
+    ) -> None:
+        self.folder: str = folder
+        self.poll_interval: float = poll_interval
+        self.settle_time: float = settle_time
+        # Files seen but maybe still being written: path -> (size, mtime, stable since)
+        self._candidates: dict[str, Tuple[int, float, float]] = {}
+        # Files already returned: path -> (size, mtime), a file written again is new
+        self._done: dict[str, Tuple[int, float]] = {}
+
+    def poll(self, limit: int = None) -> list[str]:
+        """
+        Scans the folder and returns the new images whose writing is complete.
+
+        A file is complete once its size and modification time have not changed for
+        settle_time seconds. Each file is returned only once, unless it is written
+        again; the files gone from the folder are forgotten.
+
+        Args:
+            limit (int): Return at most this many files, the others wait for a later poll.
+
+        Returns:
+            list[str]: The paths of the complete files, oldest first.
+        """
+
+        now: float = time.monotonic()
+        ready: list[Tuple[float, str]] = []
+        seen: set[str] = set()
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.name.endswith(IMAGE_EXTENSIONS):
+                    continue
+                try:
+                    stat: os.stat_result = entry.stat()
+                except FileNotFoundError:  # Moved away since the scan
+                    continue
+                seen.add(entry.path)
+                if self._done.get(entry.path) == (stat.st_size, stat.st_mtime):
+                    continue
+                size, mtime, stable_since = self._candidates.get(
+                    entry.path, (None, None, now)
+                )
+                if (size, mtime) != (stat.st_size, stat.st_mtime):
+                    self._candidates[entry.path] = (stat.st_size, stat.st_mtime, now)
+                elif stat.st_size > 0 and now - stable_since >= self.settle_time:
+                    ready.append((stat.st_mtime, entry.path))
+        for path in self._done.keys() - seen:
+            del self._done[path]
+        for path in self._candidates.keys() - seen:
+            del self._candidates[path]
+
+        ready.sort()
+        paths: list[str] = [path for _, path in ready[:limit]]
+        for path in paths:
+            size, mtime, _ = self._candidates.pop(path)
+            self._done[path] = (size, mtime)
+        return paths
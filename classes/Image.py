@@ -1,15 +1,33 @@
 import cv2 as cv
 import numpy as np
 from classes.Rectangle import Rectangle
+from classes.ScratchBuffers import ScratchBuffers
 
 
 class Image:
+    __slots__ = (
+        "_original_image",
+        "_gray_image",
+        "_thresholded_image",
+        "_resized_image",
+        "_blurred_image",
+        "_original_dimension",
+        "_max_dimension",
+    )
+    BUFFERS = (
+        "original_image",
+        "gray_image",
+        "thresholded_image",
+        "resized_image",
+        "blurred_image",
+    )
+
     def __init__(self) -> None:
-        self.original_image: np.ndarray = []
-        self.gray_image: np.ndarray = []
-        self.thresholded_image: np.ndarray = []
-        self.resized_image: np.ndarray = []
-        self.blurred_image: np.ndarray = []
+        self.original_image: np.ndarray = None
+        self.gray_image: np.ndarray = None
+        self.thresholded_image: np.ndarray = None
+        self.resized_image: np.ndarray = None
+        self.blurred_image: np.ndarray = None
         self.original_dimension: list[int] = [0, 0]
         self.max_dimension: int = 0
 
@@ -69,32 +87,55 @@ class Image:
     def original_image(self, new_original_image: np.ndarray) -> None:
         self._original_image = new_original_image
 
-    def findRotation(self, rectangle: Rectangle) -> np.ndarray:
+    def release(self, *names: str) -> None:
         """
-        Calculates the rotation matrix for a given rectangle and applies the rotation to an image.
+        Drops intermediate buffers as soon as the next stages do not need them, so their
+        memory can be freed before the image itself goes away.
 
         Args:
             self: The current instance of the class.
-            rectangle (Rectangle): The rectangle object to be rotated.
+            *names (str): The buffers to drop, all of them if none is given.
 
         Returns:
-            np.ndarray: The rotated image.
+            None
 
         Example:
             ```python
-            image = Image()
-            rectangle = Rectangle()
-            rotated_image = image.findRotation(rectangle)
-            cv.imshow("Rotated Image", rotated_image)
-            cv.waitKey(0)
+            image.release("resized_image", "thresholded_image")
             ```
         """
 
-        angle: int = cv.minAreaRect(rectangle.largest_contour)[-1]
+        for name in names or self.BUFFERS:
+            setattr(self, name, None)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            getattr(self, name).nbytes
+            for name in self.BUFFERS
+            if getattr(self, name) is not None
+        )
+
+    def findRotationMatrix(self, rectangle: Rectangle) -> np.ndarray:
+        """
+        Calculates the rotation matrix making the largest contour of a rectangle upright.
+
+        Args:
+            self: The current instance of the class.
+            rectangle (Rectangle): The rectangle, its min_area_rect, angle and
+                rotation_matrix are set.
+
+        Returns:
+            np.ndarray: The 2x3 rotation matrix.
+        """
+
+        rectangle.min_area_rect = cv.minAreaRect(rectangle.largest_contour)
+        angle: int = rectangle.min_area_rect[-1]
 
         # If the angle is negative, adjust it to be in the range [0, 90]
         if angle < -45:
             angle += 90
+        rectangle.angle = angle
 
         # Create a rotation matrix
         rectangle.rotation_matrix = cv.getRotationMatrix2D(
@@ -105,13 +146,103 @@ class Image:
             angle,
             1,
         )
+        return rectangle.rotation_matrix
+
+    def findRotation(self, rectangle: Rectangle) -> np.ndarray:
+        """
+        Calculates the rotation matrix for a given rectangle and applies the rotation to an image.
+
+        Args:
+            self: The current instance of the class.
+            rectangle (Rectangle): The rectangle object to be rotated.
+
+        Returns:
+            np.ndarray: The rotated image.
+
+        Example:
+            ```python
+            image = Image()
+            rectangle = Rectangle()
+            rotated_image = image.findRotation(rectangle)
+            cv.imshow("Rotated Image", rotated_image)
+            cv.waitKey(0)
+            ```
+        """
+
         # Apply the rotation to the image
         return cv.warpAffine(
             self.resized_image,
-            rectangle.rotation_matrix,
+            self.findRotationMatrix(rectangle),
             (
                 self.resized_image.shape[1],
                 self.resized_image.shape[0],
             ),
             flags=cv.INTER_LINEAR,
         )
+
+    def extractRotatedRectangle(
+        self,
+        rectangle: Rectangle,
+        rotated_rectangle: Rectangle,
+        buffers: ScratchBuffers = None,
+    ) -> np.ndarray:
+        """
+        Warps only the region of a rectangle into an upright crop of its size.
+
+        The position of the rectangle once rotated is computed from the corners of its
+        minimum area rectangle, so the rotated image never needs to be thresholded again.
+
+        Args:
+            self: The current instance of the class.
+            rectangle (Rectangle): The rectangle found on the resized image.
+            rotated_rectangle (Rectangle): Receives the coord and size of the rectangle
+                in the rotated image, its largest_contour in crop coordinates and the
+                rotation_matrix mapping the resized image to the crop.
+            buffers (ScratchBuffers): The crop is written in the "crop" buffer, a new
+                array is allocated if None.
+
+        Returns:
+            np.ndarray: The upright crop of the rectangle.
+
+        Example:
+            ```python
+            image = Image()
+            rectangle = Rectangle()
+            rotated_rectangle = Rectangle()
+            crop = image.extractRotatedRectangle(rectangle, rotated_rectangle)
+            ```
+        """
+
+        rotation_matrix: np.ndarray = self.findRotationMatrix(rectangle)
+        corners: np.ndarray = cv.transform(
+            cv.boxPoints(rectangle.min_area_rect)[np.newaxis], rotation_matrix
+        )[0]
+        # Same bounds as a contour search on the rotated image: inside the frame
+        height, width = self.resized_image.shape[:2]
+        left, top = np.clip(np.round(corners.min(axis=0)), 0, None).astype(int)
+        right, bottom = np.round(corners.max(axis=0)).astype(int)
+        right, bottom = min(right, width - 1), min(bottom, height - 1)
+        rotated_rectangle.coord = [int(left), int(top)]
+        rotated_rectangle.size = [int(right - left + 1), int(bottom - top + 1)]
+
+        rotated_rectangle.rotation_matrix = rotation_matrix.copy()
+        rotated_rectangle.rotation_matrix[:, 2] -= (left, top)
+        rotated_rectangle.largest_contour = np.round(
+            cv.transform(
+                rectangle.largest_contour.astype(np.float32),
+                rotated_rectangle.rotation_matrix,
+            )
+        ).astype(np.int32)
+        return cv.warpAffine(
+            self.resized_image,
+            rotated_rectangle.rotation_matrix,
+            tuple(rotated_rectangle.size),
+            dst=None
+            if buffers is None
+            else buffers.get(
+                "crop",
+                (rotated_rectangle.size[1], rotated_rectangle.size[0])
+                + self.resized_image.shape[2:],
+            ),
+            flags=cv.INTER_LINEAR,
+        )
@@ -0,0 +1,135 @@
+from typing import Final, Tuple
+
+import numpy as np
+
+# Stages measured by the pipeline, in pipeline order
+STAGES: Final[Tuple[str, ...]] = (
+    "cache",
+    "decode",
+    "resize",
+    "checks",
+    "threshold",
+    "contours",
+    "components",
+    "rotation",
+    "blur",
+    "circles",
+)
+# Fields of a record, the columns of the CSV and SQLite sinks
+RECORD_FIELDS: Final[Tuple[str, ...]] = (
+    "filename",
+    "status",
+    "rejection",
+    "sku",
+    "verdict",
+    "ratio",
+    "circle_diameter",
+    "circle_from_top",
+    "circle_from_left",
+    "hole_count",
+    "hole_errors",
+    "rotation_angle",
+    *(f"{stage}_ms" for stage in STAGES),
+    "total_ms",
+)
+
+
+class InspectionResult:
+    # ========#
+    # STATUS  #
+    # ========#
+    OK = "ok"
+    BAD_EXTENSION = "bad_extension"
+    UNREADABLE = "unreadable"
+    NO_RECTANGLE = "no_rectangle"
+    NO_CIRCLE = "no_circle"
+    MULTIPLE_CIRCLES = "multiple_circles"
+
+    # =========#
+    # VERDICT  #
+    # =========#
+    TOO_BIG = "too_big"
+    TOO_SMALL = "too_small"
+    IDENTICAL = "identical"
+    WRONG_HOLES = "wrong_holes"
+
+    # ==========#
+    # REJECTION #
+    # ==========#
+    # Why a cheap check rejected the image before the expensive stages, or why the
+    # pipeline failed on it
+    EMPTY_FILE = "empty_file"
+    BAD_HEADER = "bad_header"
+    BAD_SIZE = "bad_size"
+    TOO_DARK = "too_dark"
+    TOO_BRIGHT = "too_bright"
+    SMALL_BOARD = "small_board"
+    BAD_ASPECT = "bad_aspect"
+    FAILED = "failed"
+
+    def __init__(self, filename: str = None) -> None:
+        self.filename: str = filename
+        self.status: str = None
+        self.rejection: str = None
+        self.verdict: str = None
+        # Product the board was classified to, when comparing with a ProfileTable
+        self.sku: str = None
+        self.ratio: float = None
+        self.rectangle_coord: list[int] = [0, 0]
+        self.rectangle_size: list[int] = [0, 0]
+        self.rotated_rectangle_coord: list[int] = [0, 0]
+        self.rotated_rectangle_size: list[int] = [0, 0]
+        self.rotation_angle: float = None
+        # From the resized image to the upright crop the circles are found on
+        self.crop_matrix: np.ndarray = None
+        # Sub-pixel corners of the board in the upright crop, in cv.boxPoints order
+        self.board_corners: np.ndarray = None
+        self.circles: np.ndarray = None
+        self.circle_diameter: float = None
+        self.circle_from_top: float = None
+        self.circle_from_left: float = None
+        # Boards with several holes, see measure_holes: one row of diameter, from top,
+        # from left per hole, the distances between holes, and the pattern of the holes
+        self.holes: np.ndarray = None
+        self.hole_spacings: np.ndarray = None
+        self.hole_pattern: np.ndarray = None
+        # Holes missing, extra or out of tolerance against the reference
+        self.hole_errors: int = None
+        self.image: np.ndarray = None
+        # The resized image scaled down for the AnnotationWriter, see keep_preview
+        self.preview: np.ndarray = None
+        # Per stage measurements: stage name -> seconds, stage name -> bytes
+        self.timings: dict[str, float] = {}
+        self.allocated_bytes: dict[str, int] = {}
+
+    def to_record(self) -> dict:
+        """
+        Flattens the result into plain Python values, for the result sinks.
+
+        Returns:
+            dict: The RECORD_FIELDS, None when not measured; times in milliseconds.
+        """
+
+        record: dict = {
+            "filename": self.filename,
+            "status": self.status,
+            "rejection": self.rejection,
+            "sku": self.sku,
+            "verdict": self.verdict,
+            "ratio": _to_float(self.ratio),
+            "circle_diameter": _to_float(self.circle_diameter),
+            "circle_from_top": _to_float(self.circle_from_top),
+            "circle_from_left": _to_float(self.circle_from_left),
+            "hole_count": None if self.holes is None else len(self.holes),
+            "hole_errors": self.hole_errors,
+            "rotation_angle": _to_float(self.rotation_angle),
+        }
+        for stage in STAGES:
+            seconds: float = self.timings.get(stage)
+            record[f"{stage}_ms"] = None if seconds is None else 1000 * seconds
+        record["total_ms"] = 1000 * sum(self.timings.values())
+        return record
+
+
+def _to_float(value: float) -> float:
+    return None if value is None else float(value)
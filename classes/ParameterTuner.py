@@ -0,0 +1,356 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Final, Tuple
+import copy
+import itertools
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from classes.Image import Image
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import STAGE_PARAMETERS, Parameters
+from pipeline import (
+    blur_image,
+    detect_circles,
+    locate_white_rectangle,
+    measure_result,
+    read_image,
+    resize_image,
+)
+
+# Keys of an entry of a labels file
+LABEL_KEYS: Final[tuple[str, ...]] = ("filename", "status", "ratio")
+# Values searched when no grid is given: the threshold of the board, the blur and the
+# circle detection, with the hole radius range the adaptive detector derives its
+# minimum distance and radius limits from
+DEFAULT_GRID: Final[dict[str, tuple]] = {
+    "threshold": (96, 128, 160),
+    "blur_kernel_size": (5, 9, 13),
+    "blur_sigma": (1, 2, 3),
+    "hough_param1": (120, 190, 255),
+    "hough_param2": (9, 13, 17),
+    "hole_min_radius_ratio": (0.01, 0.02, 0.03),
+    "hole_max_radius_ratio": (0.08, 0.11, 0.15),
+}
+# Parameters the circle detector ignores, by the value of adaptive_circles
+DETECTOR_IGNORED: Final[dict[bool, tuple[str, ...]]] = {
+    True: ("hough_min_dist", "hough_min_radius", "hough_max_radius"),
+    False: (
+        "hough_pyramid_levels",
+        "hough_coarse_param2_ratio",
+        "hole_min_radius_ratio",
+        "hole_max_radius_ratio",
+    ),
+}
+
+
+def _cached_stage(
+    cache: dict, stage: str, parameters: Parameters, compute: Callable, *inputs
+) -> Tuple[object, float]:
+    # The output of a stage and the seconds it took when it was computed
+    key: str = f"{stage}:{parameters.fingerprint(stage)}"
+    if key not in cache:
+        start: float = time.perf_counter()
+        output: object = compute(*inputs)
+        cache[key] = (output, time.perf_counter() - start)
+    return cache[key]
+
+
+def _decode(image_path: str, parameters: Parameters) -> Image:
+    image: np.ndarray = read_image(image_path, parameters, grayscale=True)
+    if image is None:
+        return None
+    return resize_image(image, parameters.max_dimension)
+
+
+def _locate(
+    opened_image: Image, parameters: Parameters
+) -> Tuple[InspectionResult, Image]:
+    result: InspectionResult = InspectionResult()
+    if opened_image is None:
+        result.status = InspectionResult.UNREADABLE
+        return result, None
+    return result, locate_white_rectangle(opened_image, parameters, result)
+
+
+def _blur(crop: Image, parameters: Parameters) -> Image:
+    # A new image, the crop is shared by every blur of the same rectangle
+    blurred: Image = Image()
+    blurred.gray_image = crop.gray_image
+    blur_image(blurred, parameters)
+    return blurred
+
+
+def _find_circles(
+    result: InspectionResult, blurred: Image, parameters: Parameters
+) -> InspectionResult:
+    result = copy.copy(result)
+    result.circles = detect_circles(
+        blurred, parameters, stop_after=None if parameters.multiple_holes else 2
+    )
+    return measure_result(result, parameters.multiple_holes)
+
+
+def _evaluate_chunk(
+    cases: list[dict],
+    parameters: Parameters,
+    configurations: list[dict],
+    ratio_tolerance: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Correct outcomes and seconds, cases x configurations. The configurations are
+    # sorted by their upstream stages, but every image only needs its own stages: the
+    # cache is emptied between images
+    correct: np.ndarray = np.zeros((len(cases), len(configurations)), bool)
+    seconds: np.ndarray = np.zeros((len(cases), len(configurations)))
+    for row, case in enumerate(cases):
+        cache: dict = {}
+        for column, values in enumerate(configurations):
+            configuration: Parameters = copy.copy(parameters)
+            for name, value in values.items():
+                setattr(configuration, name, value)
+            opened_image, decode_seconds = _cached_stage(
+                cache, "decode", configuration, _decode, case["path"], configuration
+            )
+            (result, crop), rectangle_seconds = _cached_stage(
+                cache, "rectangle", configuration, _locate, opened_image, configuration
+            )
+            seconds[row, column] = decode_seconds + rectangle_seconds
+            if crop is not None:
+                blurred, blur_seconds = _cached_stage(
+                    cache, "blur", configuration, _blur, crop, configuration
+                )
+                result, circles_seconds = _cached_stage(
+                    cache,
+                    "circles",
+                    configuration,
+                    _find_circles,
+                    result,
+                    blurred,
+                    configuration,
+                )
+                seconds[row, column] += blur_seconds + circles_seconds
+            correct[row, column] = is_correct(case, result, ratio_tolerance)
+    return correct, seconds
+
+
+def is_correct(case: dict, result: InspectionResult, ratio_tolerance: float) -> bool:
+    """
+    Compares a result with the label of its image.
+
+    Args:
+        case (dict): The label, see read_labels.
+        result (InspectionResult): The result of the image.
+        ratio_tolerance (float): The accepted relative error of the ratio.
+
+    Returns:
+        bool: True if the status is the expected one and the ratio, when labeled, is
+            within the tolerance.
+    """
+
+    if result.status != case["status"]:
+        return False
+    if case.get("ratio") is None:
+        return True
+    return (
+        result.ratio is not None
+        and abs(result.ratio - case["ratio"]) / case["ratio"] <= ratio_tolerance
+    )
+
+
+def ignored_parameters(grid: dict[str, tuple], parameters: Parameters) -> list[str]:
+    """
+    Lists the searched parameters no searched circle detector reads, their values
+    would all score the same.
+
+    Args:
+        grid (dict[str, tuple]): The values of each searched parameter.
+        parameters (Parameters): The parameters the configurations start from.
+
+    Returns:
+        list[str]: The ignored parameters of the grid.
+    """
+
+    detectors: tuple = grid.get("adaptive_circles", (parameters.adaptive_circles,))
+    return [
+        name
+        for name in grid
+        if all(name in DETECTOR_IGNORED[adaptive] for adaptive in detectors)
+    ]
+
+
+def read_labels(path: str) -> list[dict]:
+    """
+    Reads a labels file: a JSON list of images, each with its file ("filename"),
+    relative to the labels file, its expected status ("status") and optionally its
+    board ratio ("ratio").
+
+    Args:
+        path (str): The path of the labels file.
+
+    Returns:
+        list[dict]: The labels, with the full path of each image in "path".
+
+    Raises:
+        ValueError: If a label misses a file or a status, or has unknown keys.
+    """
+
+    with open(path, encoding="utf-8") as file:
+        cases: list[dict] = json.load(file)
+    folder: str = os.path.dirname(os.path.abspath(path))
+    for case in cases:
+        if "filename" not in case or "status" not in case:
+            raise ValueError(f"Label {case} of {path} needs a filename and a status")
+        unknown: set[str] = set(case) - set(LABEL_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown keys {sorted(unknown)} in {path}")
+        case["path"] = os.path.join(folder, case["filename"])
+    return cases
+
+
+def grid_configurations(
+    grid: dict[str, tuple], samples: int = None, seed: int = 0
+) -> list[dict]:
+    """
+    Lists the configurations of a grid of parameter values, or a random sample of them.
+
+    Args:
+        grid (dict[str, tuple]): The values of each searched parameter.
+        samples (int): Only keep this many configurations, drawn at random; the whole
+            grid if None.
+        seed (int): The seed of the random sample.
+
+    Returns:
+        list[dict]: The values of the searched parameters, one dict per configuration.
+    """
+
+    configurations: list[dict] = [
+        dict(zip(grid, values)) for values in itertools.product(*grid.values())
+    ]
+    if samples is not None and samples < len(configurations):
+        kept: np.ndarray = np.random.default_rng(seed).choice(
+            len(configurations), samples, replace=False
+        )
+        configurations = [configurations[index] for index in sorted(kept)]
+    return configurations
+
+
+def pareto_front(scores: list[dict]) -> list[dict]:
+    """
+    Keeps the scores no other score beats on both accuracy and latency.
+
+    Args:
+        scores (list[dict]): Scores with an accuracy and a mean_ms.
+
+    Returns:
+        list[dict]: The Pareto-best scores, from the most accurate to the fastest.
+    """
+
+    front: list[dict] = []
+    ranked: list[dict] = sorted(
+        scores, key=lambda score: (-score["accuracy"], score["mean_ms"])
+    )
+    for score in ranked:
+        if not front or score["mean_ms"] < front[-1]["mean_ms"]:
+            front.append(score)
+    return front
+
+
+class ParameterTuner:
+    def __init__(
+        self,
+        cases: list[dict],
+        parameters: Parameters,
+        workers: int = None,
+        ratio_tolerance: float = 0.02,
+    ) -> None:
+        self.cases: list[dict] = cases
+        self.parameters: Parameters = parameters
+        self.workers: int = workers if workers is not None else os.cpu_count() or 1
+        self.ratio_tolerance: float = ratio_tolerance
+
+    def run(self, configurations: list[dict]) -> list[dict]:
+        """
+        Scores configurations on the labeled images, across a process pool.
+
+        Each worker runs every configuration on its share of the images, one image at a
+        time, and caches the output of each stage by the parameters of the stage and of
+        the stages before it: configurations only differing by their circle detection
+        parameters decode, threshold, rotate and blur each image once. The time of a
+        stage is counted in every configuration using its output, so the latency is the
+        one of the configuration running alone.
+
+        Args:
+            configurations (list[dict]): The values of the searched parameters, the
+                other parameters are those of the tuner.
+
+        Returns:
+            list[dict]: One score per configuration, in order: accuracy, the fraction
+                of the images with the expected outcome, mean_ms, the mean time per
+                image, and parameters, every parameter of the configuration.
+
+        Example:
+            ```python
+            tuner = ParameterTuner(read_labels("./labels.json"), Parameters())
+            scores = tuner.run(grid_configurations({"threshold": (96, 128, 160)}))
+            best = pareto_front(scores)[0]
+            ```
+        """
+
+        # Configurations sharing their upstream stages are next to each other
+        stages: list[str] = list(STAGE_PARAMETERS)
+        order: list[int] = sorted(
+            range(len(configurations)),
+            key=lambda index: tuple(
+                json.dumps(
+                    [
+                        configurations[index].get(name)
+                        for name in STAGE_PARAMETERS[stage]
+                    ],
+                    sort_keys=True,
+                )
+                for stage in stages
+            ),
+        )
+        ordered: list[dict] = [configurations[index] for index in order]
+
+        # Contiguous shares of the images, a few per worker to even out their times
+        share: int = max(1, math.ceil(len(self.cases) / (4 * self.workers)))
+        chunks: list[list[dict]] = [
+            self.cases[start : start + share]
+            for start in range(0, len(self.cases), share)
+        ]
+        if self.workers == 1:
+            outcomes: list[Tuple[np.ndarray, np.ndarray]] = [
+                _evaluate_chunk(chunk, self.parameters, ordered, self.ratio_tolerance)
+                for chunk in chunks
+            ]
+        else:
+            with ProcessPoolExecutor(self.workers) as executor:
+                futures: list[Future] = [
+                    executor.submit(
+                        _evaluate_chunk,
+                        chunk,
+                        self.parameters,
+                        ordered,
+                        self.ratio_tolerance,
+                    )
+                    for chunk in chunks
+                ]
+                outcomes = [future.result() for future in futures]
+        correct: np.ndarray = np.concatenate([outcome[0] for outcome in outcomes])
+        seconds: np.ndarray = np.concatenate([outcome[1] for outcome in outcomes])
+
+        scores: list[dict] = [None] * len(configurations)
+        for column, index in enumerate(order):
+            configuration: Parameters = copy.copy(self.parameters)
+            for name, value in configurations[index].items():
+                setattr(configuration, name, value)
+            scores[index] = {
+                "accuracy": float(correct[:, column].mean()),
+                "mean_ms": 1000 * float(seconds[:, column].mean()),
+                "parameters": configuration.to_dict(),
+            }
+        return scores
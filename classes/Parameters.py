@@ -0,0 +1,164 @@
+from typing import Final
+import hashlib
+import json
+
+# Changed with the way measurements are made, so that the reference profiles and the
+# cached stages measured by an older version are computed again
+MEASUREMENT_VERSION: Final[int] = 3
+# Parameters only used to compare the ratios, they do not change any measurement
+COMPARISON_PARAMETERS: Final[tuple[str, ...]] = (
+    "margin_error",
+    "hole_margin",
+    "hole_diameter_margin",
+)
+# Measurement parameters of each stage, in pipeline order
+STAGE_PARAMETERS: Final[dict[str, tuple[str, ...]]] = {
+    "decode": (
+        "max_dimension",
+        "reduced_decode",
+    ),
+    "rectangle": (
+        "threshold",
+        "single_pass",
+        "component_localisation",
+        "component_scale",
+        "min_bright_fraction",
+        "max_bright_fraction",
+        "min_board_fraction",
+        "max_board_aspect",
+    ),
+    "blur": (
+        "blur_kernel_size",
+        "blur_sigma",
+    ),
+    "circles": (
+        "hough_dp",
+        "hough_min_dist",
+        "hough_param1",
+        "hough_param2",
+        "hough_min_radius",
+        "hough_max_radius",
+        "adaptive_circles",
+        "hough_pyramid_levels",
+        "hough_coarse_param2_ratio",
+        "hole_min_radius_ratio",
+        "hole_max_radius_ratio",
+        "multiple_holes",
+    ),
+}
+
+
+class Parameters:
+    def __init__(self) -> None:
+        self.max_dimension: int = 800
+        self.reduced_decode: bool = True
+        self.threshold: int = 128
+        self.single_pass: bool = True
+        # Board found on a downsampled mask, see find_board_component
+        self.component_localisation: bool = False
+        self.component_scale: int = 4
+        # Cheap checks rejecting hopeless images before the contour search and rotation
+        self.min_bright_fraction: float = 0.02
+        self.max_bright_fraction: float = 0.98
+        self.min_board_fraction: float = 0.02
+        self.max_board_aspect: float = 6.0
+        self.blur_kernel_size: int = 9
+        self.blur_sigma: float = 2
+        self.hough_dp: float = 1
+        self.hough_min_dist: int = 50
+        self.hough_param1: int = 255
+        self.hough_param2: int = 13
+        self.hough_min_radius: int = 1
+        self.hough_max_radius: int = 50
+        self.adaptive_circles: bool = True
+        self.hough_pyramid_levels: int = 1
+        self.hough_coarse_param2_ratio: float = 0.6
+        # Hole radius range, as a fraction of the short side of the board
+        self.hole_min_radius_ratio: float = 0.02
+        self.hole_max_radius_ratio: float = 0.11
+        # Boards with several holes, every hole is measured and matched to the reference
+        self.multiple_holes: bool = False
+        self.margin_error: float = 1.2
+        # Accepted hole position error, as a fraction of the long side of the board, and
+        # multiplicative tolerance on the hole diameters
+        self.hole_margin: float = 0.02
+        self.hole_diameter_margin: float = 1.2
+
+    def fingerprint(self, stage: str = None) -> str:
+        """
+        Identifies the measurement parameters, two Parameters giving the same measurements
+        on an image have the same fingerprint.
+
+        Args:
+            stage (str): Only the parameters of this stage and of the stages before it,
+                see STAGE_PARAMETERS. Every measurement parameter by default.
+
+        Returns:
+            str: A short hexadecimal digest of the parameters.
+        """
+
+        if stage is None:
+            names: list[str] = [
+                name for name in vars(self) if name not in COMPARISON_PARAMETERS
+            ]
+        else:
+            stages: list[str] = list(STAGE_PARAMETERS)
+            names = [
+                name
+                for upstream_stage in stages[: stages.index(stage) + 1]
+                for name in STAGE_PARAMETERS[upstream_stage]
+            ]
+        values: dict = {name: getattr(self, name) for name in names}
+        values["measurement_version"] = MEASUREMENT_VERSION
+        return hashlib.sha256(
+            json.dumps(values, sort_keys=True).encode()
+        ).hexdigest()[:16]
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "Parameters":
+        """
+        Builds parameters from the values of to_dict, missing values keep their default.
+
+        Raises:
+            ValueError: If a value is not a parameter.
+        """
+
+        parameters: Parameters = cls()
+        unknown: list[str] = sorted(set(values) - set(vars(parameters)))
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(unknown)}")
+        for name, value in values.items():
+            setattr(parameters, name, value)
+        return parameters
+
+    @classmethod
+    def load(cls, path: str, index: int = 0) -> "Parameters":
+        """
+        Reads parameters from a JSON file, either the values of to_dict or the
+        configurations written by tune_parameters.py.
+
+        Args:
+            path (str): The JSON file.
+            index (int): The configuration to read from a tune_parameters.py file, the
+                first one is the most accurate.
+
+        Returns:
+            Parameters: The parameters.
+
+        Raises:
+            ValueError: If a value of the file is not a parameter.
+
+        Example:
+            ```python
+            parameters = Parameters.load("./tuned_parameters.json")
+            ```
+        """
+
+        with open(path, encoding="utf-8") as file:
+            values: dict = json.load(file)
+        if "configurations" in values:
+            values = values["configurations"][index]["parameters"]
+        return cls.from_dict(values)
@@ -0,0 +1,104 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Tuple
+import os
+
+from loader import RAW_EXTENSION, split_frame_path
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as stream:
+        return stream.read()
+
+
+class Prefetcher:
+    def __init__(
+        self,
+        depth: int = 4,
+        max_bytes: int = 256 * 1024 * 1024,
+        reader: Callable[[str], bytes] = read_file,
+    ) -> None:
+        self.depth: int = max(0, depth)
+        self.max_bytes: int = max_bytes
+        self.reader: Callable[[str], bytes] = reader
+        self._executor: ThreadPoolExecutor = (
+            ThreadPoolExecutor(self.depth, "prefetch") if self.depth > 0 else None
+        )
+
+    def run(self, image_paths: Iterable[str]) -> Iterator[Tuple[str, bytes]]:
+        """
+        Reads the files ahead of their processing, in background threads, so the disk
+        or network latency overlaps the computation of the previous images.
+
+        At most depth files are read ahead of the one being processed, and the files read
+        but not yet processed hold at most max_bytes; a single file larger than max_bytes
+        is still read, alone. Raw frame files are memory mapped by the pipeline, they are not read.
+
+        Args:
+            image_paths (Iterable[str]): The paths of the images, in processing order.
+
+        Returns:
+            Iterator[Tuple[str, bytes]]: Each path with the content of the file, in
+                order; the content is None if the file was not or could not be read.
+
+        Example:
+            ```python
+            prefetcher = Prefetcher(depth=8)
+            for image_path, data in prefetcher.run(paths):
+                result = process_image(image_path, parameters, data=data)
+            ```
+        """
+
+        paths: Iterator[str] = iter(image_paths)
+        if self._executor is None:
+            for image_path in paths:
+                yield image_path, self._read(image_path)
+            return
+
+        # path, future of its content, bytes reserved for it
+        pending: deque[Tuple[str, Future, int]] = deque()
+        reserved_bytes: int = 0
+        next_path: str = next(paths, None)
+        try:
+            while True:
+                # Queued before waiting, the reads run while the consumer works
+                while next_path is not None and len(pending) <= self.depth:
+                    size: int = self._size(next_path)
+                    if pending and reserved_bytes + size > self.max_bytes:
+                        break
+                    pending.append(
+                        (next_path, self._executor.submit(self._read, next_path), size)
+                    )
+                    reserved_bytes += size
+                    next_path = next(paths, None)
+                if not pending:
+                    return
+                image_path, future, size = pending[0]
+                data: bytes = future.result()
+                pending.popleft()
+                reserved_bytes -= size
+                yield image_path, data
+        finally:
+            # The consumer may stop early, drop the reads that have not started yet
+            for _, future, _ in pending:
+                future.cancel()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    def _read(self, image_path: str) -> bytes:
+        if split_frame_path(image_path)[0].endswith(RAW_EXTENSION):
+            return None
+        try:
+            return self.reader(image_path)
+        except OSError:
+            return None  # Reported as unreadable by the pipeline
+
+    def _size(self, image_path: str) -> int:
+        if split_frame_path(image_path)[0].endswith(RAW_EXTENSION):
+            return 0
+        try:
+            return os.stat(image_path).st_size
+        except OSError:
+            return 0
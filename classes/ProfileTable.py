@@ -0,0 +1,134 @@
+from typing import Final
+import bisect
+import json
+import math
+
+import numpy as np
+
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from classes.ReferenceProfile import ReferenceProfile
+from pipeline import compare_holes, compare_ratio
+
+# Keys of an entry of a table file
+TABLE_KEYS: Final[tuple[str, ...]] = ("sku", "reference", "margin_error")
+
+
+class ProfileTable:
+    def __init__(self) -> None:
+        # Sorted by the logarithm of the ratio, the tolerances are multiplicative
+        self.skus: list[str] = []
+        self.profiles: list[ReferenceProfile] = []
+        self.margin_errors: list[float] = []
+        self._log_ratios: list[float] = []
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def add(self, sku: str, profile: ReferenceProfile, margin_error: float) -> None:
+        """
+        Adds the reference profile of a product to the table.
+
+        Args:
+            sku (str): The name of the product.
+            profile (ReferenceProfile): The profile of the product reference image.
+            margin_error (float): The accepted multiplicative tolerance of the product.
+
+        Returns:
+            None
+        """
+
+        log_ratio: float = math.log(profile.ratio)
+        index: int = bisect.bisect(self._log_ratios, log_ratio)
+        self._log_ratios.insert(index, log_ratio)
+        self.skus.insert(index, sku)
+        self.profiles.insert(index, profile)
+        self.margin_errors.insert(index, margin_error)
+
+    def nearest(self, ratio: float) -> int:
+        """
+        Finds the product whose reference ratio is the closest to a ratio, in O(log n).
+
+        Ratios are compared by quotient, 1.1 is as far from 1.0 as 1.0 from 1/1.1, like
+        the tolerances.
+
+        Args:
+            ratio (float): The ratio of the inspected board.
+
+        Returns:
+            int: The index of the product in the table.
+        """
+
+        log_ratio: float = math.log(ratio)
+        index: int = bisect.bisect(self._log_ratios, log_ratio)
+        if index == len(self._log_ratios):
+            return index - 1
+        if index > 0 and (
+            log_ratio - self._log_ratios[index - 1]
+            <= self._log_ratios[index] - log_ratio
+        ):
+            return index - 1
+        return index
+
+    def compare(self, result: InspectionResult, parameters: Parameters = None) -> None:
+        """
+        Classifies an inspected board to its nearest product and checks it against the
+        tolerance of that product.
+
+        Args:
+            result (InspectionResult): The result, its status must be OK; its sku and
+                verdict are set.
+            parameters (Parameters): The hole tolerances, the holes are not compared
+                with the holes of the product if None.
+
+        Returns:
+            None
+
+        Example:
+            ```python
+            table = ProfileTable()
+            table.add("A-600", profile_a, 1.05)
+            table.add("B-900", profile_b, 1.05)
+            table.compare(result)
+            print(result.sku, result.verdict)
+            ```
+        """
+
+        index: int = self.nearest(result.ratio)
+        result.sku = self.skus[index]
+        result.verdict = compare_ratio(
+            result.ratio, self.profiles[index].ratio, self.margin_errors[index]
+        )
+        if parameters is not None and self.profiles[index].holes is not None:
+            compare_holes(
+                result,
+                np.array(self.profiles[index].holes),
+                parameters.hole_margin,
+                parameters.hole_diameter_margin,
+            )
+
+
+def read_table(path: str) -> list[dict]:
+    """
+    Reads a table file: a JSON list of products, each with its name ("sku"), the path of
+    its reference image ("reference") and optionally its tolerance ("margin_error").
+
+    Args:
+        path (str): The path of the table file.
+
+    Returns:
+        list[dict]: The entries of the table.
+
+    Raises:
+        ValueError: If an entry misses a name or a reference, or has unknown keys.
+    """
+
+    with open(path, encoding="utf-8") as file:
+        entries: list[dict] = json.load(file)
+    for entry in entries:
+        if "sku" not in entry or "reference" not in entry:
+            raise ValueError(f"Entry {entry} of {path} needs a sku and a reference")
+        unknown: set[str] = set(entry) - set(TABLE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown keys {sorted(unknown)} in {path}")
+    return entries
@@ -2,11 +2,24 @@ import numpy as np
 
 
 class Rectangle:
+    __slots__ = (
+        "_contours",
+        "_largest_contour",
+        "_min_area_rect",
+        "_coord",
+        "_rotation_matrix",
+        "_angle",
+        "_size",
+        "_ratio",
+    )
+
     def __init__(self) -> None:
         self.contours: tuple[np.ndarray, ...] = None
         self.largest_contour: np.ndarray = None
+        self.min_area_rect: tuple = None
         self.coord: list[int] = [0, 0]
         self.rotation_matrix: np.ndarray = None
+        self.angle: float = 0.0
         self.size: list[int] = [0, 0]
         self.ratio: float = 0.0
 
@@ -26,6 +39,14 @@ class Rectangle:
     def size(self, new_size: list[int]):
         self._size = new_size
 
+    @property
+    def angle(self):
+        return self._angle
+
+    @angle.setter
+    def angle(self, new_angle: float):
+        self._angle = new_angle
+
     @property
     def rotation_matrix(self):
         return self._rotation_matrix
@@ -50,6 +71,14 @@ class Rectangle:
     def largest_contour(self, new_largest_contour: np.ndarray):
         self._largest_contour = new_largest_contour
 
+    @property
+    def min_area_rect(self):
+        return self._min_area_rect
+
+    @min_area_rect.setter
+    def min_area_rect(self, new_min_area_rect: tuple):
+        self._min_area_rect = new_min_area_rect
+
     @property
     def contours(self):
         return self._contours
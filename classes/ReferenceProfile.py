@@ -0,0 +1,59 @@
+import os
+
+from classes.InspectionResult import InspectionResult
+from loader import FRAME_SEPARATOR, split_frame_path
+
+
+class ReferenceProfile:
+    def __init__(self) -> None:
+        self.filename: str = None
+        # Real path of the reference image, "path#index" for a raw frame
+        self.path: str = None
+        self.image_hash: str = None
+        self.parameters_fingerprint: str = None
+        self.ratio: float = None
+        self.circle_diameter: float = None
+        self.circle_from_top: float = None
+        self.circle_from_left: float = None
+        # Rows of x, y, diameter, see InspectionResult.hole_pattern
+        self.holes: list[list[float]] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.image_hash}:{self.parameters_fingerprint}"
+
+    @classmethod
+    def from_result(
+        cls,
+        result: InspectionResult,
+        image_hash: str,
+        parameters_fingerprint: str,
+        image_path: str = None,
+    ) -> "ReferenceProfile":
+        profile: ReferenceProfile = cls()
+        profile.filename = result.filename
+        if image_path is not None:
+            file_path, frame_index = split_frame_path(image_path)
+            profile.path = os.path.realpath(file_path) + (
+                f"{FRAME_SEPARATOR}{frame_index}" if frame_index is not None else ""
+            )
+        profile.image_hash = image_hash
+        profile.parameters_fingerprint = parameters_fingerprint
+        profile.ratio = result.ratio
+        if result.circle_diameter is not None:  # A board with a single hole
+            profile.circle_diameter = float(result.circle_diameter)
+            profile.circle_from_top = float(result.circle_from_top)
+            profile.circle_from_left = float(result.circle_from_left)
+        if result.hole_pattern is not None:
+            profile.holes = result.hole_pattern.tolist()
+        return profile
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "ReferenceProfile":
+        profile: ReferenceProfile = cls()
+        for name, value in values.items():
+            setattr(profile, name, value)
+        return profile
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
@@ -0,0 +1,87 @@
+from typing import Tuple
+import json
+import os
+
+from classes.Parameters import Parameters
+from classes.ReferenceProfile import ReferenceProfile
+from loader import file_digest, split_frame_path
+
+
+class ReferenceStore:
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.profiles: dict[str, ReferenceProfile] = {}
+        # Content hashes already computed: path -> (size, mtime, hash)
+        self._digests: dict[str, Tuple[int, int, str]] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as file:
+                for values in json.load(file):
+                    profile: ReferenceProfile = ReferenceProfile.from_dict(values)
+                    self.profiles[profile.key] = profile
+
+    def image_hash(self, image_path: str) -> str:
+        file_path, frame_index = split_frame_path(image_path)
+        stat: os.stat_result = os.stat(file_path)
+        size, mtime, digest = self._digests.get(file_path, (None, None, None))
+        if (size, mtime) != (stat.st_size, stat.st_mtime_ns):
+            digest = file_digest(file_path)
+            self._digests[file_path] = (stat.st_size, stat.st_mtime_ns, digest)
+        if frame_index is not None:
+            return f"{digest}#{frame_index}"
+        return digest
+
+    def get(self, image_path: str, parameters: Parameters) -> ReferenceProfile:
+        """
+        Looks up the profile of a reference image.
+
+        The profile is keyed by the content of the image and the measurement parameters,
+        so it misses as soon as the image or any of these parameters changes.
+
+        Args:
+            image_path (str): The path of the reference image.
+            parameters (Parameters): The pipeline parameters.
+
+        Returns:
+            ReferenceProfile: The stored profile, or None if it must be computed again.
+        """
+
+        return self.profiles.get(
+            f"{self.image_hash(image_path)}:{parameters.fingerprint()}"
+        )
+
+    def put(self, profile: ReferenceProfile) -> None:
+        """
+        Stores a profile and writes the store to disk.
+
+        Older profiles of the same image path are dropped, they were measured on another
+        version of the image or with other parameters. Images of the same name in other
+        folders, such as the references of a product table, keep their profiles.
+
+        Args:
+            profile (ReferenceProfile): The profile to store.
+
+        Returns:
+            None
+        """
+
+        self.profiles = {
+            key: stored_profile
+            for key, stored_profile in self.profiles.items()
+            if stored_profile.path != profile.path
+            # Stored without a path by an older version, only the name is known
+            and (
+                stored_profile.path is not None
+                or stored_profile.filename != profile.filename
+            )
+        }
+        self.profiles[profile.key] = profile
+
+        # Written next to the store then renamed, a crash never leaves a partial file
+        temporary_path: str = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(
+                [stored_profile.to_dict() for stored_profile in self.profiles.values()],
+                file,
+                indent=2,
+            )
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,168 @@
+from typing import Final
+import os
+import pickle
+import sqlite3
+import time
+
+from loader import file_digest
+
+# Once over max_bytes, the cache is evicted down to this fraction of it, so that the
+# next puts do not evict again
+LOW_WATER: Final[float] = 0.9
+# Least recently used outputs read at a time while evicting
+EVICTION_BATCH: Final[int] = 64
+
+
+class ResultCache:
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        # Autocommit, several worker processes share the file
+        self._connection: sqlite3.Connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS files"
+            " (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash TEXT)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS stages"
+            " (key TEXT PRIMARY KEY, value BLOB, size INTEGER, last_used REAL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS stages_last_used ON stages (last_used)"
+        )
+        # Running total of the stored sizes, shared by the processes using the file
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)"
+        )
+        self._connection.execute(
+            "INSERT OR IGNORE INTO meta"
+            " SELECT 'total_size', CAST(TOTAL(size) AS INTEGER) FROM stages"
+        )
+
+    def file_hash(self, image_path: str, data: bytes = None) -> str:
+        """
+        Hashes the content of a file, the hash is only computed again when the size or
+        modification time of the file changed.
+
+        Args:
+            image_path (str): The path of the file.
+            data (bytes): The content of the file, already read by a Prefetcher; it is
+                hashed in memory instead of reading the file again, unless its size is
+                not the size of the file anymore.
+
+        Returns:
+            str: The hexadecimal SHA-256 of the file content.
+        """
+
+        stat: os.stat_result = os.stat(image_path)
+        path: str = os.path.abspath(image_path)
+        row: tuple = self._connection.execute(
+            "SELECT hash FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, stat.st_size, stat.st_mtime_ns),
+        ).fetchone()
+        if row is not None:
+            return row[0]
+
+        digest: str = file_digest(
+            image_path, data if data is not None and len(data) == stat.st_size else None
+        )
+        self._connection.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, digest),
+        )
+        return digest
+
+    def get(self, key: str) -> dict:
+        """
+        Returns the output of a stage stored by put, and marks it as recently used.
+
+        Args:
+            key (str): The key of the stage output.
+
+        Returns:
+            dict: The stored output, or None if it is not cached.
+        """
+
+        row: tuple = self._connection.execute(
+            "SELECT value FROM stages WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._connection.execute(
+            "UPDATE stages SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value: dict) -> None:
+        """
+        Stores the output of a stage. When the cache no longer fits in max_bytes, the
+        least recently used outputs are evicted until it fits in LOW_WATER of it.
+
+        The total size is kept up to date with each change, so a put never scans the
+        whole cache.
+
+        Args:
+            key (str): The key of the stage output.
+            value (dict): The output, any picklable value.
+
+        Returns:
+            None
+        """
+
+        data: bytes = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        # Immediate, the total of another process is never updated in between
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            row: tuple = self._connection.execute(
+                "SELECT size FROM stages WHERE key = ?", (key,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+            total: int = self._add_size(len(data) - (row[0] if row else 0))
+            if total > self.max_bytes:
+                self._evict(total - int(LOW_WATER * self.max_bytes))
+            self._connection.execute("COMMIT")
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+
+    def _add_size(self, size: int) -> int:
+        self._connection.execute(
+            "UPDATE meta SET value = value + ? WHERE name = 'total_size'", (size,)
+        )
+        return self._connection.execute(
+            "SELECT value FROM meta WHERE name = 'total_size'"
+        ).fetchone()[0]
+
+    def _evict(self, excess: int) -> None:
+        # The oldest outputs first, a batch at a time through the last_used index
+        evicted: int = 0
+        while evicted < excess:
+            rows: list[tuple[str, int]] = self._connection.execute(
+                "SELECT key, size FROM stages ORDER BY last_used LIMIT ?",
+                (EVICTION_BATCH,),
+            ).fetchall()
+            if not rows:
+                break
+            evicted_keys: list[tuple[str]] = []
+            for evicted_key, size in rows:
+                if evicted >= excess:
+                    break
+                evicted_keys.append((evicted_key,))
+                evicted += size
+            self._connection.executemany(
+                "DELETE FROM stages WHERE key = ?", evicted_keys
+            )
+        self._add_size(-evicted)
+
+    def close(self) -> None:
+        self._connection.close()
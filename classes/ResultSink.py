@@ -0,0 +1,146 @@
+from typing import Final, Tuple
+import csv
+import json
+import os
+import sqlite3
+import time
+
+from classes.InspectionResult import RECORD_FIELDS, InspectionResult
+
+FORMATS: Final[dict[str, str]] = {
+    ".jsonl": "jsonl",
+    ".csv": "csv",
+    ".sqlite": "sqlite",
+    ".db": "sqlite",
+}
+# Written with every record, runs appended to the same file stay distinguishable
+SINK_FIELDS: Final[Tuple[str, ...]] = ("inspected_at", *RECORD_FIELDS)
+
+
+class ResultSink:
+    def __init__(self, path: str, batch_size: int = 256) -> None:
+        extension: str = os.path.splitext(path)[1].lower()
+        if extension not in FORMATS:
+            raise ValueError(
+                f"Unknown result format {extension}, expected one of {', '.join(FORMATS)}"
+            )
+        self.path: str = path
+        self.format: str = FORMATS[extension]
+        self.batch_size: int = max(1, batch_size)
+        self.written: int = 0
+        # Where a CSV file with other columns was moved, see _rotate_csv
+        self.rotated_path: str = None
+        self._records: list[dict] = []
+
+        if self.format == "sqlite":
+            self._connection: sqlite3.Connection = sqlite3.connect(path)
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS results ({', '.join(SINK_FIELDS)})"
+            )
+            # A table written by an older version misses the newer fields
+            columns: set[str] = {
+                row[1] for row in self._connection.execute("PRAGMA table_info(results)")
+            }
+            with self._connection:
+                for field in SINK_FIELDS:
+                    if field not in columns:
+                        self._connection.execute(
+                            f"ALTER TABLE results ADD COLUMN {field}"
+                        )
+        else:
+            if self.format == "csv":
+                self._rotate_csv()
+            new_file: bool = not os.path.exists(path) or os.path.getsize(path) == 0
+            self._file = open(path, "a", encoding="utf-8", newline="")
+            if self.format == "csv":
+                self._writer: csv.DictWriter = csv.DictWriter(
+                    self._file, fieldnames=SINK_FIELDS
+                )
+                if new_file:
+                    self._writer.writeheader()
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def write(self, result: InspectionResult) -> None:
+        """
+        Buffers the record of a result, the buffer is written every batch_size records.
+
+        Args:
+            result (InspectionResult): The result, with its verdict if it has one.
+
+        Returns:
+            None
+
+        Example:
+            ```python
+            with ResultSink("./results.sqlite") as sink:
+                for result in inspector.run(paths):
+                    sink.write(result)
+            ```
+        """
+
+        self._records.append({"inspected_at": time.time(), **result.to_record()})
+        if len(self._records) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered records, in a single transaction for SQLite.
+
+        Returns:
+            None
+        """
+
+        if not self._records:
+            return
+        if self.format == "sqlite":
+            with self._connection:
+                self._connection.executemany(
+                    f"INSERT INTO results ({', '.join(SINK_FIELDS)}) "
+                    f"VALUES ({', '.join('?' * len(SINK_FIELDS))})",
+                    [
+                        tuple(record[field] for field in SINK_FIELDS)
+                        for record in self._records
+                    ],
+                )
+        elif self.format == "csv":
+            self._writer.writerows(self._records)
+            self._file.flush()
+        else:
+            self._file.write(
+                "".join(
+                    json.dumps(record, ensure_ascii=False) + "\n"
+                    for record in self._records
+                )
+            )
+            self._file.flush()
+        self.written += len(self._records)
+        self._records = []
+
+    def _rotate_csv(self) -> None:
+        # The rows appended under a header with other columns would be read wrong: the
+        # file is kept aside, named after its last write, and a new one is started
+        try:
+            with open(self.path, encoding="utf-8", newline="") as file:
+                header: list[str] = next(csv.reader(file), None)
+        except FileNotFoundError:
+            return
+        if header is None or tuple(header) == SINK_FIELDS:
+            return
+        root, extension = os.path.splitext(self.path)
+        stamp: str = time.strftime(
+            "%Y%m%d-%H%M%S", time.localtime(os.path.getmtime(self.path))
+        )
+        self.rotated_path = f"{root}-{stamp}{extension}"
+        os.replace(self.path, self.rotated_path)
+
+    def close(self) -> None:
+        self.flush()
+        if self.format == "sqlite":
+            self._connection.close()
+        else:
+            self._file.close()
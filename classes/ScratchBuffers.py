@@ -0,0 +1,52 @@
+from typing import Tuple
+import math
+
+import numpy as np
+
+
+class ScratchBuffers:
+    __slots__ = ("_buffers", "allocations")
+
+    def __init__(self) -> None:
+        # name -> flat backing array, only ever grown
+        self._buffers: dict[str, np.ndarray] = {}
+        self.allocations: int = 0
+
+    def get(
+        self, name: str, shape: Tuple[int, ...], dtype: np.dtype = np.uint8
+    ) -> np.ndarray:
+        """
+        Returns a buffer of the given shape, to pass as dst= to an OpenCV function.
+
+        The buffer is a view on a backing array kept between calls, so processing images
+        of the same size, or smaller, allocates nothing. The previous content of the
+        buffer is overwritten: a name must only be used once per image, and the result
+        must not be kept after the next image.
+
+        Args:
+            name (str): The name of the buffer, one per stage output.
+            shape (Tuple[int, ...]): The shape of the buffer.
+            dtype (np.dtype): The type of the buffer.
+
+        Returns:
+            np.ndarray: A C-contiguous array of the given shape, with undefined content.
+
+        Example:
+            ```python
+            buffers = ScratchBuffers()
+            gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY, dst=buffers.get("gray", image.shape[:2]))
+            ```
+        """
+
+        size: int = math.prod(shape)
+        buffer: np.ndarray = self._buffers.get(name)
+        if buffer is None or buffer.size < size or buffer.dtype != dtype:
+            # Some headroom, the crop size varies a little from one image to the next
+            buffer = np.empty(size + size // 8, dtype)
+            self._buffers[name] = buffer
+            self.allocations += 1
+        return buffer[:size].reshape(shape)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for buffer in self._buffers.values())
@@ -0,0 +1,180 @@
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from typing import Callable, Iterator
+import itertools
+import os
+import threading
+import time
+
+from classes.FolderWatcher import FolderWatcher
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from classes.BatchInspector import _create_cache, _init_worker, _process_chunk
+from loader import iter_frame_paths
+
+
+class _InlineExecutor(Executor):
+    # Runs each submitted call right away in the current process, for a single worker
+    def __init__(self, initializer: Callable, initargs: tuple) -> None:
+        initializer(*initargs)
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exception:
+            future.set_exception(exception)
+        return future
+
+
+class StreamInspector:
+    def __init__(
+        self,
+        parameters: Parameters,
+        workers: int = None,
+        max_in_flight: int = None,
+        max_queue: int = 64,
+        cache_path: str = None,
+        cache_max_bytes: int = 512 * 1024 * 1024,
+        preview_scale: float = None,
+    ) -> None:
+        self.parameters: Parameters = parameters
+        self.preview_scale: float = preview_scale
+        self.cache_path: str = cache_path
+        self.cache_max_bytes: int = cache_max_bytes
+        self.workers: int = workers if workers is not None else os.cpu_count() or 1
+        self.max_in_flight: int = (
+            max(1, max_in_flight) if max_in_flight is not None else 2 * self.workers
+        )
+        self.max_queue: int = max(1, max_queue)
+
+        # ==========#
+        # COUNTERS  #
+        # ==========#
+        self.processed: int = 0
+        self.queue_depth: int = 0
+        self.max_queue_depth: int = 0
+        self.started_at: float = None
+
+    @property
+    def throughput(self) -> float:
+        """Images processed per second since the first image was queued."""
+        if self.started_at is None or self.processed == 0:
+            return 0.0
+        return self.processed / (time.monotonic() - self.started_at)
+
+    def run(
+        self,
+        watcher: FolderWatcher,
+        stop: threading.Event = None,
+        idle_timeout: float = None,
+    ) -> Iterator[InspectionResult]:
+        """
+        Inspects the images landing in a folder, until stopped, and yields the results in
+        arrival order.
+
+        Backpressure: at most max_in_flight images are being processed and max_queue
+        images wait for a worker; while the queue is full the folder is not polled, so the
+        next files simply stay on disk until there is room. The frames of a raw file are
+        queued as room is made, the folder is polled again once they are all queued. A
+        single worker runs in the current process, where a profiler sees it. With a
+        preview_scale, each result keeps its preview, see process_image.
+
+        Args:
+            watcher (FolderWatcher): The watcher of the folder.
+            stop (threading.Event): Stops the run once set, in-flight images are finished.
+            idle_timeout (float): Stops the run after this many seconds without any image.
+
+        Returns:
+            Iterator[InspectionResult]: The results, in arrival order.
+
+        Example:
+            ```python
+            inspector = StreamInspector(Parameters(), workers=4)
+            for result in inspector.run(FolderWatcher("./images")):
+                print(result.filename, result.status, inspector.throughput)
+            ```
+        """
+
+        waiting: deque[str] = deque()
+        # The frame references of the last raw files not queued yet
+        frames: Iterator[str] = iter(())
+        in_flight: deque[Future] = deque()
+        last_activity: float = time.monotonic()
+        if self.workers > 1:
+            _create_cache(self.cache_path, self.cache_max_bytes)
+        with (
+            ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.cache_path, self.cache_max_bytes),
+            )
+            if self.workers > 1
+            else _InlineExecutor(
+                _init_worker, (self.cache_path, self.cache_max_bytes)
+            )
+        ) as executor:
+            try:
+                while not (stop is not None and stop.is_set()):
+                    waiting.extend(
+                        itertools.islice(frames, self.max_queue - len(waiting))
+                    )
+                    # Room left in the queue, the frames are all queued
+                    if len(waiting) < self.max_queue:
+                        new_paths: list[str] = watcher.poll(
+                            self.max_queue - len(waiting)
+                        )
+                        if new_paths and self.started_at is None:
+                            self.started_at = time.monotonic()
+                        frames = iter_frame_paths(new_paths)
+                        waiting.extend(
+                            itertools.islice(frames, self.max_queue - len(waiting))
+                        )
+                    while waiting and len(in_flight) < self.max_in_flight:
+                        in_flight.append(
+                            executor.submit(
+                                _process_chunk,
+                                [waiting.popleft()],
+                                self.parameters,
+                                self.preview_scale,
+                            )
+                        )
+                    self._update_queue_depth(waiting, in_flight)
+
+                    if waiting or in_flight:
+                        last_activity = time.monotonic()
+                    elif (
+                        idle_timeout is not None
+                        and time.monotonic() - last_activity >= idle_timeout
+                    ):
+                        return
+
+                    # Results are yielded in order, as soon as the oldest one is done
+                    if in_flight:
+                        wait([in_flight[0]], watcher.poll_interval, FIRST_COMPLETED)
+                    else:
+                        time.sleep(watcher.poll_interval)
+                    while in_flight and in_flight[0].done():
+                        yield self._pop_result(waiting, in_flight)
+
+                while in_flight:
+                    yield self._pop_result(waiting, in_flight)
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    def _pop_result(self, waiting: deque, in_flight: deque) -> InspectionResult:
+        result: InspectionResult = in_flight.popleft().result()[0]
+        self.processed += 1
+        self._update_queue_depth(waiting, in_flight)
+        return result
+
+    def _update_queue_depth(self, waiting: deque, in_flight: deque) -> None:
+        self.queue_depth = len(waiting) + len(in_flight)
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
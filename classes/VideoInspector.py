@@ -0,0 +1,212 @@
+from typing import Iterator, Tuple, Union
+import copy
+import math
+import os
+import threading
+import time
+
+import cv2 as cv
+import numpy as np
+
+from classes.InspectionResult import InspectionResult
+from classes.Parameters import Parameters
+from classes.ScratchBuffers import ScratchBuffers
+from loader import FRAME_SEPARATOR
+from pipeline import inspect_image, record_stage
+
+
+class VideoInspector:
+    def __init__(
+        self,
+        parameters: Parameters,
+        search_margin: float = 0.1,
+        full_every: int = 30,
+    ) -> None:
+        self.parameters: Parameters = parameters
+        self.search_margin: float = search_margin
+        self.full_every: int = max(1, full_every)
+        self._buffers: ScratchBuffers = ScratchBuffers()
+        # Where to look for the board and its hole on the next frame, None once lost:
+        # left, top, right, bottom of the frame and x, y, radius in the crop
+        self._window: Tuple[int, int, int, int] = None
+        self._circle: np.ndarray = None
+        # Frames inspected since the last full detection, this one included
+        self._since_full: int = 0
+        # The frame of the last result yielded by run, until the next one is read
+        self.frame: np.ndarray = None
+
+        # ==========#
+        # COUNTERS  #
+        # ==========#
+        self.processed: int = 0
+        self.tracked: int = 0
+        self.lost: int = 0
+        self.started_at: float = None
+
+    @property
+    def throughput(self) -> float:
+        """Frames processed per second since the first frame was read."""
+        if self.started_at is None or self.processed == 0:
+            return 0.0
+        return self.processed / (time.monotonic() - self.started_at)
+
+    def inspect(self, frame: np.ndarray, result: InspectionResult) -> InspectionResult:
+        """
+        Inspects a frame, looking for the board and its hole only near where they
+        were on the previous frame.
+
+        The search window is cut from the frame before it is resized, at the scale of
+        the whole frame, so the measurements do not depend on the window. The whole
+        frame is searched on the first frame, when the board is not entirely inside its
+        window, and every full_every frames so that a second hole or a board entering
+        the frame elsewhere is noticed.
+
+        Args:
+            frame (np.ndarray): The BGR or gray frame.
+            result (InspectionResult): The result to fill.
+
+        Returns:
+            InspectionResult: The result, without verdict.
+        """
+
+        scale: float = self.parameters.max_dimension / max(frame.shape[:2])
+        if self._window is not None and self._since_full < self.full_every:
+            left, top, right, bottom = self._window
+            window: np.ndarray = frame[top:bottom, left:right]
+            parameters: Parameters = copy.copy(self.parameters)
+            parameters.max_dimension = max(1, round(scale * max(window.shape[:2])))
+            inspect_image(
+                window,
+                parameters,
+                result=result,
+                buffers=self._buffers,
+                expected_circle=self._circle,
+            )
+            if result.status != InspectionResult.NO_RECTANGLE and self._inside(
+                result, frame.shape, window.shape, scale
+            ):
+                # Back to the coordinates of the whole resized frame. The rotation is
+                # around the center of the rectangle, so the rotated rectangle moves by
+                # the same offset
+                offset: Tuple[int, int] = (round(left * scale), round(top * scale))
+                result.rectangle_coord = [
+                    result.rectangle_coord[0] + offset[0],
+                    result.rectangle_coord[1] + offset[1],
+                ]
+                result.rotated_rectangle_coord = [
+                    result.rotated_rectangle_coord[0] + offset[0],
+                    result.rotated_rectangle_coord[1] + offset[1],
+                ]
+                # the measurements stay in crop coordinates
+                result.crop_matrix[:, 2] -= result.crop_matrix[:, :2] @ offset
+                self.tracked += 1
+                self._since_full += 1
+                self._follow(result, frame.shape, scale)
+                return result
+            self.lost += 1
+            # The time spent in the window stays in the measurements of the frame
+            retry: InspectionResult = InspectionResult(result.filename)
+            retry.timings = result.timings
+            retry.allocated_bytes = result.allocated_bytes
+            result = retry
+
+        inspect_image(frame, self.parameters, result=result, buffers=self._buffers)
+        self._since_full = 1
+        self._follow(result, frame.shape, scale)
+        return result
+
+    def run(
+        self, source: Union[str, int], stop: threading.Event = None
+    ) -> Iterator[InspectionResult]:
+        """
+        Inspects the frames of a video source one after the other, as fast as they come.
+
+        Args:
+            source (Union[str, int]): A video file, an image sequence such as
+                "frames/%04d.jpg", or the index of a camera.
+            stop (threading.Event): Stops the run once set.
+
+        Returns:
+            Iterator[InspectionResult]: The results, named "source#index", in order.
+
+        Raises:
+            ValueError: If the source cannot be opened.
+
+        Example:
+            ```python
+            inspector = VideoInspector(Parameters())
+            for result in inspector.run("./conveyor.mp4"):
+                print(result.filename, result.status, inspector.throughput)
+            ```
+        """
+
+        capture: cv.VideoCapture = cv.VideoCapture(source)
+        if not capture.isOpened():
+            raise ValueError(f"Cannot open the video source {source}")
+        name: str = os.path.basename(source) if isinstance(source, str) else str(source)
+        self.started_at = time.monotonic()
+        try:
+            while stop is None or not stop.is_set():
+                start: float = time.perf_counter()
+                read, frame = capture.read()
+                if not read:
+                    return
+                result: InspectionResult = InspectionResult(
+                    f"{name}{FRAME_SEPARATOR}{self.processed}"
+                )
+                record_stage(result, "decode", start, frame)
+                result = self.inspect(frame, result)
+                self.frame = frame
+                self.processed += 1
+                yield result
+        finally:
+            capture.release()
+
+    def _inside(
+        self,
+        result: InspectionResult,
+        frame_shape: Tuple[int, ...],
+        window_shape: Tuple[int, ...],
+        scale: float,
+    ) -> bool:
+        # The board touching a side of the window may go on outside of it
+        left, top, right, bottom = self._window
+        x, y = result.rectangle_coord
+        width, height = result.rectangle_size
+        window_width: int = int(window_shape[1] * scale) - 1
+        window_height: int = int(window_shape[0] * scale) - 1
+        return (
+            (x > 0 or left == 0)
+            and (y > 0 or top == 0)
+            and (x + width < window_width or right == frame_shape[1])
+            and (y + height < window_height or bottom == frame_shape[0])
+        )
+
+    def _follow(
+        self, result: InspectionResult, frame_shape: Tuple[int, ...], scale: float
+    ) -> None:
+        if result.status in (
+            InspectionResult.BAD_EXTENSION,
+            InspectionResult.UNREADABLE,
+            InspectionResult.NO_RECTANGLE,
+        ):
+            self._window = None
+            self._circle = None
+            return
+
+        # From the resized frame to the frame, with the search margin around the board
+        x, y = np.divide(result.rectangle_coord, scale)
+        width, height = np.divide(result.rectangle_size, scale)
+        margin: float = self.search_margin * max(width, height) + 2 / scale
+        self._window = (
+            max(0, int(x - margin)),
+            max(0, int(y - margin)),
+            min(frame_shape[1], math.ceil(x + width + margin)),
+            min(frame_shape[0], math.ceil(y + height + margin)),
+        )
+        # Only a single hole is refined around where it was
+        self._circle = (
+            result.circles[0]
+            if result.status == InspectionResult.OK and len(result.circles) == 1
+            else None
+        )
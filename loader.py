@@ -0,0 +1,384 @@
+from collections import OrderedDict
+from typing import BinaryIO, Final, Iterable, Iterator, Tuple
+import hashlib
+import io
+import os
+import struct
+import cv2 as cv
+import numpy as np
+
+# JPEG markers carrying the frame size (SOF0 to SOF15, without DHT, JPG and DAC)
+JPEG_SOF_MARKERS: Final[frozenset[int]] = frozenset(
+    range(0xC0, 0xD0)
+) - frozenset((0xC4, 0xC8, 0xCC))
+# JPEG markers without a length field
+JPEG_STANDALONE_MARKERS: Final[frozenset[int]] = frozenset(
+    (0x01, *range(0xD0, 0xD9))
+)
+PNG_SIGNATURE: Final[bytes] = b"\x89PNG\r\n\x1a\n"
+DIGEST_BLOCK_SIZE: Final[int] = 1 << 20
+
+# Raw frames: a little endian header, then the uint8 pixels of every frame, row major
+RAW_EXTENSION: Final[str] = ".raw"
+RAW_MAGIC: Final[bytes] = b"RAWFRAME"
+RAW_VERSION: Final[int] = 1
+# magic, version, channels, width, height, frame count, offset of the first frame
+RAW_HEADER: Final[struct.Struct] = struct.Struct("<8sHHIIIQ")
+RAW_HEADER_SIZE: Final[int] = 64  # The pixels start on a cache line
+# One frame of a multi-frame file is addressed as "path#index"
+FRAME_SEPARATOR: Final[str] = "#"
+MAX_OPEN_RAW_FILES: Final[int] = 8
+
+# Reduced decode flags, the largest reduction first
+REDUCED_COLOR_FLAGS: Final[Tuple[Tuple[int, int], ...]] = (
+    (8, cv.IMREAD_REDUCED_COLOR_8),
+    (4, cv.IMREAD_REDUCED_COLOR_4),
+    (2, cv.IMREAD_REDUCED_COLOR_2),
+)
+REDUCED_GRAYSCALE_FLAGS: Final[Tuple[Tuple[int, int], ...]] = (
+    (8, cv.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv.IMREAD_REDUCED_GRAYSCALE_2),
+)
+
+
+def _read_jpeg_size(stream: BinaryIO) -> Tuple[int, int]:
+    while True:
+        byte: bytes = stream.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker: bytes = stream.read(1)
+        while marker == b"\xff":  # Fill bytes
+            marker = stream.read(1)
+        if not marker or marker[0] == 0xD9:  # EOI
+            return None
+        if marker[0] in JPEG_STANDALONE_MARKERS:
+            continue
+        segment_length: int = struct.unpack(">H", stream.read(2))[0]
+        if marker[0] in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">xHH", stream.read(5))
+            return height, width
+        stream.seek(segment_length - 2, io.SEEK_CUR)
+
+
+def read_image_size(image_path: str) -> Tuple[int, int]:
+    """
+    Reads the size of a JPEG or PNG image from its header, without decoding it.
+
+    The size is the one stored in the file, before any EXIF rotation.
+
+    Args:
+        image_path (str): The path of the image.
+
+    Returns:
+        Tuple[int, int]: The height and width of the image, or None if unknown.
+    """
+
+    try:
+        with open(image_path, "rb") as stream:
+            return read_image_size_from_stream(stream)
+    except (OSError, struct.error):
+        return None
+
+
+def read_image_size_from_stream(stream: BinaryIO) -> Tuple[int, int]:
+    """
+    Same as read_image_size, for an already opened binary stream.
+
+    Args:
+        stream (BinaryIO): The stream, positioned at the start of the image.
+
+    Returns:
+        Tuple[int, int]: The height and width of the image, or None if unknown.
+    """
+
+    signature: bytes = stream.read(8)
+    if signature[:2] == b"\xff\xd8":
+        stream.seek(2 - len(signature), io.SEEK_CUR)
+        return _read_jpeg_size(stream)
+    if signature == PNG_SIGNATURE:
+        # The IHDR chunk always comes first: length, type, width, height
+        width, height = struct.unpack(">8xII", stream.read(16))
+        return height, width
+    return None
+
+
+def choose_reduced_flag(
+    image_size: Tuple[int, int], max_dimension: int, grayscale: bool = False
+) -> int:
+    """
+    Picks the imread flag decoding the image at the smallest scale still larger than
+    max_dimension, so the final resize never upsamples.
+
+    JPEG files are decoded at the reduced scale directly (DCT scaling), which is much
+    cheaper than decoding the full sensor resolution.
+
+    Args:
+        image_size (Tuple[int, int]): The height and width of the encoded image.
+        max_dimension (int): The size of the longest side after resizing.
+        grayscale (bool): Decode to a single channel.
+
+    Returns:
+        int: The flag to give to cv.imread or cv.imdecode.
+    """
+
+    if image_size is not None:
+        for reduction, flag in (
+            REDUCED_GRAYSCALE_FLAGS if grayscale else REDUCED_COLOR_FLAGS
+        ):
+            if max(image_size) // reduction >= max_dimension:
+                return flag
+    return cv.IMREAD_GRAYSCALE if grayscale else cv.IMREAD_COLOR
+
+
+def load_image(
+    image_path: str, max_dimension: int, grayscale: bool = False
+) -> np.ndarray:
+    """
+    Decodes an image at the lowest resolution still enough for max_dimension.
+
+    Args:
+        image_path (str): The path of the image.
+        max_dimension (int): The size of the longest side after resizing.
+        grayscale (bool): Decode to a single channel when colors are not needed.
+
+    Returns:
+        np.ndarray: The decoded image, or None if it cannot be read.
+
+    Example:
+        ```python
+        image = load_image("./images/bon_image.jpg", 800, grayscale=True)
+        ```
+    """
+
+    return cv.imread(
+        image_path,
+        choose_reduced_flag(read_image_size(image_path), max_dimension, grayscale),
+    )
+
+
+def load_image_from_bytes(
+    data: bytes, max_dimension: int = None, grayscale: bool = False
+) -> np.ndarray:
+    """
+    Same as load_image, for the content of a file already read in memory.
+
+    Args:
+        data (bytes): The content of the JPEG or PNG file.
+        max_dimension (int): The size of the longest side after resizing, or None to
+            decode at full resolution.
+        grayscale (bool): Decode to a single channel when colors are not needed.
+
+    Returns:
+        np.ndarray: The decoded image, or None if it cannot be decoded.
+    """
+
+    flag: int = cv.IMREAD_COLOR
+    if max_dimension is not None:
+        try:
+            image_size: Tuple[int, int] = read_image_size_from_stream(io.BytesIO(data))
+        except struct.error:
+            image_size = None
+        flag = choose_reduced_flag(image_size, max_dimension, grayscale)
+    return cv.imdecode(np.frombuffer(data, np.uint8), flag)
+
+
+# Memory maps already opened by this process: path -> (size, mtime, frames)
+_raw_files: "OrderedDict[str, Tuple[int, int, np.ndarray]]" = OrderedDict()
+
+
+def write_raw_frames(path: str, frames: Iterable[np.ndarray]) -> int:
+    """
+    Writes frames of the same size and channels to a raw frame file.
+
+    Args:
+        path (str): The path of the file, ending with RAW_EXTENSION.
+        frames (Iterable[np.ndarray]): The gray or BGR uint8 frames.
+
+    Returns:
+        int: The number of frames written.
+
+    Example:
+        ```python
+        write_raw_frames("./images/run_1.raw", camera_frames)
+        ```
+    """
+
+    count: int = 0
+    shape: Tuple[int, ...] = None
+    with open(path, "wb") as stream:
+        stream.write(bytes(RAW_HEADER_SIZE))
+        for frame in frames:
+            if shape is None:
+                shape = frame.shape
+            elif frame.shape != shape:
+                raise ValueError(f"Frame {count} is {frame.shape}, expected {shape}")
+            stream.write(np.ascontiguousarray(frame, np.uint8).data)
+            count += 1
+        if shape is None:
+            raise ValueError("No frame to write")
+        stream.seek(0)
+        stream.write(
+            RAW_HEADER.pack(
+                RAW_MAGIC,
+                RAW_VERSION,
+                shape[2] if len(shape) == 3 else 1,
+                shape[1],
+                shape[0],
+                count,
+                RAW_HEADER_SIZE,
+            )
+        )
+    return count
+
+
+def open_raw_frames(path: str) -> np.ndarray:
+    """
+    Maps the frames of a raw frame file in memory, nothing is read until used.
+
+    The maps are kept open, a few files at a time, so that the workers slicing frames
+    out of the same file do not map it again for every frame.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        np.ndarray: A read-only array of count x height x width (x channels).
+
+    Raises:
+        ValueError: If the file is not a raw frame file, or is truncated.
+    """
+
+    stat: os.stat_result = os.stat(path)
+    size, mtime, frames = _raw_files.get(path, (None, None, None))
+    if (size, mtime) == (stat.st_size, stat.st_mtime_ns):
+        _raw_files.move_to_end(path)
+        return frames
+
+    with open(path, "rb") as stream:
+        header: bytes = stream.read(RAW_HEADER.size)
+    if len(header) < RAW_HEADER.size:
+        raise ValueError(f"{path} is not a raw frame file")
+    magic, version, channels, width, height, count, offset = RAW_HEADER.unpack(header)
+    if magic != RAW_MAGIC or version != RAW_VERSION or channels not in (1, 3):
+        raise ValueError(f"{path} is not a raw frame file")
+    if count == 0:
+        raise ValueError(f"{path} has no frame")
+    if offset + count * height * width * channels > stat.st_size:
+        raise ValueError(f"{path} is truncated")
+    shape: Tuple[int, ...] = (count, height, width)
+    if channels == 3:
+        shape += (channels,)
+
+    frames = np.memmap(path, np.uint8, "r", offset, shape)
+    _raw_files[path] = (stat.st_size, stat.st_mtime_ns, frames)
+    if len(_raw_files) > MAX_OPEN_RAW_FILES:
+        _raw_files.popitem(last=False)
+    return frames
+
+
+def split_frame_path(image_path: str) -> Tuple[str, int]:
+    """
+    Splits a "path#index" frame reference.
+
+    Args:
+        image_path (str): A file path, or a frame reference of a raw frame file.
+
+    Returns:
+        Tuple[str, int]: The file path and the frame index, None for a plain path.
+    """
+
+    file_path, separator, index = image_path.rpartition(FRAME_SEPARATOR)
+    if separator and index.isdigit() and file_path.endswith(RAW_EXTENSION):
+        return file_path, int(index)
+    return image_path, None
+
+
+def iter_frame_paths(image_paths: Iterable[str]) -> Iterator[str]:
+    """
+    Replaces each multi-frame raw file by the references of its frames, lazily: the
+    references of a raw file holding thousands of frames are only made as they are
+    consumed.
+
+    Args:
+        image_paths (Iterable[str]): The paths of the files to inspect.
+
+    Returns:
+        Iterator[str]: The same paths, with "path#index" for every frame of raw files
+            holding several frames.
+    """
+
+    for image_path in image_paths:
+        count: int = 1
+        if image_path.endswith(RAW_EXTENSION):
+            try:
+                count = len(open_raw_frames(image_path))
+            except (OSError, ValueError):
+                pass  # Reported as unreadable by the pipeline
+        if count > 1:
+            for index in range(count):
+                yield f"{image_path}{FRAME_SEPARATOR}{index}"
+        else:
+            yield image_path
+
+
+def expand_frame_paths(image_paths: Iterable[str]) -> list[str]:
+    """
+    Replaces each multi-frame raw file by the references of its frames, see
+    iter_frame_paths.
+
+    Args:
+        image_paths (Iterable[str]): The paths of the files to inspect.
+
+    Returns:
+        list[str]: The same paths, with "path#index" for every frame of raw files
+            holding several frames.
+    """
+
+    return list(iter_frame_paths(image_paths))
+
+
+def load_raw_frame(image_path: str) -> np.ndarray:
+    """
+    Returns a frame of a raw frame file without decoding or copying it.
+
+    Args:
+        image_path (str): A raw frame file, its first frame is returned, or a
+            "path#index" frame reference.
+
+    Returns:
+        np.ndarray: A read-only view of the frame, or None if it cannot be read.
+    """
+
+    file_path, index = split_frame_path(image_path)
+    try:
+        frames: np.ndarray = open_raw_frames(file_path)
+    except (OSError, ValueError):
+        return None
+    if not 0 <= (index or 0) < len(frames):
+        return None
+    return frames[index or 0]
+
+
+def file_digest(image_path: str, data: bytes = None) -> str:
+    """
+    Hashes the content of a file.
+
+    Args:
+        image_path (str): The path of the file.
+        data (bytes): The content of the file, if already read; the file is not
+            opened then.
+
+    Returns:
+        str: The hexadecimal SHA-256 of the file content.
+    """
+
+    if data is not None:
+        return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    with open(image_path, "rb") as stream:
+        for block in iter(lambda: stream.read(DIGEST_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
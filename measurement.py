@@ -0,0 +1,291 @@
+"""
+Sub-pixel measurements of the boards and of their holes.
+
+The corners of a board are refined by fitting a line to the contour points of each of
+its sides, then taken to the upright crop with the rotation of the crop, where the holes
+are found. Every measurement is then computed in that single coordinate system, for a
+whole batch of boards at once, or for every hole of a board at once.
+"""
+
+from typing import Final, Tuple
+
+import cv2 as cv
+import numpy as np
+
+# Contour points this close to a corner, as a fraction of the side, are left out of
+# the line fit: corners are rounded by the blur and the threshold
+CORNER_MARGIN: Final[float] = 0.1
+# Points further than this, in pixels, from the straightest part of a side are left out
+# of its line fit: the threshold may leak around the board
+SIDE_TOLERANCE: Final[float] = 1.5
+# A distance from the rectangle side holding at least this fraction of the samples of
+# the fullest one is an edge; the innermost edge is the board, the others are leaks
+EDGE_SUPPORT: Final[float] = 0.5
+
+
+def refine_corners(
+    contour: np.ndarray, image_shape: Tuple[int, ...] = None
+) -> np.ndarray:
+    """
+    Finds the four corners of a board with sub-pixel precision.
+
+    The contour is sampled every pixel and each sample is assigned to the closest side
+    of the minimum area rectangle. On each side, a line is fitted to the samples at the
+    innermost distance from the rectangle side holding nearly as many samples as the
+    most common one: the edge of the board rather than what the threshold leaked around
+    it, even when the leak runs along most of the side. The corners are the
+    intersections of consecutive lines. A side with fewer than two samples keeps the
+    side of the minimum area rectangle.
+
+    Args:
+        contour (np.ndarray): The contour of the board, as returned by findContours.
+        image_shape (Tuple[int, ...]): The shape of the image the contour was found on,
+            its samples along the border of the image are where the image cuts the
+            threshold, not an edge of the board.
+
+    Returns:
+        np.ndarray: The 4 x 2 float corners, in the order of cv.boxPoints.
+
+    Example:
+        ```python
+        corners = refine_corners(white_rectangle.largest_contour, image.shape)
+        ```
+    """
+
+    box: np.ndarray = cv.boxPoints(cv.minAreaRect(contour)).astype(np.float64)
+    points: np.ndarray = _sample_contour(contour.reshape(-1, 2).astype(np.float64))
+    if image_shape is not None:
+        points = points[
+            (points[:, 0] > 0)
+            & (points[:, 1] > 0)
+            & (points[:, 0] < image_shape[1] - 1)
+            & (points[:, 1] < image_shape[0] - 1)
+        ]
+    starts: np.ndarray = box
+    directions: np.ndarray = np.roll(box, -1, axis=0) - box
+    lengths: np.ndarray = np.maximum(np.linalg.norm(directions, axis=1), 1e-9)
+    directions /= lengths[:, np.newaxis]
+    normals: np.ndarray = directions[:, ::-1] * (1, -1)
+
+    # points x sides: distance to each side line, position along each side
+    offsets: np.ndarray = points[:, np.newaxis, :] - starts[np.newaxis]
+    distances: np.ndarray = np.abs(np.einsum("psk,sk->ps", offsets, normals))
+    positions: np.ndarray = np.einsum("psk,sk->ps", offsets, directions) / lengths
+    closest: np.ndarray = distances.argmin(axis=1)
+
+    lines: list[tuple[np.ndarray, np.ndarray]] = []
+    for side in range(4):
+        assigned: np.ndarray = (
+            (closest == side)
+            & (positions[:, side] >= CORNER_MARGIN)
+            & (positions[:, side] <= 1 - CORNER_MARGIN)
+        )
+        side_distances: np.ndarray = distances[assigned, side]
+        on_side: np.ndarray = points[assigned]
+        if len(on_side) >= 2:
+            # Samples are one pixel apart, a full distance bin is a long edge and the
+            # rectangle encloses the contour, the board is the innermost one
+            bins: np.ndarray = np.round(side_distances).astype(np.int64)
+            # At least as many bins as the kernel, so that "same" keeps them in place
+            counts: np.ndarray = np.convolve(
+                np.bincount(bins, minlength=3), np.ones(3), "same"
+            )
+            padded: np.ndarray = np.pad(counts, 1)
+            peaks: np.ndarray = (counts >= padded[:-2]) & (counts > padded[2:])
+            edge: int = np.flatnonzero(
+                peaks & (counts >= EDGE_SUPPORT * counts.max())
+            )[-1]
+            on_side = on_side[np.abs(side_distances - edge) <= SIDE_TOLERANCE]
+        if len(on_side) >= 2:
+            vx, vy, x0, y0 = cv.fitLine(
+                on_side.astype(np.float32), cv.DIST_L2, 0, 0.01, 0.01
+            ).ravel()
+            lines.append((np.array((x0, y0)), np.array((vx, vy))))
+        else:
+            lines.append((starts[side], directions[side]))
+
+    # Corner i starts side i, it is where side i - 1 meets side i
+    corners: np.ndarray = box.copy()
+    for side in range(4):
+        (p1, d1), (p2, d2) = lines[side - 1], lines[side]
+        determinant: float = d1[0] * d2[1] - d1[1] * d2[0]
+        if abs(determinant) < 1e-9:  # Parallel, keep the rectangle corner
+            continue
+        t: float = ((p2[0] - p1[0]) * d2[1] - (p2[1] - p1[1]) * d2[0]) / determinant
+        corners[side] = p1 + t * d1
+    return corners.astype(np.float32)
+
+
+def _sample_contour(points: np.ndarray) -> np.ndarray:
+    # Contours are stored as the ends of their straight runs, resample them every pixel
+    segments: np.ndarray = np.roll(points, -1, axis=0) - points
+    counts: np.ndarray = np.maximum(
+        np.ceil(np.linalg.norm(segments, axis=1)).astype(np.int64), 1
+    )
+    index: np.ndarray = np.repeat(np.arange(len(points)), counts)
+    fractions: np.ndarray = (
+        np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    ) / np.repeat(counts, counts)
+    return points[index] + fractions[:, np.newaxis] * segments[index]
+
+
+def measure_boards(corners: np.ndarray, circles: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Measures a batch of upright boards and of their holes, all in one go.
+
+    The side lengths are the mean of the two opposite sides. The hole position is
+    measured along the sides of the board, from its top left corner, so a board not
+    exactly upright in its crop is still measured along its own axes.
+
+    Args:
+        corners (np.ndarray): The N x 4 x 2 corners of the boards, in crop coordinates.
+        circles (np.ndarray): The N x 3 holes as x, y, radius, in crop coordinates.
+
+    Returns:
+        dict[str, np.ndarray]: One array of N values for each of ratio, long_side,
+            short_side, width, height, circle_diameter, circle_from_top and
+            circle_from_left; the width is the side measured from the left.
+
+    Example:
+        ```python
+        measurements = measure_boards(
+            np.stack([result.board_corners for result in results]),
+            np.stack([result.circles[0] for result in results]),
+        )
+        print(measurements["ratio"].mean(), measurements["ratio"].std())
+        ```
+    """
+
+    corners = np.asarray(corners, np.float64)
+    circles = np.asarray(circles, np.float64)
+    rows: np.ndarray = np.arange(len(corners))
+    sides: np.ndarray = np.roll(corners, -1, axis=1) - corners
+    lengths: np.ndarray = np.linalg.norm(sides, axis=2)
+    first: np.ndarray = (lengths[:, 0] + lengths[:, 2]) / 2
+    second: np.ndarray = (lengths[:, 1] + lengths[:, 3]) / 2
+    long_side: np.ndarray = np.maximum(first, second)
+    short_side: np.ndarray = np.minimum(first, second)
+
+    # The top left corner and the sides leaving it, the horizontal one first
+    top_left: np.ndarray = corners.sum(axis=2).argmin(axis=1)
+    to_next: np.ndarray = corners[rows, (top_left + 1) % 4] - corners[rows, top_left]
+    to_previous: np.ndarray = (
+        corners[rows, (top_left - 1) % 4] - corners[rows, top_left]
+    )
+    next_is_horizontal: np.ndarray = (
+        np.abs(to_next[:, 0]) >= np.abs(to_previous[:, 0])
+    )[:, np.newaxis]
+    horizontal: np.ndarray = np.where(next_is_horizontal, to_next, to_previous)
+    vertical: np.ndarray = np.where(next_is_horizontal, to_previous, to_next)
+    # Side i leaves corner i: the horizontal side is side top_left or the one before
+    # it, whose pair of opposite sides is given by its parity
+    pairs: np.ndarray = np.column_stack((first, second))
+    horizontal_pair: np.ndarray = (top_left + ~next_is_horizontal[:, 0]) % 2
+    width: np.ndarray = pairs[rows, horizontal_pair]
+    height: np.ndarray = pairs[rows, 1 - horizontal_pair]
+    horizontal /= np.maximum(np.linalg.norm(horizontal, axis=1), 1e-9)[:, np.newaxis]
+    vertical /= np.maximum(np.linalg.norm(vertical, axis=1), 1e-9)[:, np.newaxis]
+    from_corner: np.ndarray = circles[:, :2] - corners[rows, top_left]
+
+    return {
+        "ratio": long_side / np.maximum(short_side, 1e-9),
+        "long_side": long_side,
+        "short_side": short_side,
+        "width": width,
+        "height": height,
+        "circle_diameter": 2 * circles[:, 2],
+        "circle_from_top": np.einsum("nk,nk->n", from_corner, vertical),
+        "circle_from_left": np.einsum("nk,nk->n", from_corner, horizontal),
+    }
+
+
+def measure_holes(corners: np.ndarray, circles: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Measures every hole of a board, all in one go.
+
+    Besides the measurements of measure_boards, the holes are given as a pattern: their
+    x, y and diameter in units of the long side of the board, turned so that the long
+    side is horizontal. Patterns of the same board compare across image resolutions.
+
+    Args:
+        corners (np.ndarray): The 4 x 2 corners of the board, in crop coordinates.
+        circles (np.ndarray): The K x 3 holes as x, y, radius, in crop coordinates.
+
+    Returns:
+        dict[str, np.ndarray]: circle_diameter, circle_from_top and circle_from_left,
+            K values each, spacings, the K x K distances between the hole centers, and
+            pattern, K rows of x, y, diameter.
+
+    Example:
+        ```python
+        holes = measure_holes(result.board_corners, result.circles)
+        print(holes["circle_diameter"].min(), holes["spacings"][0, 1])
+        ```
+    """
+
+    circles = np.asarray(circles, np.float64).reshape(-1, 3)
+    measurements: dict[str, np.ndarray] = measure_boards(
+        np.broadcast_to(corners, (len(circles), 4, 2)), circles
+    )
+    centers: np.ndarray = circles[:, :2]
+    x: np.ndarray = measurements["circle_from_left"]
+    y: np.ndarray = measurements["circle_from_top"]
+    if len(circles) and measurements["height"][0] > measurements["width"][0]:
+        # A quarter turn clockwise, the left side becomes the top one
+        x, y = measurements["height"] - y, x
+    long_side: np.ndarray = np.maximum(measurements["long_side"], 1e-9)
+    return {
+        "circle_diameter": measurements["circle_diameter"],
+        "circle_from_top": measurements["circle_from_top"],
+        "circle_from_left": measurements["circle_from_left"],
+        "spacings": np.linalg.norm(
+            centers[:, np.newaxis] - centers[np.newaxis], axis=2
+        ),
+        "pattern": np.column_stack(
+            (x / long_side, y / long_side, measurements["circle_diameter"] / long_side)
+        ),
+    }
+
+
+def match_holes(
+    pattern: np.ndarray, reference_pattern: np.ndarray, aspect: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairs the holes of a board with the holes of the reference, so that the sum of the
+    distances between paired holes is the smallest.
+
+    The assignment is solved as a transport problem by cv.EMD, every hole carrying the
+    same weight, so holes are paired one to one and the extra holes of the pattern with
+    more of them stay unpaired. The board may lie upside down in its crop, the pattern
+    is also tried turned by half a turn and the best of both is kept.
+
+    Args:
+        pattern (np.ndarray): The K x 3 pattern of the board, see measure_holes.
+        reference_pattern (np.ndarray): The M x 3 pattern of the reference.
+        aspect (float): The short side of the board over its long side.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The P x 2 pairs of indices into the pattern and
+            the reference pattern, P = min(K, M), and the P distances between them in
+            units of the long side.
+    """
+
+    if len(pattern) == 0 or len(reference_pattern) == 0:
+        return np.empty((0, 2), np.int64), np.empty(0)
+    turned: np.ndarray = pattern.copy()
+    turned[:, 0] = 1 - pattern[:, 0]
+    turned[:, 1] = aspect - pattern[:, 1]
+    weights: np.ndarray = np.ones((len(pattern), 1), np.float32)
+    reference_weights: np.ndarray = np.ones((len(reference_pattern), 1), np.float32)
+
+    best_cost: float = None
+    for candidate in (pattern, turned):
+        distances: np.ndarray = np.linalg.norm(
+            candidate[:, np.newaxis, :2] - reference_pattern[np.newaxis, :, :2], axis=2
+        ).astype(np.float32)
+        cost, _, flow = cv.EMD(weights, reference_weights, cv.DIST_USER, distances)
+        if best_cost is None or cost < best_cost:
+            best_cost = cost
+            pairs: np.ndarray = np.argwhere(flow > 0.5)
+            errors: np.ndarray = distances[pairs[:, 0], pairs[:, 1]]
+    return pairs, errors.astype(np.float64)
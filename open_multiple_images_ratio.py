@@ -1,405 +1,982 @@
-from typing import Final, Tuple, cast
+from typing import Final, Tuple, Union
+import argparse
+import cProfile
 import traceback
 import cv2 as cv
 import numpy as np
 import os
 
-from classes.Image import Image
-from classes.Rectangle import Rectangle
+from classes.AnnotationWriter import AnnotationWriter
+from classes.CircleOverlay import CircleOverlay
 from classes.Colors import Colors
-
-try:
-    # ================#
-    # GLOBAL VARIABLE #
-    # ================#
-    MAX_DIMENSION: Final[int] = 800
-    MARGIN_ERROR: Final[float] = 1.2
-    FOLDER_PATH: Final[str] = "./images"
-    TITLE_WINDOW: Final[str] = "Detected Circles"
-
-    global_selected_circle: Tuple[int] = None
-    global_white_rectangle_ratio: Tuple[int] = None
-    global_selected_filename = None
-
-    # ==========#
-    # FUNCTIONS #
-    # ==========#
-    def select_circle(
-        event: int, event_x_coord: int, event_y_coord: int, *args
-    ) -> None:
-        """
-        Checks if the click event is inside a circle and performs certain actions if it is.
-
-        Args:
-            event (int): The type of event.
-            event_x_coord (int): The x-coordinate of the click.
-            event_y_coord (int): The y-coordinate of the click.
-            *args: Additional arguments.
-
-        Returns:
-            None
-
-        Examples:
-            ```python
-            select_circle(cv.EVENT_LBUTTONDOWN, 10, 20)
-            ```
-        """
-
-        if event == cv.EVENT_LBUTTONDOWN:
-            # Check if the click is inside a circle
-            for circle in CIRCLES_IN_WHITE_RECTANGLE:
-                center, radius = (circle[0], circle[1]), circle[2]
-                if (
-                    np.sqrt(
-                        (event_x_coord - center[0]) ** 2
-                        + (event_y_coord - center[1]) ** 2
-                    )
-                    < radius
-                ):
-                    global global_selected_circle
-                    global_selected_circle = circle
-                    print_selected_circle_info(circle, white_rectangle)
-                    change_selected_color(circle)
-                    break
-
-    def change_selected_color(selected_circle: np.ndarray) -> None:
-        """
-        Changes the color of the selected circle in the white rectangle image.
-
-        Args:
-            selected_circle (np.ndarray): The coordinates and radius of the selected circle.
-
-        Returns:
-            None
-        """
-        if selected_circle is not None:
-            for CIRCLE in CIRCLES_IN_WHITE_RECTANGLE:
-                X_CIRCLE, Y_CIRCLE, R_CIRCLE = CIRCLE
-                (
-                    X_SELECTED_CIRCLE,
-                    Y_SELECTED_CIRCLE,
-                    R_SELECTED_CIRCLE,
-                ) = selected_circle
-                if (X_CIRCLE, Y_CIRCLE, R_CIRCLE) == (
-                    X_SELECTED_CIRCLE,
-                    Y_SELECTED_CIRCLE,
-                    R_SELECTED_CIRCLE,
-                ):
-                    cv.circle(
-                        white_rectangle_image.original_image,
-                        (X_CIRCLE, Y_CIRCLE),
-                        R_CIRCLE,
-                        (255, 0, 0),
-                        2,
-                    )
-                else:
-                    cv.circle(
-                        white_rectangle_image.original_image,
-                        (X_CIRCLE, Y_CIRCLE),
-                        R_CIRCLE,
-                        (0, 255, 0),
-                        2,
-                    )
-        cv.imshow(TITLE_WINDOW, white_rectangle_image.original_image)
-
-    def calculate_white_rectangle_position(
-        circle: np.ndarray, rectangle: Rectangle
-    ) -> Tuple[float, float]:
-        x, y, r = circle
-        CIRCLE_DIAMETER_PIXEL: Final[int] = r * 2
-
-        CIRCLE_DISTANCE_FROM_TOP_PIXEL: Final[int] = y - rectangle.coord[1]
-        CIRCLE_DISTANCE_FROM_LEFT_PIXEL: Final[int] = x - rectangle.coord[0]
-
-        return (
-            CIRCLE_DIAMETER_PIXEL,
-            CIRCLE_DISTANCE_FROM_TOP_PIXEL,
-            CIRCLE_DISTANCE_FROM_LEFT_PIXEL,
+from classes.Parameters import Parameters
+from classes.InspectionResult import InspectionResult
+from classes.BatchInspector import BatchInspector
+from classes.FolderWatcher import FolderWatcher
+from classes.ProfileTable import ProfileTable, read_table
+from classes.ReferenceProfile import ReferenceProfile
+from classes.ReferenceStore import ReferenceStore
+from classes.ResultSink import FORMATS as RESULT_FORMATS, ResultSink
+from classes.StageStatistics import StageStatistics
+from classes.StreamInspector import StreamInspector
+from classes.VideoInspector import VideoInspector
+from loader import expand_frame_paths, split_frame_path
+from measurement import measure_boards
+from pipeline import IMAGE_EXTENSIONS, compare_holes, compare_ratio, process_image
+
+# ================#
+# GLOBAL VARIABLE #
+# ================#
+MAX_DIMENSION: Final[int] = 800
+MARGIN_ERROR: Final[float] = 1.2
+FOLDER_PATH: Final[str] = "./images"
+TITLE_WINDOW: Final[str] = "Detected Circles"
+WORKERS: Final[int] = os.cpu_count() or 1
+CHUNK_SIZE: Final[int] = 4
+MAX_IN_FLIGHT: Final[int] = 2 * WORKERS
+POLL_INTERVAL: Final[float] = 0.5
+SETTLE_TIME: Final[float] = 1.0
+MAX_QUEUE: Final[int] = 64
+STATS_EVERY: Final[int] = 100
+REFERENCE_STORE_PATH: Final[str] = "./reference_profiles.json"
+RESULT_CACHE_PATH: Final[str] = "./result_cache.sqlite"
+RESULT_CACHE_SIZE_MB: Final[int] = 512
+PREFETCH_DEPTH: Final[int] = 4
+PREFETCH_SIZE_MB: Final[int] = 256
+SEARCH_MARGIN: Final[float] = 0.1
+FULL_DETECTION_EVERY: Final[int] = 30
+HOLE_MARGIN: Final[float] = 0.02
+ANNOTATE_SCALE: Final[float] = 0.5
+ANNOTATE_QUALITY: Final[int] = 85
+ANNOTATE_WORKERS: Final[int] = 2
+ANNOTATE_QUEUE: Final[int] = 64
+REJECTION_MESSAGES: Final[dict[str, str]] = {
+    InspectionResult.EMPTY_FILE: "fichier vide ou tronqué",
+    InspectionResult.BAD_HEADER: "en-tête JPEG ou PNG invalide",
+    InspectionResult.BAD_SIZE: "dimensions d'image inutilisables",
+    InspectionResult.TOO_DARK: "image trop sombre",
+    InspectionResult.TOO_BRIGHT: "image trop claire",
+    InspectionResult.SMALL_BOARD: "rectangle blanc trop petit",
+    InspectionResult.BAD_ASPECT: "rectangle blanc trop allongé",
+    InspectionResult.FAILED: "erreur pendant l'inspection",
+}
+
+global_selected_circle: Tuple[int] = None
+global_white_rectangle_ratio: Tuple[int] = None
+global_reference_holes: np.ndarray = None
+global_selected_filename = None
+board_corners: np.ndarray = None
+circle_overlay: CircleOverlay = None
+# Products mixed on the line, each image is compared with its nearest product
+profile_table: ProfileTable = None
+# Writes the annotated images of --annotate in the background
+annotation_writer: AnnotationWriter = None
+
+# ==========#
+# FUNCTIONS #
+# ==========#
+def select_circle(
+    event: int, event_x_coord: int, event_y_coord: int, *args
+) -> None:
+    """
+    Checks if the click event is inside a circle and performs certain actions if it is.
+
+    Args:
+        event (int): The type of event.
+        event_x_coord (int): The x-coordinate of the click.
+        event_y_coord (int): The y-coordinate of the click.
+        *args: Additional arguments.
+
+    Returns:
+        None
+
+    Examples:
+        ```python
+        select_circle(cv.EVENT_LBUTTONDOWN, 10, 20)
+        ```
+    """
+
+    if event == cv.EVENT_LBUTTONDOWN:
+        # Check if the click is inside a circle
+        selected_index: int = circle_overlay.find(event_x_coord, event_y_coord)
+        if selected_index is not None:
+            global global_selected_circle
+            global_selected_circle = circle_overlay.circles[selected_index]
+            measurements: dict[str, np.ndarray] = measure_boards(
+                board_corners[np.newaxis], global_selected_circle[np.newaxis]
+            )
+            print_selected_circle_info(
+                measurements["circle_diameter"][0],
+                measurements["circle_from_top"][0],
+                measurements["circle_from_left"][0],
+            )
+            change_selected_color(selected_index)
+
+
+def change_selected_color(selected_index: int) -> None:
+    """
+    Changes the color of the selected circle in the white rectangle image.
+
+    Only the previously and newly selected circles are painted again, on a copy of the
+    image kept by the overlay.
+
+    Args:
+        selected_index (int): The index of the selected circle, or None.
+
+    Returns:
+        None
+    """
+    cv.imshow(TITLE_WINDOW, circle_overlay.select(selected_index))
+
+
+def print_selected_circle_info(
+    CIRCLE_DIAMETER_PIXEL: float,
+    CIRCLE_DISTANCE_FROM_TOP_PIXEL: float,
+    CIRCLE_DISTANCE_FROM_LEFT_PIXEL: float,
+) -> None:
+    """
+    Prints information about a selected circle and rectangle.
+
+    Args:
+        circle (np.ndarray): The selected circle represented as an array.
+        rectangle (Rectangle): The selected rectangle.
+
+    Returns:
+        Tuple[float, float]: A tuple containing the width and height of the selected rectangle in centimeters.
+
+    Examples:
+        ```python
+        circle = np.array([x, y, radius])
+        rectangle = Rectangle(width, height, (x, y))
+        print_selected_circle_info(circle, rectangle)
+        ```
+    """
+
+    print(f"{Colors.PURPLE}####################")
+    print(
+        f"\n=====\nSelected Circle Diameter (in pixels): {CIRCLE_DIAMETER_PIXEL}\n-----\n"
+    )
+
+    print(f"Distance from top (in pixels): {CIRCLE_DISTANCE_FROM_TOP_PIXEL}")
+    print(
+        f"Distance from left (in pixels): {CIRCLE_DISTANCE_FROM_LEFT_PIXEL}{Colors.RESET}"
+    )
+
+
+def show(image: np.ndarray) -> None:
+    """
+    Displays an image using OpenCV and waits for a key press to close the window.
+
+    Args:
+        image (np.ndarray): The image to be displayed.
+
+    Returns:
+        None
+    """
+
+    cv.imshow("", image)
+    cv.waitKeyEx(0)
+    cv.destroyAllWindows()
+
+
+# ========#
+# PROGRAM #
+# ========#
+def parse_arguments(argv: list[str] = None) -> argparse.Namespace:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Compares the boards of a folder of images with the first one."
+    )
+    parser.add_argument("--folder", default=FOLDER_PATH, help="Folder of images")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Never open a window, the reference image is not displayed",
+    )
+    parser.add_argument(
+        "--config",
+        help="Parameters written by tune_parameters.py, the most accurate configuration",
+    )
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep inspecting the images landing in the folder, until Ctrl+C",
+    )
+    parser.add_argument(
+        "--video",
+        help="Inspect the frames of a video file, an image sequence such as "
+        "frames/%%04d.jpg, or a camera index, instead of a folder",
+    )
+    parser.add_argument(
+        "--search-margin",
+        type=float,
+        default=SEARCH_MARGIN,
+        help="Video only, the board is looked for this fraction of its size around "
+        "where it was on the previous frame",
+    )
+    parser.add_argument(
+        "--full-detection-every",
+        type=int,
+        default=FULL_DETECTION_EVERY,
+        help="Video only, search the whole frame every this many frames",
+    )
+    parser.add_argument(
+        "--reference", help="Reference image, the first image of the folder by default"
+    )
+    parser.add_argument(
+        "--sku-table",
+        help="JSON list of products, each with its sku, reference image and optional "
+        "margin_error; every image is compared with its nearest product",
+    )
+    parser.add_argument(
+        "--reference-store",
+        default=REFERENCE_STORE_PATH,
+        help="File keeping the reference profiles between runs",
+    )
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument(
+        "--settle-time",
+        type=float,
+        default=SETTLE_TIME,
+        help="Seconds a file must stay unchanged to be considered fully written",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=MAX_QUEUE,
+        help="Files waiting for a worker before the folder stops being polled",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        help="Stop watching after this many seconds without a new image",
+    )
+    parser.add_argument("--stats-every", type=int, default=STATS_EVERY)
+    parser.add_argument(
+        "--result-cache",
+        default=RESULT_CACHE_PATH,
+        help="File keeping the measurements of each image between runs",
+    )
+    parser.add_argument(
+        "--no-result-cache",
+        dest="result_cache",
+        action="store_const",
+        const=None,
+        help="Measure every image again",
+    )
+    parser.add_argument(
+        "--result-cache-size",
+        type=int,
+        default=RESULT_CACHE_SIZE_MB,
+        help="Size of the result cache in MB, the least recently used entries go first",
+    )
+    parser.add_argument(
+        "--prefetch-depth",
+        type=int,
+        default=PREFETCH_DEPTH,
+        help="Files read ahead of their processing by each worker, 0 to disable",
+    )
+    parser.add_argument(
+        "--prefetch-size",
+        type=int,
+        default=PREFETCH_SIZE_MB,
+        help="Size in MB of the files read ahead and not processed yet, per worker",
+    )
+    parser.add_argument(
+        "--component-localisation",
+        action="store_true",
+        help="Find the board as the largest blob of a downsampled mask, faster on noisy images",
+    )
+    parser.add_argument(
+        "--multiple-holes",
+        action="store_true",
+        help="Boards with several holes: measure every hole and match them with the "
+        "holes of the reference",
+    )
+    parser.add_argument(
+        "--hole-margin",
+        type=float,
+        help="Accepted hole position error, as a fraction of the long side of the "
+        f"board; {HOLE_MARGIN}, or the value of --config, if not given",
+    )
+    parser.add_argument(
+        "--annotate",
+        help="Write the images annotated with the board, the holes and the verdict to "
+        "this folder, in the background; no window is opened",
+    )
+    parser.add_argument(
+        "--annotate-scale",
+        type=float,
+        default=ANNOTATE_SCALE,
+        help="Size of the annotated images, relative to the pipeline resolution",
+    )
+    parser.add_argument("--annotate-quality", type=int, default=ANNOTATE_QUALITY)
+    parser.add_argument(
+        "--annotate-every",
+        type=int,
+        default=1,
+        help="Annotate one image out of this many",
+    )
+    parser.add_argument(
+        "--annotate-failures",
+        action="store_true",
+        help="Only annotate the images that are not identical to their reference",
+    )
+    parser.add_argument("--annotate-workers", type=int, default=ANNOTATE_WORKERS)
+    parser.add_argument(
+        "--annotate-queue",
+        type=int,
+        default=ANNOTATE_QUEUE,
+        help="Images waiting to be annotated, the next ones are skipped while it is full",
+    )
+    parser.add_argument(
+        "--results",
+        help="Append one record per image to this .jsonl, .csv or .sqlite file",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Do not print the outcome of each image",
+    )
+    parser.add_argument(
+        "--timings",
+        help="Write the p50/p95/p99 time and memory of each stage to this .json or .csv",
+    )
+    parser.add_argument(
+        "--profile",
+        help="Run in a single process under cProfile and write the stats to this file",
+    )
+    arguments: argparse.Namespace = parser.parse_args(argv)
+    if arguments.results is not None and not arguments.results.lower().endswith(
+        tuple(RESULT_FORMATS)
+    ):
+        parser.error(f"--results must end with one of {', '.join(RESULT_FORMATS)}")
+    return arguments
+
+
+def show_reference(result: InspectionResult) -> None:
+    """
+    Displays the reference white rectangle and waits for 'Esc' or the window to close.
+
+    Args:
+        result (InspectionResult): The reference result, inspected with keep_image=True.
+
+    Returns:
+        None
+    """
+
+    global board_corners, circle_overlay
+    board_corners = result.board_corners
+    circle_overlay = CircleOverlay(result.image, result.circles)
+    cv.imshow(
+        TITLE_WINDOW,
+        # The reference has a single circle, shown selected
+        circle_overlay.select(0 if len(circle_overlay.circles) == 1 else None),
+    )
+    cv.setMouseCallback(TITLE_WINDOW, select_circle)
+    while True:
+        key_pressed: int = cv.waitKeyEx(0)
+        if key_pressed == 27:  # 27 is 'Esc' key
+            break
+        if cv.getWindowProperty(TITLE_WINDOW, cv.WND_PROP_VISIBLE) < 1:
+            break
+
+
+def set_reference(filename: str, ratio: float, holes: list = None) -> None:
+    global global_selected_filename, global_white_rectangle_ratio
+    global global_reference_holes
+    global_selected_filename = filename
+    global_white_rectangle_ratio = ratio
+    global_reference_holes = None if holes is None else np.array(holes)
+    print(
+        f"{Colors.YELLOW}##########################\nFirst Rectangle : {global_white_rectangle_ratio}\n{filename}{Colors.RESET}"
+    )
+    if global_reference_holes is not None:
+        print(f"{Colors.YELLOW}Trous : {len(global_reference_holes)}{Colors.RESET}")
+
+
+def load_profile(
+    reference_path: str, parameters: Parameters, store: ReferenceStore, display: bool
+) -> Tuple[ReferenceProfile, InspectionResult]:
+    """
+    Gets the profile of a reference image from the store, the image is only inspected
+    again when it or the parameters changed, or to display it.
+
+    Args:
+        reference_path (str): The path of the reference image.
+        parameters (Parameters): The pipeline parameters.
+        store (ReferenceStore): The store of the reference profiles.
+        display (bool): Keep the reference image in the result, to display it.
+
+    Returns:
+        Tuple[ReferenceProfile, InspectionResult]: The profile, None if the reference
+            image cannot be used, and the result if the image was inspected.
+    """
+
+    profile: ReferenceProfile = store.get(reference_path, parameters)
+    reference: InspectionResult = None
+    if profile is None or display:
+        reference: InspectionResult = process_image(
+            reference_path, parameters, keep_image=display
         )
-
-    def print_selected_circle_info(
-        CIRCLE_DIAMETER_PIXEL: int,
-        CIRCLE_DISTANCE_FROM_TOP_PIXEL: int,
-        CIRCLE_DISTANCE_FROM_LEFT_PIXEL: int,
-    ) -> None:
-        """
-        Prints information about a selected circle and rectangle.
-
-        Args:
-            circle (np.ndarray): The selected circle represented as an array.
-            rectangle (Rectangle): The selected rectangle.
-
-        Returns:
-            Tuple[float, float]: A tuple containing the width and height of the selected rectangle in centimeters.
-
-        Examples:
-            ```python
-            circle = np.array([x, y, radius])
-            rectangle = Rectangle(width, height, (x, y))
-            print_selected_circle_info(circle, rectangle)
-            ```
-        """
-
-        print(f"{Colors.PURPLE}####################")
+        if reference.status != InspectionResult.OK:
+            print_result(reference)
+            print(f"{Colors.RED}Problème avec l'image de référence{Colors.RESET}")
+            return None, reference
+    if profile is None:
+        profile = ReferenceProfile.from_result(
+            reference,
+            store.image_hash(reference_path),
+            parameters.fingerprint(),
+            reference_path,
+        )
+        store.put(profile)
+    return profile, reference
+
+
+def load_reference(
+    reference_path: str, parameters: Parameters, store: ReferenceStore, display: bool
+) -> bool:
+    """
+    Sets the reference ratio from the profile of the reference image, and displays it.
+
+    Args:
+        reference_path (str): The path of the reference image.
+        parameters (Parameters): The pipeline parameters.
+        store (ReferenceStore): The store of the reference profiles.
+        display (bool): Display the reference image.
+
+    Returns:
+        bool: False if the reference image cannot be used.
+    """
+
+    profile, reference = load_profile(reference_path, parameters, store, display)
+    if profile is None:
+        return False
+    set_reference(profile.filename, profile.ratio, profile.holes)
+    if display:
+        show_reference(reference)
+    return True
+
+
+def load_profile_table(
+    table_path: str, parameters: Parameters, store: ReferenceStore
+) -> list[str]:
+    """
+    Builds the table of the products from the profiles of their reference images.
+
+    Args:
+        table_path (str): The path of the table file, see read_table.
+        parameters (Parameters): The pipeline parameters.
+        store (ReferenceStore): The store of the reference profiles.
+
+    Returns:
+        list[str]: The paths of the reference images, None if one cannot be used.
+    """
+
+    global profile_table
+    table: ProfileTable = ProfileTable()
+    reference_paths: list[str] = []
+    for entry in read_table(table_path):
+        profile: ReferenceProfile = load_profile(
+            entry["reference"], parameters, store, display=False
+        )[0]
+        if profile is None:
+            print(f"{Colors.RED}Produit {entry['sku']} ignoré{Colors.RESET}")
+            return None
+        table.add(
+            entry["sku"], profile, entry.get("margin_error", parameters.margin_error)
+        )
+        reference_paths.append(entry["reference"])
         print(
-            f"\n=====\nSelected Circle Diameter (in pixels): {CIRCLE_DIAMETER_PIXEL}\n-----\n"
+            f"{Colors.YELLOW}##########################\nProduit {entry['sku']} : "
+            f"{profile.ratio}\n{profile.filename}{Colors.RESET}"
+        )
+    profile_table = table
+    return reference_paths
+
+
+def judge(result: InspectionResult, parameters: Parameters) -> None:
+    """
+    Sets the verdict of a correct result, against its nearest product when a table of
+    products is loaded, against the reference otherwise.
+
+    Args:
+        result (InspectionResult): The result, left unchanged if its status is not OK.
+        parameters (Parameters): The pipeline parameters.
+
+    Returns:
+        None
+    """
+
+    if result.status != InspectionResult.OK:
+        return
+    if profile_table is not None:
+        profile_table.compare(result, parameters)
+    else:
+        result.verdict = compare_ratio(
+            result.ratio, global_white_rectangle_ratio, parameters.margin_error
         )
+        compare_holes(
+            result,
+            global_reference_holes,
+            parameters.hole_margin,
+            parameters.hole_diameter_margin,
+        )
+
+
+def print_result(result: InspectionResult) -> None:
+    """
+    Prints the outcome of an image compared with the reference.
+
+    Args:
+        result (InspectionResult): The result, with its verdict if the status is OK.
 
-        print(f"Distance from top (in pixels): {CIRCLE_DISTANCE_FROM_TOP_PIXEL}")
+    Returns:
+        None
+    """
+
+    filename: str = result.filename
+    reason: str = (
+        f" ({REJECTION_MESSAGES[result.rejection]})"
+        if result.rejection is not None
+        else ""
+    )
+    if result.status == InspectionResult.BAD_EXTENSION:
+        print(
+            f"{Colors.RED}Le fichier {filename} ne contient pas la bonne extension{Colors.RESET}"
+        )
+    elif result.status == InspectionResult.UNREADABLE:
         print(
-            f"Distance from left (in pixels): {CIRCLE_DISTANCE_FROM_LEFT_PIXEL}{Colors.RESET}"
+            f"{Colors.RED}Le fichier {filename} n'a pas pu être lu{reason}{Colors.RESET}"
         )
+    elif result.status == InspectionResult.NO_RECTANGLE:
+        print(
+            f"{Colors.RED}Pas de rectangle détectés sur l'image {filename}{reason}{Colors.RESET}"
+        )
+    elif result.status == InspectionResult.NO_CIRCLE:
+        print(
+            f"{Colors.RED}Pas de cercles détectés sur l'image {filename}{Colors.RESET}"
+        )
+    elif result.status == InspectionResult.MULTIPLE_CIRCLES:
+        print(
+            f"{Colors.RED}Plusieurs cercles détectés sur l'image {filename}{Colors.RESET}"
+        )
+    else:
+        print(f"{Colors.YELLOW}##########################\n{result.ratio}{Colors.RESET}")
+        if result.sku is not None:
+            print(f"{Colors.YELLOW}Produit {result.sku}{Colors.RESET}")
+        if result.holes is not None:
+            print(f"{Colors.YELLOW}Trous : {len(result.holes)}{Colors.RESET}")
+        if result.verdict == InspectionResult.TOO_BIG:
+            print(
+                f"{Colors.ORANGE}La planche sur l'image {filename} est trop grande.{Colors.RESET}"
+            )
+        elif result.verdict == InspectionResult.TOO_SMALL:
+            print(
+                f"{Colors.BLUE}La planche sur l'image {filename} est trop petite.{Colors.RESET}"
+            )
+        elif result.verdict == InspectionResult.WRONG_HOLES:
+            print(
+                f"{Colors.RED}Les trous de la planche sur l'image {filename} ne "
+                f"correspondent pas ({result.hole_errors} trous différents).{Colors.RESET}"
+            )
+        else:
+            print(
+                f"{Colors.GREEN}La planche sur l'image {filename} est identique.{Colors.RESET}"
+            )
+
 
-    def show(image: np.ndarray) -> None:
-        """
-        Displays an image using OpenCV and waits for a key press to close the window.
-
-        Args:
-            image (np.ndarray): The image to be displayed.
-
-        Returns:
-            None
-        """
-
-        cv.imshow("", image)
-        cv.waitKeyEx(0)
-        cv.destroyAllWindows()
-
-    def get_circles(image: Image) -> np.ndarray:
-        RAW_CIRCLES_IN_WHITE_RECTANGLE: Final[np.ndarray] = cv.HoughCircles(
-            image.blurred_image,
-            cv.HOUGH_GRADIENT,
-            dp=1,
-            minDist=50,  # Minimum distance between detected circles
-            param1=255,  # Upper threshold for edge detection
-            param2=13,  # Threshold for circle detection
-            minRadius=1,  # Minimum circle radius
-            maxRadius=50,  # Maximum circle radius (adjust as needed)
+def print_stats(inspector: StreamInspector) -> None:
+    print(
+        f"{Colors.CYAN}{inspector.processed} images traitées, "
+        f"{inspector.throughput:.1f} images/s, file d'attente {inspector.queue_depth} "
+        f"(max {inspector.max_queue_depth}){Colors.RESET}"
+    )
+
+
+def report(
+    result: InspectionResult,
+    arguments: argparse.Namespace,
+    statistics: StageStatistics,
+    sink: ResultSink,
+    image: np.ndarray = None,
+) -> None:
+    """
+    Hands the result of an image, compared with the reference, to every output.
+
+    Args:
+        result (InspectionResult): The result, with its verdict if the status is OK.
+        arguments (argparse.Namespace): The command line arguments.
+        statistics (StageStatistics): Collects the stage measurements of every image.
+        sink (ResultSink): Receives the record of the image, or None.
+        image (np.ndarray): The frame of a video, for the annotated images; the preview
+            of the result, or else the image file read again from the folder, if None.
+
+    Returns:
+        None
+    """
+
+    statistics.add(result)
+    if sink is not None:
+        sink.write(result)
+    if annotation_writer is not None:
+        annotation_writer.submit(
+            result,
+            os.path.join(arguments.folder, result.filename) if image is None else None,
+            image,
         )
+    if not arguments.quiet:
+        print_result(result)
 
-        if RAW_CIRCLES_IN_WHITE_RECTANGLE is not None:
-            return np.round(RAW_CIRCLES_IN_WHITE_RECTANGLE[0, :]).astype("int")
-        return None
-
-    # ========#
-    # PROGRAM #
-    # ========#
-    for i, filename in enumerate(os.listdir(FOLDER_PATH)):
-        if (
-            filename.endswith(".jpeg")
-            or filename.endswith(".jpg")
-            or filename.endswith(".png")
-        ):
-            IMAGE_PATH: Final[str] = os.path.join(FOLDER_PATH, filename)
-            opened_image: Image = Image()
-            white_rectangle: Rectangle = Rectangle()
-            rotated_image: Image = Image()
-            rotated_white_rectangle: Rectangle = Rectangle()
-            white_rectangle_image = Image()
-            opened_image.max_dimension = MAX_DIMENSION
-            opened_image.original_image = cv.imread(IMAGE_PATH)
-            opened_image.original_dimension = opened_image.original_image.shape[
-                :2
-            ]  #  h x w
-
-            # Calculate the new dimensions
-            if opened_image.original_dimension[1] > opened_image.original_dimension[0]:
-                new_width: int = opened_image.max_dimension
-                new_height: int = int(
-                    opened_image.original_dimension[0]
-                    * (opened_image.max_dimension / opened_image.original_dimension[1])
-                )
-            else:
-                new_height: int = opened_image.max_dimension
-                new_width: int = int(
-                    opened_image.original_dimension[1]
-                    * (opened_image.max_dimension / opened_image.original_dimension[0])
-                )
-
-            opened_image.resized_image = cv.resize(
-                opened_image.original_image, (new_width, new_height)
-            )
 
-            opened_image.gray_image = cv.cvtColor(
-                opened_image.resized_image, cv.COLOR_BGR2GRAY
+def preview_scale(arguments: argparse.Namespace) -> float:
+    # The workers keep the image at the size of the annotated images, see keep_preview
+    return arguments.annotate_scale if arguments.annotate is not None else None
+
+
+def print_annotations(writer: AnnotationWriter) -> None:
+    print(
+        f"{Colors.CYAN}{writer.written} images annotées écrites dans {writer.folder}"
+        + (f", {writer.dropped} ignorées (file pleine)" if writer.dropped else "")
+        + (f", {writer.failed} en échec" if writer.failed else "")
+        + Colors.RESET
+    )
+
+
+def print_rejections(statistics: StageStatistics) -> None:
+    if statistics.rejections:
+        print(
+            f"{Colors.CYAN}Images rejetées avant les étapes coûteuses : "
+            + ", ".join(
+                f"{count} {REJECTION_MESSAGES[rejection]}"
+                for rejection, count in sorted(statistics.rejections.items())
             )
+            + Colors.RESET
+        )
+
 
-            opened_image.thresholded_image = cv.threshold(
-                opened_image.gray_image, 128, 255, cv.THRESH_BINARY
-            )[1]
-            white_rectangle.contours = cv.findContours(
-                opened_image.thresholded_image,
-                cv.RETR_EXTERNAL,
-                cv.CHAIN_APPROX_SIMPLE,
-                offset=(0, 0),
-            )[0]
-            if len(white_rectangle.contours) > 0:
-                white_rectangle.largest_contour = max(
-                    white_rectangle.contours, key=cv.contourArea
-                )
+def export_timings(statistics: StageStatistics, path: str) -> None:
+    if path.endswith(".csv"):
+        statistics.to_csv(path)
+    else:
+        statistics.to_json(path)
+    print(f"{Colors.CYAN}Temps par étape écrits dans {path}{Colors.RESET}")
+
+
+def load_stream_references(
+    arguments: argparse.Namespace, parameters: Parameters
+) -> bool:
+    """
+    Loads the --sku-table products or the --reference image of a stream, without them
+    the first correct image becomes the reference.
+
+    Args:
+        arguments (argparse.Namespace): The command line arguments.
+        parameters (Parameters): The pipeline parameters.
+
+    Returns:
+        bool: False if a reference image cannot be used.
+    """
+
+    store: ReferenceStore = ReferenceStore(arguments.reference_store)
+    if arguments.sku_table is not None:
+        return load_profile_table(arguments.sku_table, parameters, store) is not None
+    if arguments.reference is not None:
+        return load_reference(arguments.reference, parameters, store, display=False)
+    return True
+
+
+def judge_stream_result(
+    result: InspectionResult,
+    arguments: argparse.Namespace,
+    parameters: Parameters,
+    statistics: StageStatistics,
+    sink: ResultSink,
+    image: np.ndarray = None,
+) -> None:
+    """
+    Compares an image of a stream with the references and reports it, the first correct
+    image becomes the reference if there is none yet.
+
+    Args:
+        result (InspectionResult): The result of the image.
+        arguments (argparse.Namespace): The command line arguments.
+        parameters (Parameters): The pipeline parameters.
+        statistics (StageStatistics): Collects the stage measurements of every image.
+        sink (ResultSink): Receives the record of the image, or None.
+        image (np.ndarray): The frame of a video, see report.
+
+    Returns:
+        None
+    """
+
+    if (
+        global_white_rectangle_ratio is None
+        and profile_table is None
+        and result.status == InspectionResult.OK
+    ):
+        statistics.add(result)
+        set_reference(result.filename, result.ratio, result.hole_pattern)
+    else:
+        judge(result, parameters)
+        report(result, arguments, statistics, sink, image)
+
+
+def print_video_stats(inspector: VideoInspector) -> None:
+    print(
+        f"{Colors.CYAN}{inspector.processed} images traitées, "
+        f"{inspector.throughput:.1f} images/s, {inspector.tracked} suivies, "
+        f"{inspector.lost} pertes du suivi{Colors.RESET}"
+    )
+
+
+def inspect_video(
+    arguments: argparse.Namespace,
+    parameters: Parameters,
+    statistics: StageStatistics,
+    sink: ResultSink,
+) -> None:
+    """
+    Inspects the frames of the --video source until it ends or is interrupted (Ctrl+C),
+    following the board from one frame to the next.
+
+    Args:
+        arguments (argparse.Namespace): The command line arguments.
+        parameters (Parameters): The pipeline parameters.
+        statistics (StageStatistics): Collects the stage measurements of every image.
+        sink (ResultSink): Receives the record of every image, or None.
+
+    Returns:
+        None
+    """
+
+    if not load_stream_references(arguments, parameters):
+        return
+
+    inspector: VideoInspector = VideoInspector(
+        parameters, arguments.search_margin, arguments.full_detection_every
+    )
+    # A camera is given by its index
+    source: Union[str, int] = (
+        int(arguments.video) if arguments.video.isdigit() else arguments.video
+    )
+    try:
+        for result in inspector.run(source):
+            judge_stream_result(
+                result, arguments, parameters, statistics, sink, inspector.frame
+            )
+            if inspector.processed % arguments.stats_every == 0:
+                print_video_stats(inspector)
+    except KeyboardInterrupt:
+        pass
+    print_video_stats(inspector)
+
+
+def watch(
+    arguments: argparse.Namespace,
+    parameters: Parameters,
+    statistics: StageStatistics,
+    sink: ResultSink,
+) -> None:
+    """
+    Inspects the images landing in the folder until interrupted (Ctrl+C).
+
+    The images are compared with the products of --sku-table if given, otherwise with
+    the --reference image, or the first correct image; the reference ratios stay in
+    memory for the whole run.
+
+    Args:
+        arguments (argparse.Namespace): The command line arguments.
+        parameters (Parameters): The pipeline parameters.
+        statistics (StageStatistics): Collects the stage measurements of every image.
+        sink (ResultSink): Receives the record of every image, or None.
+
+    Returns:
+        None
+    """
+
+    if not load_stream_references(arguments, parameters):
+        return
+
+    inspector: StreamInspector = StreamInspector(
+        parameters,
+        workers=arguments.workers,
+        max_in_flight=arguments.max_in_flight,
+        max_queue=arguments.max_queue,
+        cache_path=arguments.result_cache,
+        cache_max_bytes=arguments.result_cache_size * 1024 * 1024,
+        preview_scale=preview_scale(arguments),
+    )
+    watcher: FolderWatcher = FolderWatcher(
+        arguments.folder, arguments.poll_interval, arguments.settle_time
+    )
+    try:
+        for result in inspector.run(watcher, idle_timeout=arguments.idle_timeout):
+            judge_stream_result(result, arguments, parameters, statistics, sink)
+            if inspector.processed % arguments.stats_every == 0:
+                print_stats(inspector)
+    except KeyboardInterrupt:
+        pass
+    print_stats(inspector)
+
+
+def inspect_folder(
+    arguments: argparse.Namespace,
+    parameters: Parameters,
+    statistics: StageStatistics,
+    sink: ResultSink,
+) -> None:
+    """
+    Compares every image of the folder with the reference image, or with its nearest
+    product when --sku-table is given.
+
+    Args:
+        arguments (argparse.Namespace): The command line arguments.
+        parameters (Parameters): The pipeline parameters.
+        statistics (StageStatistics): Collects the stage measurements of every image.
+        sink (ResultSink): Receives the record of every image, or None.
+
+    Returns:
+        None
+    """
+
+    inspector: BatchInspector = BatchInspector(
+        parameters,
+        workers=arguments.workers,
+        chunk_size=arguments.chunk_size,
+        max_in_flight=arguments.max_in_flight,
+        cache_path=arguments.result_cache,
+        cache_max_bytes=arguments.result_cache_size * 1024 * 1024,
+        prefetch_depth=arguments.prefetch_depth,
+        prefetch_max_bytes=arguments.prefetch_size * 1024 * 1024,
+        preview_scale=preview_scale(arguments),
+    )
+    # Sorted, so the default reference does not depend on the directory order
+    IMAGE_PATHS: Final[list[str]] = expand_frame_paths(
+        os.path.join(arguments.folder, filename)
+        for filename in sorted(os.listdir(arguments.folder))
+    )
+    store: ReferenceStore = ReferenceStore(arguments.reference_store)
+    if arguments.sku_table is not None:
+        reference_paths: list[str] = load_profile_table(
+            arguments.sku_table, parameters, store
+        )
+    else:
+        # The first image, the other files are reported as such by the inspection
+        REFERENCE_PATH: Final[str] = (
+            arguments.reference
+            if arguments.reference is not None
+            else next(
                 (
-                    white_rectangle.coord[0],
-                    white_rectangle.coord[1],
-                    white_rectangle.size[0],
-                    white_rectangle.size[1],
-                ) = cast(
-                    tuple[int, ...], cv.boundingRect(white_rectangle.largest_contour)
-                )
-                rotated_image.original_image = opened_image.findRotation(
-                    white_rectangle
-                )
-
-                rotated_image.gray_image = cv.cvtColor(
-                    rotated_image.original_image, cv.COLOR_BGR2GRAY
-                )
-
-                rotated_image.thresholded_image = cv.threshold(
-                    rotated_image.gray_image, 128, 255, cv.THRESH_BINARY
-                )[1]
-                rotated_white_rectangle.contours = cv.findContours(
-                    rotated_image.thresholded_image,
-                    cv.RETR_EXTERNAL,
-                    cv.CHAIN_APPROX_SIMPLE,
-                    offset=(0, 0),
-                )[0]
-                if len(rotated_white_rectangle.contours) > 0:
-                    rotated_white_rectangle.largest_contour = max(
-                        rotated_white_rectangle.contours, key=cv.contourArea
-                    )
-                    cv.drawContours(
-                        rotated_image.original_image,
-                        rotated_white_rectangle.contours,
-                        -1,
-                        (0, 0, 255),  # BGR : Red
-                        2,
-                    )
-                    (
-                        rotated_white_rectangle.coord[0],
-                        rotated_white_rectangle.coord[1],
-                        rotated_white_rectangle.size[0],
-                        rotated_white_rectangle.size[1],
-                    ) = cast(
-                        tuple[int, ...],
-                        cv.boundingRect(rotated_white_rectangle.largest_contour),
-                    )
-
-                white_rectangle_image.original_image = rotated_image.original_image[
-                    rotated_white_rectangle.coord[1] : rotated_white_rectangle.coord[1]
-                    + rotated_white_rectangle.size[1],
-                    rotated_white_rectangle.coord[0] : rotated_white_rectangle.coord[0]
-                    + rotated_white_rectangle.size[0],
-                ]
-
-                white_rectangle_image.gray_image = cv.cvtColor(
-                    white_rectangle_image.original_image, cv.COLOR_BGR2GRAY
-                )
-                white_rectangle_image.blurred_image = cv.GaussianBlur(
-                    white_rectangle_image.gray_image, (9, 9), 2
-                )
-
-                CIRCLES_IN_WHITE_RECTANGLE: Final[np.ndarray] = get_circles(
-                    white_rectangle_image
-                )
-
-                if CIRCLES_IN_WHITE_RECTANGLE is None:
-                    print(
-                        f"{Colors.RED}Pas de cercles détectés sur l'image {filename}{Colors.RESET}"
-                    )
-                elif len(CIRCLES_IN_WHITE_RECTANGLE) == 1:
-                    for j, (
-                        CIRCLE_X_COORD,
-                        CIRCLE_Y_CCORD,
-                        CIRCLE_RADIUS,
-                    ) in enumerate(CIRCLES_IN_WHITE_RECTANGLE):
-                        if j == 0:
-                            cv.circle(
-                                white_rectangle_image.original_image,
-                                (CIRCLE_X_COORD, CIRCLE_Y_CCORD),
-                                CIRCLE_RADIUS,
-                                (255, 0, 0),
-                                2,
-                            )  # Draw the circle
-                        else:
-                            cv.circle(
-                                white_rectangle_image.original_image,
-                                (CIRCLE_X_COORD, CIRCLE_Y_CCORD),
-                                CIRCLE_RADIUS,
-                                (0, 255, 0),
-                                2,
-                            )  # Draw the circle
-                    (
-                        diameter_pixel,
-                        circle_from_top,
-                        circle_from_left,
-                    ) = calculate_white_rectangle_position(
-                        CIRCLES_IN_WHITE_RECTANGLE[0], white_rectangle
-                    )
-
-                    WHITE_RECTANGLE_RATIO: Final[float] = (
-                        white_rectangle.size[0] / white_rectangle.size[1]
-                        if white_rectangle.size[0] > white_rectangle.size[1]
-                        else white_rectangle.size[1] / white_rectangle.size[0]
-                        if white_rectangle.size[1] > white_rectangle.size[0]
-                        else 1.0
-                    )
-
-                    if i == 0:
-                        global_selected_filename = filename
-                        global_white_rectangle_ratio = WHITE_RECTANGLE_RATIO
-                        print(
-                            f"{Colors.YELLOW}##########################\nFirst Rectangle : {global_white_rectangle_ratio}\n{filename}{Colors.RESET}"
-                        )
-                        # print_informations_circles(CIRCLES_IN_WHITE_RECTANGLE)
-                        cv.imshow(TITLE_WINDOW, white_rectangle_image.original_image)
-                        # cv.setMouseCallback(TITLE_WINDOW, select_circle)
-                        while True:
-                            key_pressed: int = cv.waitKeyEx(0)
-                            if key_pressed == 27:  # 27 is 'Esc' key
-                                break
-                            if (
-                                cv.getWindowProperty(TITLE_WINDOW, cv.WND_PROP_VISIBLE)
-                                < 1
-                            ):
-                                break
-                    else:
-                        print(
-                            f"{Colors.YELLOW}##########################\n{WHITE_RECTANGLE_RATIO}{Colors.RESET}"
-                        )
-                        if (
-                            WHITE_RECTANGLE_RATIO
-                            > MARGIN_ERROR * global_white_rectangle_ratio
-                        ):
-                            print(
-                                f"{Colors.ORANGE}La planche sur l'image {filename} est trop grande.{Colors.RESET}"
-                            )
-                        elif (
-                            WHITE_RECTANGLE_RATIO
-                            < global_white_rectangle_ratio / MARGIN_ERROR
-                        ):
-                            print(
-                                f"{Colors.BLUE}La planche sur l'image {filename} est trop petite.{Colors.RESET}"
-                            )
-                        else:
-                            print(
-                                f"{Colors.GREEN}La planche sur l'image {filename} est identique.{Colors.RESET}"
-                            )
-                elif len(CIRCLES_IN_WHITE_RECTANGLE) > 1:
-                    print(
-                        f"{Colors.RED}Plusieurs cercles détectés sur l'image {filename}{Colors.RESET}"
-                    )
-                    if i == 1:
-                        print(
-                            f"{Colors.RED}Problème avec la première image{Colors.RESET}"
-                        )
-                        break
-            else:
-                print(
-                    f"{Colors.RED}Pas de rectangle détectés sur l'image {filename}{Colors.RESET}"
-                )
+                    image_path
+                    for image_path in IMAGE_PATHS
+                    if split_frame_path(image_path)[0].endswith(IMAGE_EXTENSIONS)
+                ),
+                None,
+            )
+        )
+        if REFERENCE_PATH is None:
+            print(f"{Colors.RED}Aucune image dans {arguments.folder}{Colors.RESET}")
+        reference_paths: list[str] = (
+            [REFERENCE_PATH]
+            if REFERENCE_PATH is not None
+            and load_reference(
+                REFERENCE_PATH,
+                parameters,
+                store,
+                display=not arguments.headless and arguments.annotate is None,
+            )
+            else None
+        )
+
+    if reference_paths is not None:
+        # Frame references are not files, paths are compared as strings
+        REFERENCES: Final[set[str]] = {
+            os.path.realpath(path) for path in reference_paths
+        }
+        # A reference that cannot be used was already reported, every other image is
+        # inspected whatever the outcome of the previous ones
+        for result in inspector.run(
+            image_path
+            for image_path in IMAGE_PATHS
+            if os.path.realpath(image_path) not in REFERENCES
+        ):
+            # Only the comparison with the references stays serialized
+            judge(result, parameters)
+            report(result, arguments, statistics, sink)
+    print("EOP")
+
+
+def main(argv: list[str] = None) -> None:
+    global annotation_writer
+    try:
+        arguments: argparse.Namespace = parse_arguments(argv)
+        if arguments.config is not None:
+            parameters: Parameters = Parameters.load(arguments.config)
         else:
+            parameters: Parameters = Parameters()
+            parameters.max_dimension = MAX_DIMENSION
+            parameters.margin_error = MARGIN_ERROR
+            parameters.hole_margin = HOLE_MARGIN
+        # The switches only add to what the configuration file turned on, and the
+        # values only replace it when given
+        parameters.component_localisation |= arguments.component_localisation
+        parameters.multiple_holes |= arguments.multiple_holes
+        if arguments.hole_margin is not None:
+            parameters.hole_margin = arguments.hole_margin
+        if arguments.annotate is not None:
+            annotation_writer = AnnotationWriter(
+                arguments.annotate,
+                parameters,
+                scale=arguments.annotate_scale,
+                quality=arguments.annotate_quality,
+                every=arguments.annotate_every,
+                failures_only=arguments.annotate_failures,
+                workers=arguments.annotate_workers,
+                max_queue=arguments.annotate_queue,
+            )
+        statistics: StageStatistics = StageStatistics()
+        sink: ResultSink = (
+            ResultSink(arguments.results) if arguments.results is not None else None
+        )
+        if sink is not None and sink.rotated_path is not None:
             print(
-                f"{Colors.RED}Le fichier {filename} ne contient pas la bonne extension{Colors.RESET}"
+                f"{Colors.YELLOW}{arguments.results} a d'autres colonnes, déplacé vers "
+                f"{sink.rotated_path}{Colors.RESET}"
             )
-    print("EOP")
-except Exception:
-    traceback.print_exc()
+
+        profiler: cProfile.Profile = None
+        if arguments.profile is not None:
+            # cProfile only sees the current process
+            arguments.workers = 1
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            if arguments.video is not None:
+                inspect_video(arguments, parameters, statistics, sink)
+            elif arguments.watch:
+                watch(arguments, parameters, statistics, sink)
+            else:
+                inspect_folder(arguments, parameters, statistics, sink)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(arguments.profile)
+            if sink is not None:
+                sink.close()
+            if annotation_writer is not None:
+                annotation_writer.close()
+                print_annotations(annotation_writer)
+
+        print_rejections(statistics)
+        if arguments.timings is not None:
+            export_timings(statistics, arguments.timings)
+    except Exception:
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
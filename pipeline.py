@@ -0,0 +1,1215 @@
+from typing import Final, Iterable, Iterator, Tuple, cast
+import io
+import math
+import cv2 as cv
+import numpy as np
+import os
+import struct
+import time
+import traceback
+
+from classes.Image import Image
+from classes.Rectangle import Rectangle
+from classes.Parameters import Parameters
+from classes.InspectionResult import InspectionResult
+from classes.ResultCache import ResultCache
+from classes.ScratchBuffers import ScratchBuffers
+from loader import (
+    RAW_EXTENSION,
+    load_image,
+    load_image_from_bytes,
+    load_raw_frame,
+    read_image_size,
+    read_image_size_from_stream,
+    split_frame_path,
+)
+from measurement import (
+    match_holes,
+    measure_boards,
+    measure_holes,
+    refine_corners,
+)
+
+IMAGE_EXTENSIONS: Final[Tuple[str, ...]] = (".jpeg", ".jpg", ".png", RAW_EXTENSION)
+CONTOUR_COLOR: Final[Tuple[int, ...]] = (0, 0, 255)  # BGR : Red
+CONTOUR_GRAY: Final[Tuple[int, ...]] = (76,)  # Red once converted to gray
+# Result fields computed by the rectangle stage, kept by the result cache
+RECTANGLE_STAGE_FIELDS: Final[Tuple[str, ...]] = (
+    "status",
+    "rejection",
+    "rectangle_coord",
+    "rectangle_size",
+    "rotated_rectangle_coord",
+    "rotated_rectangle_size",
+    "rotation_angle",
+    "crop_matrix",
+    "board_corners",
+)
+# Smallest hole radius, in pixels, still reliably found on a coarse pyramid level
+MIN_COARSE_RADIUS: Final[int] = 3
+# Smaller files are empty or truncated, no JPEG or PNG image is that small
+MIN_FILE_BYTES: Final[int] = 64
+# Longest over shortest side of an image still worth decoding, a thinner one resizes to
+# nothing
+MAX_IMAGE_ASPECT: Final[float] = 20.0
+# One pixel out of CHECK_SCALE x CHECK_SCALE is enough for the brightness check
+CHECK_SCALE: Final[int] = 8
+
+
+def record_stage(
+    result: InspectionResult, stage: str, start: float, *arrays: np.ndarray
+) -> float:
+    """
+    Adds the time elapsed since start and the size of the buffers a stage allocated to
+    the measurements of a result.
+
+    The buffers are the arrays the stage returned, this is much cheaper than tracing
+    every allocation and close enough to the memory each stage needs. Views, such as
+    reused scratch buffers, allocate nothing.
+
+    Args:
+        result (InspectionResult): The result of the image.
+        stage (str): The name of the stage.
+        start (float): The time.perf_counter() value when the stage started.
+        *arrays (np.ndarray): The buffers allocated by the stage, None is ignored.
+
+    Returns:
+        float: The current time.perf_counter() value, the start of the next stage.
+    """
+
+    now: float = time.perf_counter()
+    result.timings[stage] = result.timings.get(stage, 0.0) + now - start
+    result.allocated_bytes[stage] = result.allocated_bytes.get(stage, 0) + sum(
+        array.nbytes for array in arrays if array is not None and array.base is None
+    )
+    return now
+
+
+def scratch(
+    buffers: ScratchBuffers, name: str, shape: Tuple[int, ...]
+) -> np.ndarray:
+    """
+    Returns a scratch buffer to pass as dst=, or None to let OpenCV allocate.
+
+    Args:
+        buffers (ScratchBuffers): The buffers of the current worker, or None.
+        name (str): The name of the buffer.
+        shape (Tuple[int, ...]): The shape of the buffer.
+
+    Returns:
+        np.ndarray: The buffer, or None if buffers is None.
+    """
+
+    return None if buffers is None else buffers.get(name, shape)
+
+
+def to_gray(
+    image: np.ndarray, buffers: ScratchBuffers = None, name: str = "gray"
+) -> np.ndarray:
+    """
+    Converts a BGR image to gray, gray images are returned as is.
+
+    Args:
+        image (np.ndarray): The BGR or gray image.
+        buffers (ScratchBuffers): Reused output buffers, allocated if None.
+        name (str): The name of the output buffer.
+
+    Returns:
+        np.ndarray: The gray image.
+    """
+
+    if image.ndim == 2:
+        return image
+    return cv.cvtColor(
+        image, cv.COLOR_BGR2GRAY, dst=scratch(buffers, name, image.shape[:2])
+    )
+
+
+def get_circles(image: Image, parameters: Parameters) -> np.ndarray:
+    RAW_CIRCLES_IN_WHITE_RECTANGLE: Final[np.ndarray] = cv.HoughCircles(
+        image.blurred_image,
+        cv.HOUGH_GRADIENT,
+        dp=parameters.hough_dp,
+        minDist=parameters.hough_min_dist,  # Minimum distance between detected circles
+        param1=parameters.hough_param1,  # Upper threshold for edge detection
+        param2=parameters.hough_param2,  # Threshold for circle detection
+        minRadius=parameters.hough_min_radius,  # Minimum circle radius
+        maxRadius=parameters.hough_max_radius,  # Maximum circle radius
+    )
+
+    if RAW_CIRCLES_IN_WHITE_RECTANGLE is not None:
+        return np.round(RAW_CIRCLES_IN_WHITE_RECTANGLE[0, :]).astype("int")
+    return None
+
+
+def _hough_circles(
+    image: np.ndarray,
+    parameters: Parameters,
+    min_dist: float,
+    min_radius: int,
+    max_radius: int,
+) -> np.ndarray:
+    circles: np.ndarray = cv.HoughCircles(
+        image,
+        cv.HOUGH_GRADIENT,
+        dp=parameters.hough_dp,
+        minDist=min_dist,
+        param1=parameters.hough_param1,
+        param2=parameters.hough_param2,
+        minRadius=min_radius,
+        maxRadius=max_radius,
+    )
+    if circles is not None:
+        return np.round(circles[0, :]).astype("int")
+    return None
+
+
+def get_circles_adaptive(
+    image: Image, parameters: Parameters, stop_after: int = None
+) -> np.ndarray:
+    """
+    Finds the circles on a coarse pyramid level, then refines each candidate at full
+    resolution in a small window around it.
+
+    The radius range and the minimum distance between circles are derived from the size
+    of the image, the hole being a known fraction of the board.
+
+    Args:
+        image (Image): The image, its blurred_image must already be computed.
+        parameters (Parameters): The pipeline parameters.
+        stop_after (int): Stop refining once this many circles are confirmed.
+
+    Returns:
+        np.ndarray: The circles as rows of x, y, radius, or None if none is found.
+    """
+
+    blurred_image: np.ndarray = image.blurred_image
+    short_side: int = min(blurred_image.shape[:2])
+    min_radius: int = max(1, int(parameters.hole_min_radius_ratio * short_side))
+    max_radius: int = max(
+        min_radius + 1, math.ceil(parameters.hole_max_radius_ratio * short_side)
+    )
+    # Small holes would vanish on the coarse level, search them on fewer levels
+    pyramid_levels: int = parameters.hough_pyramid_levels
+    while pyramid_levels > 0 and min_radius / 2**pyramid_levels < MIN_COARSE_RADIUS:
+        pyramid_levels -= 1
+    if pyramid_levels == 0:
+        return _hough_circles(
+            blurred_image, parameters, max_radius, min_radius, max_radius
+        )
+    scale: int = 2**pyramid_levels
+
+    coarse_image: np.ndarray = blurred_image
+    for _ in range(pyramid_levels):
+        coarse_image = cv.pyrDown(coarse_image)
+    # A lower accumulator threshold on the coarse level, the refinement confirms
+    candidates: np.ndarray = cv.HoughCircles(
+        coarse_image,
+        cv.HOUGH_GRADIENT,
+        dp=parameters.hough_dp,
+        minDist=max(1, max_radius / scale),
+        param1=parameters.hough_param1,
+        param2=parameters.hough_param2 * parameters.hough_coarse_param2_ratio,
+        minRadius=max(1, min_radius // scale),
+        maxRadius=math.ceil(max_radius / scale) + 1,
+    )
+    if candidates is None:
+        return None
+
+    circles: list[np.ndarray] = []
+    margin: int = scale + 2
+    for x, y, r in candidates[0] * scale:
+        refined: np.ndarray = refine_circle(blurred_image, parameters, x, y, r, margin)
+        if refined is None:
+            continue
+        circles.append(refined)
+        if stop_after is not None and len(circles) >= stop_after:
+            break
+
+    if circles:
+        return np.round(np.array(circles)).astype("int")
+    return None
+
+
+def refine_circle(
+    blurred_image: np.ndarray,
+    parameters: Parameters,
+    x: float,
+    y: float,
+    radius: float,
+    margin: int,
+) -> np.ndarray:
+    """
+    Finds the best circle in a small window around an expected circle.
+
+    Args:
+        blurred_image (np.ndarray): The blurred gray image.
+        parameters (Parameters): The pipeline parameters.
+        x (float): The expected center x.
+        y (float): The expected center y.
+        radius (float): The expected radius.
+        margin (int): How far, in pixels, the center and the radius may be off.
+
+    Returns:
+        np.ndarray: The circle as x, y, radius in image coordinates, or None.
+    """
+
+    radius_high: int = int(radius) + margin
+    half_window: int = radius_high + margin
+    left: int = max(0, int(x) - half_window)
+    top: int = max(0, int(y) - half_window)
+    window: np.ndarray = blurred_image[
+        top : int(y) + half_window + 1, left : int(x) + half_window + 1
+    ]
+    if window.size == 0:  # The expected circle is outside of the image
+        return None
+    refined: np.ndarray = cv.HoughCircles(
+        window,
+        cv.HOUGH_GRADIENT,
+        dp=parameters.hough_dp,
+        minDist=2 * half_window,  # Only the best circle of the window
+        param1=parameters.hough_param1,
+        param2=parameters.hough_param2,
+        minRadius=max(1, int(radius) - margin),
+        maxRadius=radius_high,
+    )
+    if refined is None:
+        return None
+    return refined[0, 0] + (left, top, 0)
+
+
+def detect_circles(
+    image: Image, parameters: Parameters, stop_after: int = None
+) -> np.ndarray:
+    """
+    Finds the circles of an image with the detector selected by the parameters.
+
+    Args:
+        image (Image): The image, its blurred_image must already be computed.
+        parameters (Parameters): The pipeline parameters.
+        stop_after (int): Adaptive detector only, stop once this many circles are found.
+
+    Returns:
+        np.ndarray: The circles as rows of x, y, radius, or None if none is found.
+    """
+
+    if parameters.adaptive_circles:
+        return get_circles_adaptive(image, parameters, stop_after)
+    return get_circles(image, parameters)
+
+
+def compare_ratio(ratio: float, reference_ratio: float, margin_error: float) -> str:
+    """
+    Compares a board ratio against the reference ratio.
+
+    Args:
+        ratio (float): The ratio of the inspected board.
+        reference_ratio (float): The ratio of the reference board.
+        margin_error (float): The accepted multiplicative tolerance.
+
+    Returns:
+        str: One of the InspectionResult verdicts.
+    """
+
+    if ratio > margin_error * reference_ratio:
+        return InspectionResult.TOO_BIG
+    if ratio < reference_ratio / margin_error:
+        return InspectionResult.TOO_SMALL
+    return InspectionResult.IDENTICAL
+
+
+def compare_holes(
+    result: InspectionResult,
+    reference_pattern: np.ndarray,
+    hole_margin: float,
+    diameter_margin: float,
+) -> None:
+    """
+    Compares the holes of a board of the right size with the holes of the reference.
+
+    The holes are paired by match_holes. A hole is wrong when it has no pair, when it is
+    further than hole_margin from its pair or when its diameter is not within
+    diameter_margin of the diameter of its pair.
+
+    Args:
+        result (InspectionResult): The result, with its ratio verdict; nothing is done
+            unless the verdict is IDENTICAL and both patterns are known.
+        reference_pattern (np.ndarray): The hole pattern of the reference, or None.
+        hole_margin (float): The accepted distance, as a fraction of the long side.
+        diameter_margin (float): The accepted multiplicative tolerance on diameters.
+
+    Returns:
+        None
+    """
+
+    if (
+        result.verdict != InspectionResult.IDENTICAL
+        or result.hole_pattern is None
+        or reference_pattern is None
+    ):
+        return
+    pairs, errors = match_holes(
+        result.hole_pattern, reference_pattern, 1 / result.ratio
+    )
+    diameters: np.ndarray = (
+        result.hole_pattern[pairs[:, 0], 2] / reference_pattern[pairs[:, 1], 2]
+    )
+    wrong: np.ndarray = (
+        (errors > hole_margin)
+        | (diameters > diameter_margin)
+        | (diameters < 1 / diameter_margin)
+    )
+    result.hole_errors = int(
+        abs(len(result.hole_pattern) - len(reference_pattern)) + wrong.sum()
+    )
+    if result.hole_errors:
+        result.verdict = InspectionResult.WRONG_HOLES
+
+
+def threshold_image(
+    image: Image, threshold: int, buffers: ScratchBuffers = None
+) -> None:
+    """
+    Thresholds the gray image, the board becomes white on a black background.
+
+    Args:
+        image (Image): The image, its gray_image must already be computed.
+        threshold (int): The binary threshold separating the board from the background.
+        buffers (ScratchBuffers): Reused output buffers, allocated if None.
+
+    Returns:
+        None
+    """
+
+    image.thresholded_image = cv.threshold(
+        image.gray_image,
+        threshold,
+        255,
+        cv.THRESH_BINARY,
+        dst=scratch(buffers, "thresholded", image.gray_image.shape),
+    )[1]
+
+
+def find_largest_contour(image: Image, offset: Tuple[int, int] = (0, 0)) -> Rectangle:
+    """
+    Keeps the largest external contour of the thresholded image.
+
+    Args:
+        image (Image): The image, its thresholded_image must already be computed.
+        offset (Tuple[int, int]): Position of the thresholded image in the gray image,
+            when only a region was thresholded.
+
+    Returns:
+        Rectangle: The rectangle found, or None if the image has no contour.
+    """
+
+    rectangle: Rectangle = Rectangle()
+    rectangle.contours = cv.findContours(
+        image.thresholded_image,
+        cv.RETR_EXTERNAL,
+        cv.CHAIN_APPROX_SIMPLE,
+        offset=offset,
+    )[0]
+    if len(rectangle.contours) == 0:
+        return None
+
+    rectangle.largest_contour = max(rectangle.contours, key=cv.contourArea)
+    (
+        rectangle.coord[0],
+        rectangle.coord[1],
+        rectangle.size[0],
+        rectangle.size[1],
+    ) = cast(tuple[int, ...], cv.boundingRect(rectangle.largest_contour))
+    return rectangle
+
+
+def check_file(image_path: str, data: bytes = None) -> str:
+    """
+    Rejects a file that cannot hold a usable image, before decoding it: empty or
+    truncated files, files without a JPEG or PNG header, and images with an empty or
+    far too thin header size.
+
+    Args:
+        image_path (str): The path of the image.
+        data (bytes): The content of the file, if already read; the size and the header
+            are read from the file if None.
+
+    Returns:
+        str: One of the InspectionResult rejection reasons, or None if the file may be
+            decoded; a file that cannot be opened is left to the decode.
+    """
+
+    try:
+        if data is None:
+            if os.path.getsize(image_path) < MIN_FILE_BYTES:
+                return InspectionResult.EMPTY_FILE
+            image_size: Tuple[int, int] = read_image_size(image_path)
+        else:
+            if len(data) < MIN_FILE_BYTES:
+                return InspectionResult.EMPTY_FILE
+            image_size: Tuple[int, int] = read_image_size_from_stream(io.BytesIO(data))
+    except OSError:
+        return None
+    except struct.error:  # The header itself is truncated
+        image_size = None
+    if image_size is None:
+        return InspectionResult.BAD_HEADER
+    if min(image_size) == 0 or max(image_size) / min(image_size) > MAX_IMAGE_ASPECT:
+        return InspectionResult.BAD_SIZE
+    return None
+
+
+def check_brightness(image: Image, parameters: Parameters) -> str:
+    """
+    Rejects an image without any bright board, or bright everywhere, from the fraction
+    of bright pixels of a sparse sample of the gray image.
+
+    Args:
+        image (Image): The image, its gray_image must already be computed.
+        parameters (Parameters): The pipeline parameters.
+
+    Returns:
+        str: One of the InspectionResult rejection reasons, or None.
+    """
+
+    height, width = image.gray_image.shape
+    sample: np.ndarray = cv.resize(
+        image.gray_image,
+        (max(1, width // CHECK_SCALE), max(1, height // CHECK_SCALE)),
+        interpolation=cv.INTER_NEAREST,
+    )
+    bright_fraction: float = (
+        cv.countNonZero(
+            cv.threshold(sample, parameters.threshold, 255, cv.THRESH_BINARY)[1]
+        )
+        / sample.size
+    )
+    if bright_fraction < parameters.min_bright_fraction:
+        return InspectionResult.TOO_DARK
+    if bright_fraction > parameters.max_bright_fraction:
+        return InspectionResult.TOO_BRIGHT
+    return None
+
+
+def check_board(
+    rectangle: Rectangle, image_shape: Tuple[int, ...], parameters: Parameters
+) -> str:
+    """
+    Rejects a white rectangle that cannot be a board before it is rotated: too small a
+    part of the image, or too elongated.
+
+    Args:
+        rectangle (Rectangle): The rectangle found.
+        image_shape (Tuple[int, ...]): The shape of the image it was found on.
+        parameters (Parameters): The pipeline parameters.
+
+    Returns:
+        str: One of the InspectionResult rejection reasons, or None.
+    """
+
+    width, height = rectangle.size
+    if width * height < parameters.min_board_fraction * image_shape[0] * image_shape[1]:
+        return InspectionResult.SMALL_BOARD
+    if max(width, height) > parameters.max_board_aspect * min(width, height):
+        return InspectionResult.BAD_ASPECT
+    return None
+
+
+def find_board_component(
+    image: Image, parameters: Parameters, buffers: ScratchBuffers = None
+) -> Rectangle:
+    """
+    Finds the board as the largest connected component of a downsampled mask, then
+    traces the contour at full resolution only around that component.
+
+    Noise on the background gives thousands of tiny contours to the full image search,
+    here it only costs a few labels on the small mask.
+
+    Args:
+        image (Image): The image, its gray_image must already be computed.
+        parameters (Parameters): The pipeline parameters.
+        buffers (ScratchBuffers): Reused output buffers, allocated if None.
+
+    Returns:
+        Rectangle: The rectangle found, with the contours of the region around the
+            board only, or None if the image has no white region.
+    """
+
+    threshold_image(image, parameters.threshold, buffers)
+    scale: int = max(1, parameters.component_scale)
+    height, width = image.thresholded_image.shape
+    small_size: Tuple[int, int] = (max(1, width // scale), max(1, height // scale))
+    # A cell is a little more than scale pixels when the size is not a multiple of it
+    cell_width: float = width / small_size[0]
+    cell_height: float = height / small_size[1]
+
+    # Dilated over a cell first, so that a cell is set if any of its pixels is and thin
+    # parts of the board are not lost by the nearest neighbour sampling
+    small_mask: np.ndarray = cv.resize(
+        cv.dilate(
+            image.thresholded_image,
+            np.ones((math.ceil(cell_height), math.ceil(cell_width)), np.uint8),
+            anchor=(0, 0),
+        ),
+        small_size,
+        interpolation=cv.INTER_NEAREST,
+    )
+    count, _, stats, _ = cv.connectedComponentsWithStats(small_mask, connectivity=8)
+    if count < 2:  # Only the background
+        return None
+    largest: int = 1 + int(np.argmax(stats[1:, cv.CC_STAT_AREA]))
+    x, y, w, h = (int(value) for value in stats[largest, :4])
+
+    # Back to full resolution, with one cell of margin
+    left: int = max(0, math.floor((x - 1) * cell_width))
+    top: int = max(0, math.floor((y - 1) * cell_height))
+    right: int = min(width, math.ceil((x + w + 1) * cell_width))
+    bottom: int = min(height, math.ceil((y + h + 1) * cell_height))
+    image.thresholded_image = image.thresholded_image[top:bottom, left:right]
+    return find_largest_contour(image, (left, top))
+
+
+def find_white_rectangle(image: Image, threshold: int) -> Rectangle:
+    """
+    Thresholds the gray image and keeps the largest external contour.
+
+    Args:
+        image (Image): The image, its gray_image must already be computed.
+        threshold (int): The binary threshold separating the board from the background.
+
+    Returns:
+        Rectangle: The rectangle found, or None if the image has no contour.
+    """
+
+    threshold_image(image, threshold)
+    return find_largest_contour(image)
+
+
+def resize_image(
+    image: np.ndarray, max_dimension: int, buffers: ScratchBuffers = None
+) -> Image:
+    """
+    Resizes an image so that its longest side is max_dimension and converts it to gray.
+
+    Args:
+        image (np.ndarray): The BGR or gray image.
+        max_dimension (int): The size of the longest side after resizing.
+        buffers (ScratchBuffers): Reused output buffers, allocated if None.
+
+    Returns:
+        Image: The image, with its resized_image and gray_image computed.
+    """
+
+    opened_image: Image = Image()
+    opened_image.max_dimension = max_dimension
+    opened_image.original_image = image
+    opened_image.original_dimension = opened_image.original_image.shape[:2]  #  h x w
+
+    # Calculate the new dimensions
+    if opened_image.original_dimension[1] > opened_image.original_dimension[0]:
+        new_width: int = opened_image.max_dimension
+        new_height: int = int(
+            opened_image.original_dimension[0]
+            * (opened_image.max_dimension / opened_image.original_dimension[1])
+        )
+    else:
+        new_height: int = opened_image.max_dimension
+        new_width: int = int(
+            opened_image.original_dimension[1]
+            * (opened_image.max_dimension / opened_image.original_dimension[0])
+        )
+
+    opened_image.resized_image = cv.resize(
+        opened_image.original_image,
+        (new_width, new_height),
+        dst=scratch(buffers, "resized", (new_height, new_width) + image.shape[2:]),
+    )
+    # The full size buffer is not needed anymore, let it be freed now
+    opened_image.release("original_image")
+    opened_image.gray_image = to_gray(opened_image.resized_image, buffers)
+    return opened_image
+
+
+def crop_white_rectangle(
+    opened_image: Image,
+    white_rectangle: Rectangle,
+    parameters: Parameters,
+    buffers: ScratchBuffers = None,
+) -> Tuple[Image, Rectangle]:
+    """
+    Extracts the upright white rectangle.
+
+    Args:
+        opened_image (Image): The resized image the rectangle was found on.
+        white_rectangle (Rectangle): The rectangle found by find_white_rectangle.
+        parameters (Parameters): The pipeline parameters.
+        buffers (ScratchBuffers): Reused output buffers of the single pass extraction,
+            allocated if None.
+
+    Returns:
+        Tuple[Image, Rectangle]: The crop, with its gray_image computed, and the
+            rectangle in the rotated image, or (None, None) if it is lost after rotation.
+    """
+
+    white_rectangle_image: Image = Image()
+    if parameters.single_pass:
+        rotated_white_rectangle: Rectangle = Rectangle()
+        white_rectangle_image.original_image = opened_image.extractRotatedRectangle(
+            white_rectangle, rotated_white_rectangle, buffers
+        )
+        cv.drawContours(
+            white_rectangle_image.original_image,
+            [rotated_white_rectangle.largest_contour],
+            -1,
+            CONTOUR_COLOR
+            if white_rectangle_image.original_image.ndim == 3
+            else CONTOUR_GRAY,
+            2,
+        )
+    else:
+        rotated_image: Image = Image()
+        rotated_image.original_image = opened_image.findRotation(white_rectangle)
+        rotated_image.gray_image = to_gray(rotated_image.original_image)
+        rotated_white_rectangle: Rectangle = find_white_rectangle(
+            rotated_image, parameters.threshold
+        )
+        if rotated_white_rectangle is None:
+            return None, None
+        cv.drawContours(
+            rotated_image.original_image,
+            rotated_white_rectangle.contours,
+            -1,
+            CONTOUR_COLOR if rotated_image.original_image.ndim == 3 else CONTOUR_GRAY,
+            2,
+        )
+
+        white_rectangle_image.original_image = rotated_image.original_image[
+            rotated_white_rectangle.coord[1] : rotated_white_rectangle.coord[1]
+            + rotated_white_rectangle.size[1],
+            rotated_white_rectangle.coord[0] : rotated_white_rectangle.coord[0]
+            + rotated_white_rectangle.size[0],
+        ]
+    white_rectangle_image.gray_image = to_gray(
+        white_rectangle_image.original_image,
+        buffers if parameters.single_pass else None,
+        "crop_gray",
+    )
+    return white_rectangle_image, rotated_white_rectangle
+
+
+def blur_image(
+    image: Image, parameters: Parameters, buffers: ScratchBuffers = None
+) -> None:
+    """
+    Blurs the gray image before the circle detection.
+
+    Args:
+        image (Image): The image, its gray_image must already be computed.
+        parameters (Parameters): The pipeline parameters.
+        buffers (ScratchBuffers): Reused output buffers, allocated if None.
+
+    Returns:
+        None
+    """
+
+    image.blurred_image = cv.GaussianBlur(
+        image.gray_image,
+        (parameters.blur_kernel_size, parameters.blur_kernel_size),
+        parameters.blur_sigma,
+        dst=scratch(buffers, "blurred", image.gray_image.shape),
+    )
+
+
+def locate_white_rectangle(
+    opened_image: Image,
+    parameters: Parameters,
+    result: InspectionResult,
+    buffers: ScratchBuffers = None,
+) -> Image:
+    """
+    Finds the white rectangle of a resized image and extracts it upright.
+
+    Args:
+        opened_image (Image): The image returned by resize_image.
+        parameters (Parameters): The pipeline parameters.
+        result (InspectionResult): Receives the rectangle measurements, or the status
+            if the image has no usable rectangle.
+        buffers (ScratchBuffers): Reused output buffers, allocated if None.
+
+    Returns:
+        Image: The upright crop, with its gray_image computed, or None.
+    """
+
+    start: float = time.perf_counter()
+    result.rejection = check_brightness(opened_image, parameters)
+    start = record_stage(result, "checks", start)
+    if result.rejection is not None:
+        result.status = InspectionResult.NO_RECTANGLE
+        return None
+
+    if parameters.component_localisation:
+        white_rectangle: Rectangle = find_board_component(
+            opened_image, parameters, buffers
+        )
+        stage: str = "components"
+    else:
+        threshold_image(opened_image, parameters.threshold, buffers)
+        start = record_stage(result, "threshold", start, opened_image.thresholded_image)
+        white_rectangle: Rectangle = find_largest_contour(opened_image)
+        stage: str = "contours"
+    opened_image.release("thresholded_image")
+    start = record_stage(
+        result,
+        stage,
+        start,
+        *(white_rectangle.contours if white_rectangle is not None else ()),
+    )
+    if white_rectangle is None:
+        result.status = InspectionResult.NO_RECTANGLE
+        return None
+    result.rectangle_coord = list(white_rectangle.coord)
+    result.rectangle_size = list(white_rectangle.size)
+    result.rejection = check_board(
+        white_rectangle, opened_image.gray_image.shape, parameters
+    )
+    start = record_stage(result, "checks", start)
+    if result.rejection is not None:
+        result.status = InspectionResult.NO_RECTANGLE
+        return None
+
+    white_rectangle_image, rotated_white_rectangle = crop_white_rectangle(
+        opened_image, white_rectangle, parameters, buffers
+    )
+    if white_rectangle_image is None:
+        record_stage(result, "rotation", start)
+        result.status = InspectionResult.NO_RECTANGLE
+        return None
+    record_stage(
+        result,
+        "rotation",
+        start,
+        white_rectangle_image.original_image,
+        white_rectangle_image.gray_image,
+    )
+    result.rotated_rectangle_coord = list(rotated_white_rectangle.coord)
+    result.rotated_rectangle_size = list(rotated_white_rectangle.size)
+    result.rotation_angle = white_rectangle.angle
+    result.crop_matrix = white_rectangle.rotation_matrix.copy()
+    result.crop_matrix[:, 2] -= rotated_white_rectangle.coord
+    # Measured where the holes are found, in the upright crop
+    result.board_corners = cv.transform(
+        refine_corners(
+            white_rectangle.largest_contour, opened_image.gray_image.shape
+        )[np.newaxis],
+        result.crop_matrix,
+    )[0]
+    return white_rectangle_image
+
+
+def inspect_image(
+    image: np.ndarray,
+    parameters: Parameters = None,
+    keep_image: bool = False,
+    result: InspectionResult = None,
+    buffers: ScratchBuffers = None,
+    expected_circle: np.ndarray = None,
+    preview_scale: float = None,
+) -> InspectionResult:
+    """
+    Runs the whole per-image pipeline on an already decoded BGR or gray image.
+
+    The function only depends on its arguments and never opens a window, so it can run
+    in a worker process or be embedded in a long-running service.
+
+    Args:
+        image (np.ndarray): The BGR or gray image to inspect.
+        parameters (Parameters): The pipeline parameters, defaults to Parameters().
+        keep_image (bool): Keep the white rectangle crop, contour drawn, in the result.
+        result (InspectionResult): The result to fill, a new one by default.
+        buffers (ScratchBuffers): Reused output buffers, so that images of the same size
+            allocate nothing large. Not used when keep_image is set.
+        expected_circle (np.ndarray): Only look for the circle around this x, y, radius
+            of the crop. The whole crop is searched if it is not found there, but a
+            second circle away from it goes unnoticed.
+        preview_scale (float): Keep the resized image, scaled by this factor, in the
+            result preview, for the annotated images.
+
+    Returns:
+        InspectionResult: The measurements of the image, without verdict.
+
+    Example:
+        ```python
+        result = inspect_image(cv.imread("./images/bon_image.jpg"))
+        print(result.status, result.ratio)
+        ```
+    """
+
+    if parameters is None:
+        parameters = Parameters()
+    if result is None:
+        result = InspectionResult()
+    if image is None:
+        result.status = InspectionResult.UNREADABLE
+        return result
+    if keep_image:
+        buffers = None  # The kept crop must not be overwritten by the next image
+
+    start: float = time.perf_counter()
+    opened_image: Image = resize_image(image, parameters.max_dimension, buffers)
+    del image  # Do not keep the full size buffer alive during the next stages
+    keep_preview(result, opened_image, preview_scale)
+    record_stage(
+        result, "resize", start, opened_image.resized_image, opened_image.gray_image
+    )
+    white_rectangle_image: Image = locate_white_rectangle(
+        opened_image, parameters, result, buffers
+    )
+    opened_image.release()
+    if white_rectangle_image is None:
+        return result
+
+    start = time.perf_counter()
+    blur_image(white_rectangle_image, parameters, buffers)
+    start = record_stage(result, "blur", start, white_rectangle_image.blurred_image)
+    if not keep_image:
+        white_rectangle_image.release("original_image", "gray_image")
+    if expected_circle is not None:
+        circle: np.ndarray = refine_circle(
+            white_rectangle_image.blurred_image,
+            parameters,
+            *expected_circle,
+            margin=int(expected_circle[2]) // 4 + 2,
+        )
+        result.circles = (
+            None if circle is None else np.round(circle[np.newaxis]).astype("int")
+        )
+    if expected_circle is None or result.circles is None:
+        # Knowing there are several circles is enough to reject the image
+        result.circles = detect_circles(
+            white_rectangle_image,
+            parameters,
+            stop_after=None if parameters.multiple_holes else 2,
+        )
+    record_stage(result, "circles", start, result.circles)
+    if keep_image:
+        # The circles are drawn by CircleOverlay, on a copy
+        result.image = white_rectangle_image.original_image
+
+    return measure_result(result, parameters.multiple_holes)
+
+
+def keep_preview(
+    result: InspectionResult, opened_image: Image, preview_scale: float
+) -> None:
+    """
+    Keeps a copy of the resized image in the result, for the AnnotationWriter, so that
+    it does not decode the image a second time.
+
+    Args:
+        result (InspectionResult): The result receiving the preview.
+        opened_image (Image): The image, with its resized_image computed.
+        preview_scale (float): The size of the preview relative to the resized image,
+            no preview is kept if None.
+
+    Returns:
+        None
+    """
+
+    if preview_scale is None:
+        return
+    # A new array, the resized image may be a scratch buffer reused by the next image
+    result.preview = cv.resize(
+        opened_image.resized_image,
+        None,
+        fx=preview_scale,
+        fy=preview_scale,
+        interpolation=cv.INTER_AREA,
+    )
+
+
+def measure_result(
+    result: InspectionResult, multiple_holes: bool = False
+) -> InspectionResult:
+    """
+    Sets the status of a result from its circles, and its measurements if there is
+    exactly one circle. The ratio and the hole position come from the sub-pixel corners
+    of the board, in the upright crop where the hole was found.
+
+    Args:
+        result (InspectionResult): The result, with its board corners and circles set.
+        multiple_holes (bool): Boards have several holes, every circle is measured by
+            measure_holes instead of making the result MULTIPLE_CIRCLES.
+
+    Returns:
+        InspectionResult: The same result.
+    """
+
+    if result.circles is None:
+        result.status = InspectionResult.NO_CIRCLE
+        return result
+    if len(result.circles) > 1 and not multiple_holes:
+        result.status = InspectionResult.MULTIPLE_CIRCLES
+        return result
+
+    if multiple_holes:
+        holes: dict[str, np.ndarray] = measure_holes(
+            result.board_corners, result.circles
+        )
+        result.holes = np.column_stack(
+            (
+                holes["circle_diameter"],
+                holes["circle_from_top"],
+                holes["circle_from_left"],
+            )
+        )
+        result.hole_spacings = holes["spacings"]
+        result.hole_pattern = holes["pattern"]
+
+    measurements: dict[str, np.ndarray] = measure_boards(
+        result.board_corners[np.newaxis], result.circles[:1]
+    )
+    result.ratio = float(measurements["ratio"][0])
+    if len(result.circles) == 1:
+        result.circle_diameter = float(measurements["circle_diameter"][0])
+        result.circle_from_top = float(measurements["circle_from_top"][0])
+        result.circle_from_left = float(measurements["circle_from_left"][0])
+    result.status = InspectionResult.OK
+    return result
+
+
+def read_image(
+    image_path: str,
+    parameters: Parameters,
+    grayscale: bool = False,
+    result: InspectionResult = None,
+    data: bytes = None,
+) -> np.ndarray:
+    """
+    Decodes an image file the way the parameters ask for.
+
+    Raw frames are not decoded at all, the pipeline reads them straight from the memory
+    mapped file. Other files are first checked by check_file, a rejected file is not
+    decoded.
+
+    Args:
+        image_path (str): The path of the image, or a "path#index" raw frame reference.
+        parameters (Parameters): The pipeline parameters.
+        grayscale (bool): Colors are not needed, only used by the reduced decode.
+        result (InspectionResult): Receives the time and size of the decode, and the
+            rejection reason of a rejected file, if given.
+        data (bytes): The content of the file, already read by a Prefetcher; the file
+            is read if None.
+
+    Returns:
+        np.ndarray: The decoded image, or None if it cannot be read.
+    """
+
+    start: float = time.perf_counter()
+    raw: bool = split_frame_path(image_path)[0].endswith(RAW_EXTENSION)
+    # Raw frames are checked when their file is mapped
+    rejection: str = None if raw else check_file(image_path, data)
+    if raw:
+        image: np.ndarray = load_raw_frame(image_path)
+    elif rejection is not None:
+        image: np.ndarray = None
+    elif data is not None:
+        image: np.ndarray = load_image_from_bytes(
+            data,
+            parameters.max_dimension if parameters.reduced_decode else None,
+            grayscale,
+        )
+    elif parameters.reduced_decode:
+        image: np.ndarray = load_image(image_path, parameters.max_dimension, grayscale)
+    else:
+        image: np.ndarray = cv.imread(image_path)
+    if result is not None:
+        result.rejection = rejection
+        record_stage(result, "decode", start, image)
+    return image
+
+
+def process_image(
+    image_path: str,
+    parameters: Parameters = None,
+    keep_image: bool = False,
+    cache: ResultCache = None,
+    buffers: ScratchBuffers = None,
+    data: bytes = None,
+    preview_scale: float = None,
+) -> InspectionResult:
+    """
+    Reads an image file and runs inspect_image on it.
+
+    An error of the pipeline on the image is printed and gives an UNREADABLE result,
+    rejected as FAILED, so that one bad image does not stop a batch or a watched folder.
+
+    Args:
+        image_path (str): The path of the image to inspect, or a "path#index" raw frame
+            reference.
+        parameters (Parameters): The pipeline parameters, defaults to Parameters().
+        keep_image (bool): Keep the white rectangle crop, contour drawn, in the result.
+        cache (ResultCache): Reuse the stages already computed on the same file content
+            with the same parameters. Not used when keep_image is set.
+        buffers (ScratchBuffers): Reused output buffers, see inspect_image.
+        data (bytes): The content of the file, already read by a Prefetcher.
+        preview_scale (float): Keep a preview of the image in the result, see
+            inspect_image; it is gray unless keep_image is set, the measurements do not
+            depend on it. A result read from the cache has no preview.
+
+    Returns:
+        InspectionResult: The measurements of the image, without verdict.
+    """
+
+    if parameters is None:
+        parameters = Parameters()
+    try:
+        if not split_frame_path(image_path)[0].endswith(IMAGE_EXTENSIONS):
+            result: InspectionResult = InspectionResult()
+            result.status = InspectionResult.BAD_EXTENSION
+        elif cache is not None and not keep_image:
+            result: InspectionResult = _process_image_cached(
+                image_path, parameters, cache, buffers, data, preview_scale
+            )
+        else:
+            result: InspectionResult = InspectionResult()
+            # Colors are only needed to annotate the kept image
+            inspect_image(
+                read_image(
+                    image_path,
+                    parameters,
+                    grayscale=not keep_image,
+                    result=result,
+                    data=data,
+                ),
+                parameters,
+                keep_image,
+                result,
+                buffers,
+                preview_scale=preview_scale,
+            )
+    except Exception:
+        traceback.print_exc()
+        result = InspectionResult()
+        result.status = InspectionResult.UNREADABLE
+        result.rejection = InspectionResult.FAILED
+    result.filename = os.path.basename(image_path)
+    return result
+
+
+def _process_image_cached(
+    image_path: str,
+    parameters: Parameters,
+    cache: ResultCache,
+    buffers: ScratchBuffers = None,
+    data: bytes = None,
+    preview_scale: float = None,
+) -> InspectionResult:
+    result: InspectionResult = InspectionResult()
+    start: float = time.perf_counter()
+    file_path, frame_index = split_frame_path(image_path)
+    try:
+        # Raw frames are never prefetched, data is the whole file otherwise
+        file_hash: str = cache.file_hash(file_path, data)
+    except OSError:
+        result.status = InspectionResult.UNREADABLE
+        return result
+    if frame_index is not None:
+        file_hash = f"{file_hash}#{frame_index}"
+
+    # Decode, resize, rectangle search and rotation
+    rectangle_key: str = f"{file_hash}:rectangle:{parameters.fingerprint('rectangle')}"
+    rectangle_stage: dict = cache.get(rectangle_key)
+    record_stage(result, "cache", start)
+    if rectangle_stage is None:
+        white_rectangle_image: Image = None
+        image: np.ndarray = read_image(
+            image_path, parameters, grayscale=True, result=result, data=data
+        )
+        if image is None:
+            result.status = InspectionResult.UNREADABLE
+        else:
+            start = time.perf_counter()
+            opened_image: Image = resize_image(
+                image, parameters.max_dimension, buffers
+            )
+            del image
+            keep_preview(result, opened_image, preview_scale)
+            record_stage(
+                result,
+                "resize",
+                start,
+                opened_image.resized_image,
+                opened_image.gray_image,
+            )
+            white_rectangle_image = locate_white_rectangle(
+                opened_image, parameters, result, buffers
+            )
+        start = time.perf_counter()
+        rectangle_stage = {
+            name: getattr(result, name) for name in RECTANGLE_STAGE_FIELDS
+        }
+        # PNG is lossless, the circle stage gets the exact same crop
+        rectangle_stage["crop"] = (
+            None
+            if white_rectangle_image is None
+            else cv.imencode(".png", white_rectangle_image.gray_image)[1].tobytes()
+        )
+        cache.put(rectangle_key, rectangle_stage)
+        record_stage(result, "cache", start)
+    for name in RECTANGLE_STAGE_FIELDS:
+        setattr(result, name, rectangle_stage[name])
+    if result.status is not None:
+        return result
+
+    # Blur and circle detection
+    start = time.perf_counter()
+    circles_key: str = f"{file_hash}:circles:{parameters.fingerprint('circles')}"
+    circles_stage: dict = cache.get(circles_key)
+    if circles_stage is None:
+        white_rectangle_image = Image()
+        white_rectangle_image.gray_image = cv.imdecode(
+            np.frombuffer(rectangle_stage["crop"], np.uint8), cv.IMREAD_GRAYSCALE
+        )
+        start = record_stage(result, "cache", start, white_rectangle_image.gray_image)
+        blur_image(white_rectangle_image, parameters, buffers)
+        start = record_stage(
+            result, "blur", start, white_rectangle_image.blurred_image
+        )
+        circles_stage = {
+            "circles": detect_circles(
+                white_rectangle_image,
+                parameters,
+                stop_after=None if parameters.multiple_holes else 2,
+            )
+        }
+        start = record_stage(result, "circles", start, circles_stage["circles"])
+        cache.put(circles_key, circles_stage)
+    record_stage(result, "cache", start)
+    result.circles = circles_stage["circles"]
+
+    return measure_result(result, parameters.multiple_holes)
+
+
+def inspect_paths(
+    image_paths: Iterable[str], parameters: Parameters = None
+) -> Iterator[InspectionResult]:
+    """
+    Lazily inspects image files one after the other, in the current process.
+
+    Args:
+        image_paths (Iterable[str]): The paths of the images to inspect.
+        parameters (Parameters): The pipeline parameters, defaults to Parameters().
+
+    Returns:
+        Iterator[InspectionResult]: One result per path, in input order.
+
+    Example:
+        ```python
+        for result in inspect_paths(["./images/bon_image.jpg"]):
+            print(result.filename, result.status)
+        ```
+    """
+
+    buffers: ScratchBuffers = ScratchBuffers()
+    for image_path in image_paths:
+        yield process_image(image_path, parameters, buffers=buffers)
@@ -0,0 +1,155 @@
+from typing import Final
+import argparse
+import json
+import os
+import time
+
+from classes.Colors import Colors
+from classes.ParameterTuner import (
+    DEFAULT_GRID,
+    ParameterTuner,
+    grid_configurations,
+    ignored_parameters,
+    pareto_front,
+    read_labels,
+)
+from classes.Parameters import STAGE_PARAMETERS, Parameters
+
+# ================#
+# GLOBAL VARIABLE #
+# ================#
+OUTPUT_PATH: Final[str] = "./tuned_parameters.json"
+RATIO_TOLERANCE: Final[float] = 0.02
+WORKERS: Final[int] = os.cpu_count() or 1
+
+
+# ========#
+# PROGRAM #
+# ========#
+def parse_grid(parser: argparse.ArgumentParser, values: list[str]) -> dict:
+    # NAME=V1,V2,... each value read with the type of the default of the parameter
+    if not values:
+        return dict(DEFAULT_GRID)
+    defaults: Parameters = Parameters()
+    measured: set[str] = {name for names in STAGE_PARAMETERS.values() for name in names}
+    grid: dict[str, tuple] = {}
+    for value in values:
+        name, _, choices = value.partition("=")
+        if name not in measured or not choices:
+            parser.error(f"--grid {value}: expected NAME=V1,V2 with NAME a parameter")
+        kind: type = type(getattr(defaults, name))
+        try:
+            grid[name] = tuple(
+                choice.lower() in ("1", "true", "yes") if kind is bool else kind(choice)
+                for choice in choices.split(",")
+            )
+        except ValueError:
+            parser.error(f"--grid {value}: values of {name} must be {kind.__name__}")
+    if any(size <= 0 or size % 2 == 0 for size in grid.get("blur_kernel_size", ())):
+        parser.error("--grid blur_kernel_size: the kernel sizes must be odd")
+    return grid
+
+
+def parse_arguments(argv: list[str] = None) -> argparse.Namespace:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Searches the pipeline parameters on a labeled set of images and "
+        "writes the configurations with the best accuracy for their time."
+    )
+    parser.add_argument(
+        "labels",
+        help="JSON list of images: filename, expected status and optionally ratio",
+    )
+    parser.add_argument(
+        "--grid",
+        action="append",
+        metavar="NAME=V1,V2",
+        help="Values of a parameter to search, repeat for each parameter; defaults to "
+        + ", ".join(DEFAULT_GRID),
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        help="Only try this many configurations of the grid, drawn at random",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        help="Worker processes, the times are only comparable with at most one per core",
+    )
+    parser.add_argument(
+        "--ratio-tolerance",
+        type=float,
+        default=RATIO_TOLERANCE,
+        help="Accepted relative error of the labeled ratios",
+    )
+    parser.add_argument(
+        "--config",
+        help="Parameters to start from, written by a previous search",
+    )
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    arguments: argparse.Namespace = parser.parse_args(argv)
+    arguments.grid = parse_grid(parser, arguments.grid)
+    arguments.parameters = (
+        Parameters.load(arguments.config)
+        if arguments.config is not None
+        else Parameters()
+    )
+    ignored: list[str] = ignored_parameters(arguments.grid, arguments.parameters)
+    if ignored:
+        parser.error(
+            f"--grid {', '.join(ignored)}: not read by the circle detector, see "
+            "adaptive_circles"
+        )
+    return arguments
+
+
+def print_score(color: str, title: str, score: dict, names: list[str]) -> None:
+    print(
+        f"{color}{title}précision {100 * score['accuracy']:5.1f} %, "
+        f"{score['mean_ms']:6.1f} ms par image, "
+        + ", ".join(f"{name}={score['parameters'][name]}" for name in names)
+        + Colors.RESET
+    )
+
+
+def main(argv: list[str] = None) -> None:
+    arguments: argparse.Namespace = parse_arguments(argv)
+    parameters: Parameters = arguments.parameters
+    cases: list[dict] = read_labels(arguments.labels)
+    # The current parameters come first, to compare with
+    configurations: list[dict] = [{}] + grid_configurations(
+        arguments.grid, arguments.samples, arguments.seed
+    )
+
+    start: float = time.perf_counter()
+    tuner: ParameterTuner = ParameterTuner(
+        cases, parameters, arguments.workers, arguments.ratio_tolerance
+    )
+    scores: list[dict] = tuner.run(configurations)
+    print(
+        f"{Colors.CYAN}{len(configurations)} configurations essayées sur "
+        f"{len(cases)} images en {time.perf_counter() - start:.1f} s{Colors.RESET}"
+    )
+    names: list[str] = list(arguments.grid)
+    print_score(Colors.YELLOW, "Paramètres actuels : ", scores[0], names)
+
+    front: list[dict] = pareto_front(scores)
+    for score in front:
+        print_score(Colors.GREEN, "", score, names)
+    with open(arguments.output, "w", encoding="utf-8") as file:
+        json.dump(
+            {"images": len(cases), "searched": names, "configurations": front},
+            file,
+            indent=2,
+        )
+    print(
+        f"{Colors.CYAN}{len(front)} configurations écrites dans {arguments.output}, "
+        f"de la plus précise à la plus rapide, la première est lue par --config"
+        f"{Colors.RESET}"
+    )
+
+
+if __name__ == "__main__":
+    main()